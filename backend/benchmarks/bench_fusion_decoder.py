@@ -0,0 +1,105 @@
+"""
+Benchmark: typed fast-path decoder vs. key-probing extraction for fusion payloads.
+
+Reports tracks/second for
+  1. decoding only (JSON parse + per-track extraction), and
+  2. the full store_fusion_message path against an in-memory SQLite database,
+with the fast decoder switched on and off.
+
+Run from the backend folder:
+    python benchmarks/bench_fusion_decoder.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from domain.models import db
+from infrastructure import fusion_decoder, fusion_persistence
+from infrastructure.fusion_persistence import _extract_tracks, _probe_track, store_fusion_message
+
+TOPIC = "axis/B8A44F9EED3B/analytics/fusion"
+
+
+def make_payload(n_tracks, message_no=0):
+    tracks = []
+    for i in range(n_tracks):
+        tracks.append({
+            "track_id": f"{message_no}-{i}",
+            "class": {
+                "type": "Human",
+                "score": 0.91,
+                "upper_clothing_colors": ["Blue"],
+                "lower_clothing_colors": ["Black"],
+            },
+            "bounding_box": {"top": 0.1, "bottom": 0.6, "left": 0.2 + i * 1e-4, "right": 0.3},
+            "geoposition": {"latitude": 58.3959 + i * 1e-5, "longitude": 15.5779},
+            "speed": 1.2,
+            "timestamp": "2025-11-20T10:15:30.123Z",
+            "start_time": "2025-11-20T10:15:20.000Z",
+            "observations": [
+                {"timestamp": "2025-11-20T10:15:30.123Z", "bounding_box": {"top": 0.1, "bottom": 0.6, "left": 0.2, "right": 0.3}}
+            ],
+        })
+    return {"timestamp": "2025-11-20T10:15:30.123Z", "tracks": tracks}
+
+
+def bench_decode(raw_messages, n_tracks):
+    start = time.perf_counter()
+    for raw in raw_messages:
+        payload = json.loads(raw.decode())
+        for track in _extract_tracks(payload):
+            _probe_track(track)
+    probing = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for raw in raw_messages:
+        payload = fusion_decoder.loads(raw)
+        for track in _extract_tracks(payload):
+            fusion_decoder.decode_axis_track(track) or _probe_track(track)
+    fast = time.perf_counter() - start
+
+    total = len(raw_messages) * n_tracks
+    return total / probing, total / fast
+
+
+def bench_store(app, payloads, n_tracks, fast):
+    fusion_persistence.FUSION_FAST_DECODER = fast
+    fusion_persistence._track_motion_cache.clear()
+    start = time.perf_counter()
+    for payload in payloads:
+        store_fusion_message(TOPIC, payload, flask_app=app)
+    elapsed = time.perf_counter() - start
+    return len(payloads) * n_tracks / elapsed
+
+
+def main():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    print(f"JSON backend for fast path: {fusion_decoder.JSON_BACKEND}")
+    print(f"{'tracks/msg':>10} | {'decode probing':>15} | {'decode fast':>12} | {'store probing':>14} | {'store fast':>11}  (tracks/s)")
+    for n_tracks in (1, 10, 50):
+        messages = max(20, 2000 // n_tracks)
+        raw = [json.dumps(make_payload(n_tracks, m)).encode() for m in range(messages)]
+        decode_probe, decode_fast = bench_decode(raw, n_tracks)
+
+        store_messages = max(5, 200 // n_tracks)
+        payloads = [make_payload(n_tracks, m) for m in range(store_messages)]
+        store_probe = bench_store(app, payloads, n_tracks, fast=False)
+        payloads = [make_payload(n_tracks, m + store_messages) for m in range(store_messages)]
+        store_fast = bench_store(app, payloads, n_tracks, fast=True)
+
+        print(f"{n_tracks:>10} | {decode_probe:>15,.0f} | {decode_fast:>12,.0f} | {store_probe:>14,.0f} | {store_fast:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
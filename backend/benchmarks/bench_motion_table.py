@@ -0,0 +1,95 @@
+"""
+Benchmark: per-track vs. vectorized stationary-track filtering.
+
+Compares the previous scalar check (one cache lookup and one math.* haversine
+per track) with MotionTable's vectorized pass, which handles all tracks of a
+message in one NumPy call, and with MotionTable.check as configured, which
+uses its per-track path below ``vectorize_from`` tracks. Reports tracks/second
+for 1 to 1000 tracks per message; the crossover between the two MotionTable
+paths is where the ``vectorize_from`` default comes from.
+
+Run from the backend folder:
+    python benchmarks/bench_motion_table.py
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from infrastructure.motion_table import MotionTable
+from infrastructure.ttl_cache import BoundedTTLCache
+
+MIN_SPEED = 0.3
+MIN_DISTANCE = 0.4
+
+
+def _haversine_meters(p1, p2):
+    lat1, lon1 = map(math.radians, p1)
+    lat2, lon2 = map(math.radians, p2)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371000 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def scalar_check(cache, tracks):
+    result = []
+    for key, lat, lon, bbox, speed in tracks:
+        previous = cache.get(key) if speed is None or speed < MIN_SPEED else None
+        cache.set(key, (lat, lon, bbox))
+        if previous is None:
+            result.append(False)
+            continue
+        if None not in (lat, lon, previous[0], previous[1]):
+            moved = _haversine_meters((lat, lon), (previous[0], previous[1]))
+        elif bbox and previous[2]:
+            moved = math.hypot(bbox[0] - previous[2][0], bbox[1] - previous[2][1])
+        else:
+            moved = 0.0
+        result.append(moved < MIN_DISTANCE)
+    return result
+
+
+def make_messages(n_tracks, n_messages, rng):
+    messages = []
+    for _ in range(n_messages):
+        messages.append([
+            (i, 58.3959 + rng.random() * 1e-5, 15.5779 + rng.random() * 1e-5, (rng.random(), rng.random()), 0.1)
+            for i in range(n_tracks)
+        ])
+    return messages
+
+
+def bench(n_tracks, rng):
+    n_messages = max(20, 20000 // n_tracks)
+    messages = make_messages(n_tracks, n_messages, rng)
+
+    cache = BoundedTTLCache(max_size=10000, ttl_seconds=300)
+    start = time.perf_counter()
+    for tracks in messages:
+        scalar_check(cache, tracks)
+    scalar = time.perf_counter() - start
+
+    total = n_messages * n_tracks
+    rates = [total / scalar]
+    for vectorize_from in (0, MotionTable().vectorize_from):
+        table = MotionTable(max_size=10000, ttl_seconds=300, vectorize_from=vectorize_from)
+        start = time.perf_counter()
+        for tracks in messages:
+            keys, lats, lons, bboxes, speeds = zip(*tracks)
+            table.check(keys, lats, lons, bboxes, speeds, MIN_SPEED, MIN_DISTANCE)
+        rates.append(total / (time.perf_counter() - start))
+    return rates
+
+
+def main():
+    rng = random.Random(1)
+    print(f"{'tracks/msg':>10} | {'per-track':>12} | {'vectorized':>12} | {'check':>12} | {'speedup':>7}  (tracks/s)")
+    for n_tracks in (1, 10, 20, 30, 50, 100, 1000):
+        scalar, vectorized, check = bench(n_tracks, rng)
+        print(f"{n_tracks:>10} | {scalar:>12,.0f} | {vectorized:>12,.0f} | {check:>12,.0f} | {check / scalar:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
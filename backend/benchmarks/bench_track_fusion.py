@@ -0,0 +1,64 @@
+"""
+Benchmark: TrackFusion association with 50, 500 and 2000 simultaneous tracks.
+
+Compares, per observation of a new camera track,
+  1. the previous linear scan over every global track (first match), and
+  2. the spatial hash lookup in TrackFusion._find_nearby_track (nearest match).
+People are spread over a lobby with the density kept constant, so the grid
+cells hold a similar number of tracks at every size. Reports lookups/second.
+
+Run from the backend folder:
+    python benchmarks/bench_track_fusion.py
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from infrastructure.track_fusion import TrackFusion
+
+PEOPLE_PER_M2 = 0.5
+
+
+def linear_scan(tracks, fusion_distance, x_m, y_m):
+    """The pre-grid lookup over a dict of tracks: first track closer than fusion_distance."""
+    for gid, data in tracks.items():
+        if math.sqrt((data['x_m'] - x_m) ** 2 + (data['y_m'] - y_m) ** 2) < fusion_distance:
+            return gid
+    return None
+
+
+def bench(n_tracks, rng, n_lookups=20000):
+    side = math.sqrt(n_tracks / PEOPLE_PER_M2)
+    fusion = TrackFusion(fusion_distance=0.5, track_timeout=3600)
+    for i in range(n_tracks):
+        fusion.fuse_track("camera1", i, rng.uniform(0, side), rng.uniform(0, side))
+    points = [(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(n_lookups)]
+
+    tracks = fusion.get_active_tracks()
+    start = time.perf_counter()
+    linear = [linear_scan(tracks, fusion.fusion_distance, x, y) for x, y in points]
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grid = [fusion._find_nearby_track(x, y) for x, y in points]
+    grid_time = time.perf_counter() - start
+
+    # both find a track for the same points; the grid may pick a nearer one
+    assert [g is None for g in linear] == [g is None for g in grid]
+    return n_lookups / linear_time, n_lookups / grid_time, fusion.get_track_count()
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'tracks':>6} | {'linear scan':>12} | {'spatial hash':>12} | speedup  (lookups/s)")
+    for n_tracks in (50, 500, 2000):
+        linear, grid, count = bench(n_tracks, rng)
+        print(f"{count:>6} | {linear:>12,.0f} | {grid:>12,.0f} | {grid / linear:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import traceback
+
 from . import db
 
 
@@ -47,3 +49,19 @@ class Camera(db.Model):
             "installation_height" : self.height_m,
             "serialno" : self.serialno
         }
+
+
+# Change notification for in-memory camera caches (see infrastructure/camera_registry.py)
+_camera_listeners = []
+
+def on_cameras_changed(callback):
+    """Register callback() to be called after cameras or their floorplan placement change."""
+    _camera_listeners.append(callback)
+    return callback
+
+def notify_cameras_changed():
+    for callback in list(_camera_listeners):
+        try:
+            callback()
+        except Exception:
+            traceback.print_exc()
@@ -35,7 +35,12 @@ class FusionData(db.Model):
 
     observations = db.Column(db.JSON)  # Raw per-frame bounding boxes
 
-    # Base64 encoded snapshot taken at highest confidence (if provided)
+    # Snapshot taken at highest confidence (if provided). The image itself lives
+    # in the content-addressed snapshot store; only its SHA-256 and size are kept here.
+    snapshot_hash = db.Column(db.String(64), index=True)
+    snapshot_size = db.Column(db.Integer)
+
+    # Legacy inline base64 snapshot, emptied by the snapshot backfill job
     snapshot_base64 = db.Column(db.Text)
 
     raw_payload = db.Column(db.JSON)
@@ -72,6 +77,11 @@ class FusionData(db.Model):
             if self.event_timestamp
             else None,
             "observations": self.observations,
+            "snapshot_hash": self.snapshot_hash,
+            "snapshot_size": self.snapshot_size,
+            "snapshot_url": f"/api/fusion/snapshots/{self.snapshot_hash}"
+            if self.snapshot_hash
+            else None,
             "snapshot_base64": self.snapshot_base64,
             "raw_payload": self.raw_payload,
             "created_at": self.created_at.isoformat() if self.created_at else None,
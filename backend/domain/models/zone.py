@@ -1,6 +1,8 @@
 from . import db
-from datetime import datetime
-from sqlalchemy import func, Time, Boolean, and_, or_, TypeDecorator, JSON
+from dataclasses import dataclass
+from datetime import datetime, date, time, timedelta
+from typing import FrozenSet, List, Optional, Tuple
+from sqlalchemy import func, Time, Boolean, TypeDecorator, JSON
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import joinedload
 import traceback
@@ -16,11 +18,14 @@ class PortableFloatArray(TypeDecorator):
         else:
             return dialect.type_descriptor(JSON())
 
+# BIGINT primary keys do not autoincrement in SQLite; only INTEGER aliases the rowid
+AutoBigInteger = db.BigInteger().with_variant(db.Integer, "sqlite")
+
 class Zone(db.Model):
     """Zone model storing polygon coordinates; bbox uses ARRAY in PostgreSQL, JSON in SQLite"""
     __tablename__ = "zones"
 
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(AutoBigInteger, primary_key=True)
     #floorplan_id = db.Column(db.BigInteger, nullable=False)
     floorplan_id = db.Column(
     db.Integer,
@@ -94,7 +99,7 @@ class Zone(db.Model):
 class ZoneSchedule(db.Model):
     __tablename__ = "zone_schedules"
 
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(AutoBigInteger, primary_key=True)
     zone_id = db.Column(db.BigInteger, db.ForeignKey("zones.id", ondelete="CASCADE"), nullable=False)
     type = db.Column(db.String(16), nullable=False)           # 'recurring' | 'one-time'
     # store selected days as JSON array for portability across DB backends
@@ -125,6 +130,116 @@ class ZoneSchedule(db.Model):
             "alarmMode": self.alarm_mode,
         }
  
+    def window(self):
+        """Detached, precompiled form of this schedule (see ScheduleWindow)."""
+        return ScheduleWindow.from_schedule(self)
+
+
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_END_OF_SECOND = timedelta(microseconds=1)  # end times are inclusive
+
+
+def _as_time(value) -> Optional[time]:
+    if value is None or isinstance(value, time):
+        return value
+    return time.fromisoformat(str(value))
+
+
+def _as_local_naive(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+@dataclass(frozen=True)
+class ScheduleWindow:
+    """
+    Time rules of one ZoneSchedule, detached from the session.
+    Same semantics as the old SQL filter: a recurring schedule is active on
+    its listed weekdays between start and end (inclusive); with spansNextDay it
+    is active from start until midnight and from midnight until end. A one-time
+    schedule is active between startDateTime and endDateTime. Local time.
+    """
+
+    id: Optional[int]
+    zone_id: Optional[int]
+    type: str
+    enabled: bool
+    weekdays: FrozenSet[int] = frozenset()
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    spans_next_day: Optional[bool] = None
+    start_dt: Optional[datetime] = None
+    end_dt: Optional[datetime] = None
+
+    @classmethod
+    def from_schedule(cls, schedule: "ZoneSchedule") -> "ScheduleWindow":
+        days = schedule.days if isinstance(schedule.days, (list, tuple)) else []
+        return cls(
+            id=int(schedule.id) if schedule.id is not None else None,
+            zone_id=int(schedule.zone_id) if schedule.zone_id is not None else None,
+            type=schedule.type,
+            enabled=schedule.enabled is None or bool(schedule.enabled),
+            weekdays=frozenset(_WEEKDAYS.index(d) for d in days if d in _WEEKDAYS),
+            start_time=_as_time(schedule.start_time),
+            end_time=_as_time(schedule.end_time),
+            spans_next_day=schedule.spans_next_day,
+            start_dt=_as_local_naive(schedule.start_dt),
+            end_dt=_as_local_naive(schedule.end_dt),
+        )
+
+    def intervals_on(self, day: date) -> List[Tuple[datetime, datetime]]:
+        """Half-open [start, end) intervals during which the schedule is active on `day`."""
+        if self.type == "one-time":
+            if self.start_dt is None or self.end_dt is None or self.start_dt > self.end_dt:
+                return []
+            return [(self.start_dt, self.end_dt + _END_OF_SECOND)]
+        if self.type != "recurring" or day.weekday() not in self.weekdays:
+            return []
+        if self.start_time is None or self.end_time is None or self.spans_next_day is None:
+            return []
+        start = datetime.combine(day, self.start_time)
+        end = datetime.combine(day, self.end_time) + _END_OF_SECOND
+        if not self.spans_next_day:
+            return [(start, end)] if start < end else []
+        midnight = datetime.combine(day, time.min)
+        return [(midnight, end), (start, midnight + timedelta(days=1))]
+
+    def is_active(self, at: datetime) -> bool:
+        return any(start <= at < end for start, end in self.intervals_on(at.date()))
+
+    def next_transition(self, after: datetime) -> Optional[datetime]:
+        """First instant after `after` at which is_active may change, or None if never."""
+        boundaries = [
+            edge
+            for offset in range(8)
+            for interval in self.intervals_on(after.date() + timedelta(days=offset))
+            for edge in interval
+            if edge > after
+        ]
+        return min(boundaries) if boundaries else None
+
+# Change notification for in-memory zone caches (see infrastructure/zone_index.py
+# and infrastructure/schedule_index.py)
+_zone_listeners = []
+
+def on_zones_changed(callback):
+    """Register callback(floorplan_id) to be called after zones of a floorplan or their schedules change."""
+    _zone_listeners.append(callback)
+    return callback
+
+def notify_zones_changed(floorplan_id=None):
+    """floorplan_id=None means 'unknown / everything'."""
+    for callback in list(_zone_listeners):
+        try:
+            callback(floorplan_id)
+        except Exception:
+            traceback.print_exc()
+
 # CRUD helpers for zones and schedules
 def create_zone(points, floorplan_id=None, name=None):
     meta = Zone.compute_meta(points)
@@ -137,12 +252,14 @@ def create_zone(points, floorplan_id=None, name=None):
     )
     db.session.add(z)
     db.session.commit()
+    notify_zones_changed(z.floorplan_id)
     return z.serialize()
 
 def update_zone(zone_id, points=None, name=None, floorplan_id=None):
     z = Zone.query.get(zone_id)
     if not z:
         return None
+    old_floorplan_id = z.floorplan_id
     if points is not None:
         meta = Zone.compute_meta(points)
         z.coordinates = points
@@ -153,14 +270,19 @@ def update_zone(zone_id, points=None, name=None, floorplan_id=None):
     if floorplan_id is not None:
         z.floorplan_id = floorplan_id
     db.session.commit()
+    notify_zones_changed(old_floorplan_id)
+    if z.floorplan_id != old_floorplan_id:
+        notify_zones_changed(z.floorplan_id)
     return z.serialize()
 
 def delete_zone(zone_id):
     z = Zone.query.get(zone_id)
     if not z:
         return False
+    floorplan_id = z.floorplan_id
     db.session.delete(z)
     db.session.commit()
+    notify_zones_changed(floorplan_id)
     return True
 
 def get_zones_for_floorplan(floorplan_id):
@@ -169,6 +291,10 @@ def get_zones_for_floorplan(floorplan_id):
     return [z.serialize() for z in qs]
 
 # Schedule helpers
+def _notify_schedule_changed(schedule):
+    zone = schedule.zone
+    notify_zones_changed(zone.floorplan_id if zone is not None else None)
+
 def create_schedule(zone_id, payload):
     # determine spans_next_day only for recurring schedules; one-time -> None
     schedule_type = payload.get("type", "recurring")
@@ -189,6 +315,7 @@ def create_schedule(zone_id, payload):
     )
     db.session.add(s)
     db.session.commit()
+    _notify_schedule_changed(s)
     return s.serialize()
 
 def update_schedule(schedule_id, payload):
@@ -210,14 +337,17 @@ def update_schedule(schedule_id, payload):
     if "enabled" in payload: s.enabled = bool(payload["enabled"])
     if "alarmMode" in payload: s.alarm_mode = payload["alarmMode"]
     db.session.commit()
+    _notify_schedule_changed(s)
     return s.serialize()
 
 def delete_schedule(schedule_id):
     s = ZoneSchedule.query.get(schedule_id)
     if not s:
         return False
+    zone = s.zone
     db.session.delete(s)
     db.session.commit()
+    notify_zones_changed(zone.floorplan_id if zone is not None else None)
     return True
 
 def get_schedules_for_zone(zone_id):
@@ -225,67 +355,22 @@ def get_schedules_for_zone(zone_id):
     return [s.serialize() for s in qs]
 
 
-def get_current_active_schedules(floorplan_id):
+def get_current_active_schedules(floorplan_id, now=None):
+    """(active, inactive) schedules of a floorplan: one query, partitioned in Python."""
     try:
-        now = datetime.now()
-        current_time = now.time()
-        weekday = now.strftime("%a")
-
-        all_zone_schedules_for_floorplan = (
+        now = now or datetime.now()
+        schedules = (
             ZoneSchedule.query
             .join(Zone)
             .filter(Zone.floorplan_id == floorplan_id)
-        )
-
-        # Check dialect for SQLite compatibility (testing environment)
-        if db.engine.dialect.name == 'sqlite':
-            # Fallback for SQLite: Cast JSON to string and search for the day
-            weekday_filter = ZoneSchedule.days.cast(db.String).like(f'%"{weekday}"%')
-        else:
-            # Production (PostgreSQL): Use the efficient JSONB containment operator
-            weekday_filter = ZoneSchedule.days.op("@>")([weekday])
-
-        recurring = and_(
-            ZoneSchedule.type == "recurring",
-            weekday_filter,
-            or_(
-                # normal same-day schedules
-                and_(
-                    ZoneSchedule.spans_next_day.is_(False),
-                    ZoneSchedule.start_time <= current_time,
-                    ZoneSchedule.end_time >= current_time,
-                ),
-                # schedules that span past midnight
-                and_(
-                    ZoneSchedule.spans_next_day.is_(True),
-                    or_(
-                        ZoneSchedule.start_time <= current_time,
-                        ZoneSchedule.end_time >= current_time,
-                    ),
-                ),
-            ),
-        )
-
-        one_time = and_(
-            ZoneSchedule.type == "one-time",
-            ZoneSchedule.start_dt <= now,
-            ZoneSchedule.end_dt >= now,
-        )
-
-        active = (
-            all_zone_schedules_for_floorplan
-            .filter(or_(recurring, one_time))
+            .order_by(ZoneSchedule.id)
             .all()
         )
-
-        inactive = (
-            all_zone_schedules_for_floorplan
-            .filter(~or_(recurring, one_time))
-            .all()
-        )
-
+        active, inactive = [], []
+        for schedule in schedules:
+            (active if schedule.window().is_active(now) else inactive).append(schedule)
         return active, inactive
 
     except Exception as e:
         traceback.print_exc()
-        return [], []
\ No newline at end of file
+        return [], []
@@ -0,0 +1,192 @@
+"""
+In-memory batch queue drained by one background thread.
+
+The write-behind buffers (FusionWriteBehind, EventSink, EventJournal) share
+this scaffold: producers ``put`` items without blocking, and the thread hands
+them to ``handler`` once ``max_batch`` items are pending or ``max_delay_ms``
+after the first one arrived. ``close`` stops the thread and hands over what is
+left. Without a running thread (e.g. tests, scripts) ``put`` calls the handler
+itself as soon as ``sync_threshold`` items are pending. A handler that cannot
+write a batch for now (database unreachable) gives it back with ``requeue``;
+the thread retries it after ``retry_delay_ms``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence
+
+
+class BatchQueue:
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Any],
+        max_batch: int,
+        max_delay_ms: int,
+        capacity: Optional[int] = None,
+        batch_limit: Optional[int] = None,
+        sync_threshold: int = 1,
+        retry_delay_ms: int = 1000,
+        name: str = "batch-queue",
+        label: str = "Batch",
+        log_fn: Optional[Callable[[str], None]] = None,
+    ):
+        if max_batch <= 0 or max_delay_ms <= 0:
+            raise ValueError("max_batch and max_delay_ms must be positive")
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.capacity = capacity  # None: unbounded
+        self.batch_limit = batch_limit  # items per handler call, None: everything pending
+        self.sync_threshold = sync_threshold
+        self.retry_delay = retry_delay_ms / 1000.0
+        self.name = name
+        self.label = label
+        self._handler = handler
+        self._log = log_fn or (lambda _msg: None)
+
+        self._items: List[Any] = []
+        self._first_at: Optional[float] = None
+        self._busy = 0  # items handed to the handler that it has not returned yet
+        self._retry_at: Optional[float] = None  # no hand-over before this after a requeue
+        self._requeued = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # one handler call at a time, in arrival order
+        self._thread = None
+        self._running = False
+
+        self.submitted = 0
+        self.dropped = 0
+        self.requeued = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    # ---- lifecycle ----
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 5.0):
+        """Stop the background thread, then hand everything still pending to the handler."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    # ---- producer side ----
+    def put(self, items: Sequence[Any]) -> int:
+        """Queue items. Never blocks; returns how many were accepted (the rest is dropped when full)."""
+        if not items:
+            return 0
+        with self._cond:
+            accepted = len(items)
+            if self.capacity is not None:
+                accepted = max(0, min(accepted, self.capacity - len(self._items)))
+            if accepted:
+                was_empty = not self._items
+                if was_empty:
+                    self._first_at = time.monotonic()
+                self._items.extend(items[:accepted])
+                # wake the thread to arm the delay timer, or to hand over right away
+                if was_empty or len(self._items) >= self.max_batch:
+                    self._cond.notify_all()
+            self.submitted += accepted
+            self.dropped += len(items) - accepted
+            handle_now = not self._running and len(self._items) >= self.sync_threshold
+        if handle_now:
+            self.flush()
+        return accepted
+
+    def requeue(self, items: Sequence[Any]):
+        """Give back items the handler could not write; they go first, after ``retry_delay``."""
+        if not items:
+            return
+        with self._cond:
+            self._items[:0] = items
+            self._first_at = self._first_at or time.monotonic()
+            self._retry_at = time.monotonic() + self.retry_delay
+            self._requeued = True
+            self.requeued += len(items)
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Wait until the thread has handled everything put so far. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._running and (self._items or self._busy):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # ---- consumer side ----
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    backoff = self._retry_at - time.monotonic() if self._retry_at is not None else 0
+                    if backoff > 0:
+                        self._cond.wait(backoff)
+                        continue
+                    if len(self._items) >= self.max_batch:
+                        break
+                    if self._items:
+                        remaining = self._first_at + self.max_delay - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if not self._running:
+                    return
+            self._handle_batch()
+
+    def flush(self) -> int:
+        """
+        Hand everything pending to the handler now. Returns the sum of the
+        handler's results. Stops at the first batch that is requeued.
+        """
+        total = 0
+        while True:
+            result, requeued = self._handle_batch()
+            total += result or 0
+            if result is None or requeued:
+                return total
+
+    def _handle_batch(self):
+        """(handler result or None when nothing was pending, whether the batch was requeued)"""
+        with self._flush_lock:
+            with self._cond:
+                if not self._items:
+                    return None, False
+                limit = len(self._items) if self.batch_limit is None else self.batch_limit
+                batch, self._items = self._items[:limit], self._items[limit:]
+                if not self._items:
+                    self._first_at = None
+                self._busy += len(batch)
+                self._retry_at = None
+                self._requeued = False
+            try:
+                result = self._handler(batch) or 0
+            except Exception as exc:
+                self._log(f"[{self.label}] Failed to write {len(batch)} items: {exc}")
+                result = 0
+            with self._cond:
+                self._busy -= len(batch)
+                self._cond.notify_all()
+                return result, self._requeued
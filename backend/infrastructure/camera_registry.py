@@ -0,0 +1,175 @@
+"""
+In-memory camera registry: Axis serial / camera id -> camera, floorplan and stream info.
+
+The whole ``cameras`` table (a handful of rows) is loaded with its floorplans in
+one query at startup and kept as an immutable snapshot, so the MQTT hot path
+resolves a serial with a dict lookup instead of a SELECT per message. The
+camera and floorplan routes call ``notify_cameras_changed`` after writes, which
+drops the snapshot; it is also reloaded every ``CAMERA_REGISTRY_TTL`` seconds
+so that changes made by another process are eventually picked up.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import joinedload
+
+from domain.models.camera import Camera, on_cameras_changed
+
+CAMERA_REGISTRY_TTL = float(os.getenv("CAMERA_REGISTRY_TTL", 300))
+CAMERA_USER = os.getenv("camera_login", "student")
+CAMERA_PASS = os.getenv("camera_password", "student")
+
+
+def rtsp_url_for(ip_address: str) -> str:
+    return f"rtsp://{CAMERA_USER}:{CAMERA_PASS}@{ip_address}/axis-media/media.amp"
+
+
+@dataclass(frozen=True)
+class CameraInfo:
+    id: int
+    serial: Optional[str]
+    ip_address: str
+    floorplan_id: Optional[int]
+    bottom_left: Optional[Tuple[float, float]]  # floorplan origin (lat, lon), input to FloorplanManager
+    rtsp_url: str
+
+
+def _bottom_left(floorplan) -> Optional[Tuple[float, float]]:
+    corners = floorplan.corner_geocoordinates if floorplan is not None else None
+    if not isinstance(corners, dict):
+        return None
+    point = corners.get("bottom_left")
+    try:
+        return float(point[0]), float(point[1])
+    except (TypeError, ValueError, IndexError, KeyError):
+        return None
+
+
+def build_camera_info(camera) -> CameraInfo:
+    return CameraInfo(
+        id=int(camera.id),
+        serial=camera.serialno.upper() if camera.serialno else None,
+        ip_address=camera.ip_address,
+        floorplan_id=camera.floorplan_id,
+        bottom_left=_bottom_left(camera.floorplan) if camera.floorplan_id is not None else None,
+        rtsp_url=rtsp_url_for(camera.ip_address),
+    )
+
+
+def _load_cameras() -> List[Any]:
+    return Camera.query.options(joinedload(Camera.floorplan)).all()
+
+
+class CameraRegistry:
+    def __init__(
+        self,
+        loader: Callable[[], List[Any]] = _load_cameras,
+        ttl_seconds: float = CAMERA_REGISTRY_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._loader = loader
+        self.ttl = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (by_serial, by_id, loaded_at); None until the first load or after an invalidation
+        self._snapshot: Optional[Tuple[Dict[str, CameraInfo], Dict[int, CameraInfo], float]] = None
+        self._stale: Optional[Tuple[Dict[str, CameraInfo], Dict[int, CameraInfo], float]] = None
+        # bumped on every invalidation so a load racing with a camera write is not cached
+        self._generation = 0
+
+        self._hits = 0
+        self._loads = 0
+        self._load_errors = 0
+        self._invalidations = 0
+
+    def load(self):
+        """(Re)load every camera from the database. Needs an app context."""
+        with self._lock:
+            generation = self._generation
+
+        by_serial: Dict[str, CameraInfo] = {}
+        by_id: Dict[int, CameraInfo] = {}
+        for row in self._loader():
+            info = build_camera_info(row)
+            by_id[info.id] = info
+            if info.serial:
+                by_serial[info.serial] = info
+        snapshot = (by_serial, by_id, self._clock())
+
+        with self._lock:
+            self._loads += 1
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def _current(self):
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and self._clock() - snapshot[2] <= self.ttl:
+                self._hits += 1
+                return snapshot
+            fallback = snapshot or self._stale
+        try:
+            return self.load()
+        except Exception:
+            # e.g. called from a worker thread without an app context
+            with self._lock:
+                self._load_errors += 1
+            if fallback is None:
+                traceback.print_exc()
+                return {}, {}, 0.0
+            return fallback
+
+    def by_serial(self, serial: Optional[str]) -> Optional[CameraInfo]:
+        if not serial:
+            return None
+        return self._current()[0].get(str(serial).upper())
+
+    def by_id(self, camera_id) -> Optional[CameraInfo]:
+        try:
+            camera_id = int(camera_id)
+        except (TypeError, ValueError):
+            return None
+        return self._current()[1].get(camera_id)
+
+    def cameras(self) -> List[CameraInfo]:
+        return list(self._current()[1].values())
+
+    def rtsp_url(self, camera_id) -> Optional[str]:
+        info = self.by_id(camera_id)
+        return info.rtsp_url if info is not None else None
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            if self._snapshot is not None:
+                self._stale = self._snapshot
+            self._snapshot = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                "cameras": len(snapshot[1]) if snapshot else 0,
+                "hits": self._hits,
+                "loads": self._loads,
+                "load_errors": self._load_errors,
+                "invalidations": self._invalidations,
+                "ttl_seconds": self.ttl,
+            }
+
+
+camera_registry = CameraRegistry()
+on_cameras_changed(camera_registry.invalidate)
+
+
+def get_camera_registry_stats() -> Dict[str, Any]:
+    return camera_registry.stats()
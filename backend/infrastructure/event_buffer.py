@@ -0,0 +1,74 @@
+"""Fixed-capacity ring buffer for MQTT events with cursor-based reads."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class EventRingBuffer:
+    """
+    Stores the most recent ``capacity`` events in a preallocated list.
+
+    Every appended event gets a monotonically increasing sequence number.
+    Consumers keep the cursor returned by :meth:`read_since` and pass it back
+    on the next call, so each event is handed to a consumer exactly once.
+    Appending never shifts existing entries, so it stays O(1) regardless of
+    how full the buffer is.
+    """
+
+    def __init__(self, capacity: int = 200):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._slots: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._next_seq = 0  # sequence number the next appended event will get
+        self._lock = threading.Lock()
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """Store an event and return its sequence number."""
+        with self._lock:
+            seq = self._next_seq
+            self._slots[seq % self.capacity] = event
+            self._next_seq = seq + 1
+            return seq
+
+    def cursor(self) -> int:
+        """Cursor positioned after the newest event (i.e. "only new events")."""
+        with self._lock:
+            return self._next_seq
+
+    def oldest_seq(self) -> int:
+        """Sequence number of the oldest event still held in the buffer."""
+        with self._lock:
+            return max(0, self._next_seq - self.capacity)
+
+    def read_since(
+        self, cursor: int, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Return ``(events, next_cursor)`` for every event with seq >= cursor.
+
+        If the consumer fell so far behind that some events were overwritten,
+        reading resumes at the oldest event still available. ``limit`` caps
+        how many events are returned; the returned cursor then points at the
+        first event that was not returned.
+        """
+        with self._lock:
+            end = self._next_seq
+            start = max(cursor, end - self.capacity, 0)
+            if limit is not None:
+                end = min(end, start + limit)
+            events = [self._slots[seq % self.capacity] for seq in range(start, end)]
+            return events, end
+
+    def latest(self, count: int) -> List[Dict[str, Any]]:
+        """Return up to ``count`` of the most recent events, oldest first."""
+        with self._lock:
+            end = self._next_seq
+            start = max(end - min(count, self.capacity), 0)
+            return [self._slots[seq % self.capacity] for seq in range(start, end)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return min(self._next_seq, self.capacity)
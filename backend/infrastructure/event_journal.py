@@ -0,0 +1,268 @@
+"""
+Append-only journal of intrusion / zone events.
+
+``save_event_json`` used to write one pretty-printed JSON file per event under
+``EVENT_DIR``; bursts left directories with hundreds of thousands of small
+files. Events now go to one JSON-lines file per day,
+``events-YYYYMMDD.jsonl``, in ``EVENT_JOURNAL_DIR``:
+
+- ``append`` only enqueues; a background thread (see BatchQueue) writes
+  whatever is queued (up to ``max_batch`` events, at most ``max_delay_ms``
+  after the first one) and fsyncs each touched file once per batch (group
+  fsync).
+- Each line is ``{"ts": <unix time>, "camera_id": ..., "data": {...}}``.
+- Next to every journal file an offset index ``events-YYYYMMDD.idx`` holds one
+  fixed-size record (time, camera id, byte offset, length) per line, written
+  after the journal itself. An index that misses lines of its journal (crash
+  between the two writes) is rebuilt from the journal when it is loaded.
+- ``read_range(start, end, camera_id)`` binary-searches the day indexes and
+  reads only the matching lines.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+import json
+import os
+import struct
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from infrastructure.batch_queue import BatchQueue
+from infrastructure.fusion_decoder import loads as decode_json
+
+EVENT_JOURNAL_DIR = os.getenv("EVENT_JOURNAL_DIR", os.path.join(os.getenv("EVENT_DIR", "events"), "journal"))
+EVENT_JOURNAL_BATCH = int(os.getenv("EVENT_JOURNAL_BATCH", 256))
+EVENT_JOURNAL_FLUSH_MS = int(os.getenv("EVENT_JOURNAL_FLUSH_MS", 100))
+EVENT_JOURNAL_QUEUE_SIZE = int(os.getenv("EVENT_JOURNAL_QUEUE_SIZE", 10000))
+
+# time (unix seconds), camera id (-1 = none), byte offset, line length
+_INDEX_RECORD = struct.Struct("<dqQI")
+_NO_CAMERA = -1
+
+# (ts, camera, offset, length); kept sorted by ts
+IndexEntry = Tuple[float, int, int, int]
+
+
+def _camera_key(camera_id) -> int:
+    try:
+        return int(camera_id)
+    except (TypeError, ValueError):
+        return _NO_CAMERA
+
+
+def _day(at: datetime.datetime) -> str:
+    return at.strftime("%Y%m%d")
+
+
+class EventJournal:
+    def __init__(
+        self,
+        directory: str = EVENT_JOURNAL_DIR,
+        max_batch: int = EVENT_JOURNAL_BATCH,
+        max_delay_ms: int = EVENT_JOURNAL_FLUSH_MS,
+        queue_size: int = EVENT_JOURNAL_QUEUE_SIZE,
+        fsync: Callable[[int], None] = os.fsync,
+        log_fn: Optional[Callable[[str], None]] = None,
+    ):
+        self.directory = directory
+        self._fsync = fsync
+        self._log = log_fn or print
+        self._queue = BatchQueue(
+            self.write,
+            max_batch=max_batch,
+            max_delay_ms=max_delay_ms,
+            capacity=queue_size,
+            batch_limit=max_batch,
+            name="event-journal",
+            label="Journal",
+            log_fn=self._log,
+        )
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self._lock = threading.Lock()  # counters
+        self._io_lock = threading.Lock()  # journal/index files + loaded indexes
+        self._indexes: Dict[str, List[IndexEntry]] = {}
+
+        # metrics
+        self._written = 0
+        self._batches = 0
+        self._fsyncs = 0
+
+    # ---- paths ----
+    def journal_path(self, day: str) -> str:
+        return os.path.join(self.directory, f"events-{day}.jsonl")
+
+    def index_path(self, day: str) -> str:
+        return os.path.join(self.directory, f"events-{day}.idx")
+
+    def days(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(n[len("events-"):-len(".jsonl")] for n in names if n.startswith("events-") and n.endswith(".jsonl"))
+
+    # ---- lifecycle ----
+    def start(self):
+        self._queue.start()
+
+    def close(self, timeout: float = 5.0):
+        """Stop the writer thread after writing everything still queued."""
+        self._queue.close(timeout)
+
+    # ---- producer side ----
+    def append(self, camera_id: Any, data: Dict[str, Any], at: Optional[datetime.datetime] = None) -> bool:
+        """Queue an event (local time `at`, default now). Never blocks; returns False if it was dropped."""
+        if not self._queue.put([(at or datetime.datetime.now(), camera_id, data)]):
+            self._log(f"[Journal] Queue full, dropped event of camera {camera_id}")
+            return False
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything appended so far is on disk. Returns False on timeout."""
+        return self._queue.wait_idle(timeout)
+
+    # ---- consumer side ----
+    def write(self, entries: Sequence[Tuple[datetime.datetime, Any, Dict[str, Any]]]) -> int:
+        """Append entries to their day files with one fsync per file. Returns how many were written."""
+        if not entries:
+            return 0
+        by_day: Dict[str, List[Tuple[float, int, bytes]]] = {}
+        for at, camera_id, data in entries:
+            ts = at.timestamp()
+            line = json.dumps({"ts": ts, "camera_id": camera_id, "data": data}, default=str, separators=(",", ":"))
+            by_day.setdefault(_day(at), []).append((ts, _camera_key(camera_id), line.encode("utf-8") + b"\n"))
+
+        fsyncs = 0
+        with self._io_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            for day, lines in by_day.items():
+                index_entries = []
+                with open(self.journal_path(day), "a+b") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    if offset:
+                        f.seek(offset - 1)
+                        if f.read(1) != b"\n":  # torn last line: keep it from swallowing ours
+                            f.write(b"\n")
+                            offset += 1
+                    for ts, camera, line in lines:
+                        index_entries.append((ts, camera, offset, len(line)))
+                        offset += len(line)
+                    f.write(b"".join(line for _, _, line in lines))
+                    f.flush()
+                    self._fsync(f.fileno())
+                    fsyncs += 1
+                # the index only points at lines that are already durable
+                with open(self.index_path(day), "ab") as f:
+                    torn = f.tell() % _INDEX_RECORD.size
+                    if torn:  # partial record from an interrupted write
+                        f.truncate(f.tell() - torn)
+                    f.write(b"".join(_INDEX_RECORD.pack(*entry) for entry in index_entries))
+                loaded = self._indexes.get(day)
+                if loaded is not None:
+                    for entry in index_entries:
+                        bisect.insort(loaded, entry)
+
+        with self._lock:
+            self._batches += 1
+            self._written += len(entries)
+            self._fsyncs += fsyncs
+        return len(entries)
+
+    # ---- reader side ----
+    def _index(self, day: str) -> List[IndexEntry]:
+        with self._io_lock:
+            entries = self._indexes.get(day)
+            if entries is None:
+                entries = self._load_index(day)
+                self._indexes[day] = entries
+            return entries
+
+    def _load_index(self, day: str) -> List[IndexEntry]:
+        try:
+            with open(self.index_path(day), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        usable = len(raw) - len(raw) % _INDEX_RECORD.size
+        entries: List[IndexEntry] = list(_INDEX_RECORD.iter_unpack(raw[:usable]))
+        end = max((offset + length for _, _, offset, length in entries), default=0)
+        rebuild = usable != len(raw)
+        if sum(length for _, _, _, length in entries) != end:
+            entries, end, rebuild = [], 0, True  # index has holes: rebuild it from the journal
+
+        # lines written after the last index record
+        try:
+            with open(self.journal_path(day), "rb") as f:
+                f.seek(end)
+                tail = f.read()
+        except FileNotFoundError:
+            return sorted(entries)
+        offset, recovered = end, []
+        for line in tail.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # partially written last line
+            try:
+                record = decode_json(line)
+                recovered.append((float(record["ts"]), _camera_key(record.get("camera_id")), offset, len(line)))
+            except (ValueError, KeyError, TypeError):
+                pass
+            offset += len(line)
+
+        entries.extend(recovered)
+        if recovered or rebuild:
+            with open(self.index_path(day), "wb") as f:
+                f.write(b"".join(_INDEX_RECORD.pack(*entry) for entry in entries))
+        entries.sort()
+        return entries
+
+    def read_range(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        camera_id: Any = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream journal records with start <= time < end (local time), oldest
+        first, optionally for one camera. Events still queued are not included;
+        call flush() first when that matters.
+        """
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        camera = _camera_key(camera_id) if camera_id is not None else None
+        day = start.date()
+        while day <= end.date():
+            key = day.strftime("%Y%m%d")
+            day += datetime.timedelta(days=1)
+            entries = self._index(key)
+            lo = bisect.bisect_left(entries, (start_ts,))
+            hi = bisect.bisect_left(entries, (end_ts,))
+            selected = [e for e in entries[lo:hi] if camera is None or e[1] == camera]
+            if not selected:
+                continue
+            with open(self.journal_path(key), "rb") as f:
+                for _, _, offset, length in selected:
+                    f.seek(offset)
+                    yield decode_json(f.read(length))
+
+    # ---- metrics ----
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._queue.running,
+                "queued": self._queue.pending,
+                "appended": self._queue.submitted,
+                "dropped": self._queue.dropped,
+                "written": self._written,
+                "batches": self._batches,
+                "fsyncs": self._fsyncs,
+                "directory": self.directory,
+            }
+
+
+event_journal = EventJournal()
+
+
+def get_event_journal_stats() -> Dict[str, Any]:
+    return event_journal.stats()
@@ -0,0 +1,229 @@
+"""
+In-process sink for intrusion events (Recording + Snapshot + EventLog rows).
+
+trigger_intrusion used to persist its event with an HTTP POST to
+/internal/create on localhost, which cost a round trip, blocked for up to 2 s
+and broke whenever the server was not on that port. It now calls
+``event_sink.submit`` which only enqueues; a background thread (see
+BatchQueue) writes queued events in batches of up to ``max_batch`` per
+transaction, at most ``max_delay_ms`` after the first one arrived; while the
+database is unreachable the queued events are kept and retried. The
+/internal/create route uses ``event_sink.write`` for a synchronous insert
+through the same code.
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from flask import has_app_context
+from sqlalchemy.exc import DataError, IntegrityError
+
+from domain.models import EventLog, Recording, Snapshot, db
+from infrastructure.batch_queue import BatchQueue
+from infrastructure.fusion_writer import is_database_unavailable
+
+EVENT_SINK_BATCH = int(os.getenv("EVENT_SINK_BATCH", 50))
+EVENT_SINK_FLUSH_MS = int(os.getenv("EVENT_SINK_FLUSH_MS", 200))
+EVENT_SINK_QUEUE_SIZE = int(os.getenv("EVENT_SINK_QUEUE_SIZE", 1000))
+
+
+@dataclass(frozen=True)
+class IntrusionEvent:
+    camera_id: int
+    timestamp: str  # YYYYMMDDHHMMSS
+    clip_path: str
+    snapshot_path: Optional[str] = None
+
+    @property
+    def recording_id(self) -> int:
+        # camera id + timestamp, see Recording
+        return int(f"{self.camera_id}{self.timestamp}")
+
+    @property
+    def occurred_at(self) -> datetime.datetime:
+        return datetime.datetime.strptime(self.timestamp, "%Y%m%d%H%M%S")
+
+
+def build_event(data: Dict[str, Any]) -> IntrusionEvent:
+    """IntrusionEvent from the /internal/create JSON body. Raises ValueError if it is unusable."""
+    camera_id = data.get("camera_id")
+    timestamp = data.get("timestamp")
+    clip_path = data.get("clip_path")
+    if not all([camera_id, timestamp, clip_path]):
+        raise ValueError("Missing required fields")
+    event = IntrusionEvent(camera_id, str(timestamp), clip_path, data.get("snapshot_path"))
+    event.occurred_at  # validates the timestamp format
+    return event
+
+
+def _add_event(event: IntrusionEvent) -> EventLog:
+    recording = Recording(recording_id=event.recording_id, url=event.clip_path)
+    db.session.add(recording)
+    if event.snapshot_path:
+        db.session.add(Snapshot(recording_id=event.recording_id, url=event.snapshot_path, timestamp=event.occurred_at))
+    # EventLog without zone_id (the column is missing on older databases)
+    event_log = EventLog()
+    event_log.recordings.append(recording)
+    db.session.add(event_log)
+    return event_log
+
+
+class EventSink:
+    def __init__(
+        self,
+        flask_app=None,
+        max_batch: int = EVENT_SINK_BATCH,
+        max_delay_ms: int = EVENT_SINK_FLUSH_MS,
+        queue_size: int = EVENT_SINK_QUEUE_SIZE,
+        log_fn: Optional[Callable[[str], None]] = None,
+    ):
+        self.flask_app = flask_app
+        self._log = log_fn or print
+        self._queue = BatchQueue(
+            self._write_queued,
+            max_batch=max_batch,
+            max_delay_ms=max_delay_ms,
+            capacity=queue_size,
+            batch_limit=max_batch,
+            name="event-sink",
+            label="EventSink",
+            log_fn=self._log,
+        )
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self._lock = threading.Lock()
+
+        # metrics
+        self._written = 0
+        self._failed = 0
+        self._deferred = 0
+        self._batches = 0
+        self._max_batch_size = 0
+
+    # ---- lifecycle ----
+    def start(self):
+        self._queue.start()
+
+    def close(self, timeout: float = 5.0):
+        """Stop the background thread after writing everything still queued."""
+        self._queue.close(timeout)
+
+    # ---- producer side ----
+    def submit(self, event: IntrusionEvent) -> bool:
+        """Queue an event for the background writer. Never blocks; returns False if it was dropped."""
+        if not self._queue.put([event]):
+            self._log(f"[EventSink] Queue full, dropped event {event.recording_id}")
+            return False
+        return True
+
+    # ---- consumer side ----
+    def _write_queued(self, events: List[IntrusionEvent]) -> int:
+        stored, settled, error = self._write(events)
+        if error is not None and is_database_unavailable(error):
+            self._log(f"[EventSink] Database unavailable, keeping {len(events) - settled} events for retry")
+            self._queue.requeue(events[settled:])
+            with self._lock:
+                self._deferred += 1
+        else:
+            self._count_failed(len(events) - settled)
+        return len(stored)
+
+    def write(self, events: Sequence[IntrusionEvent]) -> List[Tuple[int, Optional[int]]]:
+        """
+        Insert events in one transaction; returns (recording_id, event_id) per
+        stored event. If the batch fails on bad data (e.g. a duplicate
+        recording id) the events are retried one by one so a bad event does
+        not lose the others. Other errors (database unreachable) fail the
+        events left without retrying each of them.
+        """
+        stored, settled, _error = self._write(events)
+        self._count_failed(len(events) - settled)
+        return stored
+
+    def _write(self, events: Sequence[IntrusionEvent]):
+        """
+        (stored rows, number of leading events settled, error that stopped the
+        rest). Settled events were stored or rejected for their data; the
+        caller decides what happens to the others.
+        """
+        if not events:
+            return [], 0, None
+        stored: List[Tuple[int, Optional[int]]] = []
+        settled = 0
+        error = None
+        own_context = self.flask_app is not None and not has_app_context()
+        context = self.flask_app.app_context() if own_context else nullcontext()
+        with context:
+            try:
+                try:
+                    stored = self._insert(events)
+                    settled = len(events)
+                except (IntegrityError, DataError):
+                    db.session.rollback()
+                    for event in events:
+                        stored.extend(self._insert_one(event))
+                        settled += 1
+            except Exception as exc:
+                db.session.rollback()
+                self._log(f"[EventSink] Failed to store {len(events) - settled} events: {exc}")
+                error = exc
+            finally:
+                if own_context:
+                    db.session.remove()
+
+        with self._lock:
+            self._batches += 1
+            self._written += len(stored)
+            self._failed += settled - len(stored)
+            self._max_batch_size = max(self._max_batch_size, len(events))
+        return stored, settled, error
+
+    def _count_failed(self, count: int):
+        if count:
+            with self._lock:
+                self._failed += count
+
+    def _insert_one(self, event: IntrusionEvent) -> List[Tuple[int, Optional[int]]]:
+        try:
+            return self._insert([event])
+        except (IntegrityError, DataError) as exc:
+            db.session.rollback()
+            self._log(f"[EventSink] Failed to store event {event.recording_id}: {exc}")
+            return []
+
+    @staticmethod
+    def _insert(events: Sequence[IntrusionEvent]) -> List[Tuple[int, Optional[int]]]:
+        logs = [(event.recording_id, _add_event(event)) for event in events]
+        db.session.commit()
+        return [(recording_id, event_log.id) for recording_id, event_log in logs]
+
+    # ---- metrics ----
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._queue.running,
+                "queued": self._queue.pending,
+                "submitted": self._queue.submitted,
+                "dropped": self._queue.dropped,
+                "written": self._written,
+                "failed": self._failed,
+                "deferred_batches": self._deferred,
+                "requeued": self._queue.requeued,
+                "batches": self._batches,
+                "max_batch_size": self._max_batch_size,
+                "max_batch": self.max_batch,
+                "max_delay_ms": int(self.max_delay * 1000),
+            }
+
+
+event_sink = EventSink()
+
+
+def get_event_sink_stats() -> Dict[str, Any]:
+    return event_sink.stats()
@@ -6,7 +6,14 @@ import cv2
 import numpy as np
 from shapely.geometry import Polygon, LineString, Point
 
-    
+# Origin for cameras without a georeferenced floorplan (KY25, which every
+# position used to be computed against)
+DEFAULT_BOTTOM_LEFT = (
+    float(os.getenv("DEFAULT_BOTTOM_LEFT_LAT", 58.39590610056573)),
+    float(os.getenv("DEFAULT_BOTTOM_LEFT_LON", 15.577997451724473)),
+)
+
+
 class FloorplanManager:
     @staticmethod
     def meters_to_lat(delta_m):
@@ -52,42 +59,22 @@ class FloorplanManager:
         }
     
     @staticmethod
-    def calculate_position_on_floorplan(object_lat, object_lon, bottom_left_coords):
-        # bottom_lat, bottom_lon = bottom_left_coords
-        # [58.395905940369715, 15.577995083109268]
-        
-        # [58.39775780178047, 15.576700990688561]
-        
-        # KY25:
-        bottom_lat = 58.39590610056573
-        bottom_lon = 15.577997451724473
-
-        # KAMERARUMMET:
-        # bottom_lat = 58.39775780178047
-        # bottom_lon = 15.576700990688561
-
-        # ISYTAN BG22:
-        # bottom_lat = 58.398507956731734
-        # bottom_lon = 15.576679088842802
-        
-        print(f"object_lat : {object_lat}")
-        print(f"object_lon : {object_lon}")
-        print(f"bottom_lat : {bottom_lat}")
-        print(f"bottom_lon : {bottom_lon}")
-
+    def calculate_position_on_floorplan(object_lat, object_lon, bottom_left_coords=None):
+        """
+        Meters east (x_m) and north (y_m) of the floorplan's bottom-left corner.
+        Without bottom_left_coords (camera not placed on a georeferenced
+        floorplan) the DEFAULT_BOTTOM_LEFT origin is used.
+        """
+        if bottom_left_coords is None:
+            bottom_left_coords = DEFAULT_BOTTOM_LEFT
+        bottom_lat, bottom_lon = map(float, bottom_left_coords)
 
         delta_lat = object_lat - bottom_lat
         delta_lon = object_lon - bottom_lon
 
-        print(f"delta_lat : {delta_lat}")
-        print(f"delta_lon : {delta_lon}")
-
-
         y_m = FloorplanManager.lat_to_meters(delta_lat)
         x_m = FloorplanManager.lon_to_meters(delta_lon, object_lat)
-        print(f"x_m : {x_m}")
-        print(f"y_m : {y_m}")
-        
+
         return {"x_m": abs(x_m), "y_m": abs(y_m)}
 
         
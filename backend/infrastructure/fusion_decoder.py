@@ -0,0 +1,141 @@
+"""
+Fast-path decoding of Axis fusion / scene-description payloads.
+
+Tracks that use the canonical Axis layout (``track_id``, ``class``, ``bounding_box``,
+``geoposition`` ...) are read directly into a compact :class:`FusionTrack`.
+Anything else returns ``None`` so the caller can fall back to the key-probing
+helpers in ``fusion_persistence``.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+try:  # optional, noticeably faster than the stdlib for large payloads
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(raw):
+    """Decode a JSON document from bytes or str, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@dataclass(slots=True)
+class FusionTrack:
+    """One track of a fusion message, flattened to the fields we persist."""
+
+    track_id: str
+    confidence: Optional[float]
+    class_type: Optional[str]
+    class_score: Optional[float]
+    upper_clothing_colors: Optional[List[str]]
+    lower_clothing_colors: Optional[List[str]]
+    bbox_top: Optional[float]
+    bbox_bottom: Optional[float]
+    bbox_left: Optional[float]
+    bbox_right: Optional[float]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    speed: Optional[float]
+    timestamp: Optional[str]  # track-level timestamp as sent
+    observation_timestamp: Optional[str]  # timestamp of the latest observation
+    start_time: Optional[str]
+    observations: Any
+    snapshot: Optional[str]
+    raw: Dict[str, Any]
+
+    def bbox_center(self):
+        if None in (self.bbox_left, self.bbox_right, self.bbox_top, self.bbox_bottom):
+            return None
+        return (
+            (self.bbox_left + self.bbox_right) / 2.0,
+            (self.bbox_top + self.bbox_bottom) / 2.0,
+        )
+
+    def geoposition(self):
+        return {"latitude": self.latitude, "longitude": self.longitude}
+
+
+def _colors(value) -> Optional[List[str]]:
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        return [value]
+    return None
+
+
+def decode_axis_track(track: Dict[str, Any]) -> Optional[FusionTrack]:
+    """
+    Decode a track in the canonical Axis layout, or return None if the track
+    uses any alternative key that needs the probing fallback.
+    """
+    track_id = track.get("track_id")
+    cls = track.get("class")
+    bbox = track.get("bounding_box")
+    geo = track.get("geoposition")
+    if track_id is None or not isinstance(cls, dict) or not bbox or not geo:
+        return None
+    if not isinstance(bbox, dict) or not isinstance(geo, dict):
+        return None
+
+    upper = cls.get("upper_clothing_colors")
+    lower = cls.get("lower_clothing_colors")
+    if (upper is None or lower is None) and (
+        "clothing" in track
+        or "upper_clothing_colors" in track
+        or "lower_clothing_colors" in track
+    ):
+        return None
+
+    speed = track.get("speed")
+    if speed is None:
+        if "velocity" in track:
+            return None
+    elif isinstance(speed, (int, float)) and not isinstance(speed, bool) and speed:
+        speed = float(speed)
+    else:
+        return None  # vector / zero speeds go through the generic extractor
+
+    obs_timestamp = None
+    observations = track.get("observations")
+    if isinstance(observations, list) and observations:
+        last = observations[-1]
+        if isinstance(last, dict):
+            obs_timestamp = last.get("timestamp")
+
+    snapshot = track.get("snapshot") or track.get("image")
+    if isinstance(snapshot, dict):
+        snapshot = snapshot.get("data") or snapshot.get("base64")
+    elif not isinstance(snapshot, str):
+        snapshot = None
+
+    score = cls.get("score")
+    return FusionTrack(
+        track_id=str(track_id),
+        confidence=track.get("confidence") or track.get("probability") or score,
+        class_type=cls.get("type"),
+        class_score=score,
+        upper_clothing_colors=_colors(upper),
+        lower_clothing_colors=_colors(lower),
+        bbox_top=bbox.get("top"),
+        bbox_bottom=bbox.get("bottom"),
+        bbox_left=bbox.get("left"),
+        bbox_right=bbox.get("right"),
+        latitude=geo.get("latitude") or geo.get("lat"),
+        longitude=geo.get("longitude") or geo.get("lon") or geo.get("lng"),
+        speed=speed,
+        timestamp=track.get("timestamp") or track.get("time"),
+        observation_timestamp=obs_timestamp,
+        start_time=track.get("start_time") or track.get("first_seen"),
+        observations=observations or track.get("history"),
+        snapshot=snapshot,
+        raw=track,
+    )
@@ -3,19 +3,41 @@
 from __future__ import annotations
 
 import datetime
-import math
 import os
 import re
 from contextlib import nullcontext
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from sqlalchemy import insert
+
 from domain.models import FusionData, db
+from infrastructure.fusion_decoder import FusionTrack, decode_axis_track
+from infrastructure.motion_table import MotionTable
+from infrastructure.ttl_cache import BoundedTTLCache
+from infrastructure.snapshot_store import snapshot_store
 
 FUSION_TOPIC_RE = re.compile(r"^axis/([^/]+)/analytics/fusion(?:/.*)?$", re.IGNORECASE)
 FUSION_MIN_SPEED_MPS = float(os.getenv("FUSION_MIN_SPEED_MPS", 0.3))
 FUSION_MIN_DISTANCE_M = float(os.getenv("FUSION_MIN_DISTANCE_M", 0.4))
+# Decode canonical Axis tracks directly instead of probing alternative keys
+FUSION_FAST_DECODER = os.getenv("FUSION_FAST_DECODER", "1") not in ("0", "false", "False")
+
+FUSION_MOTION_CACHE_SIZE = int(os.getenv("FUSION_MOTION_CACHE_SIZE", 10000))
+FUSION_MOTION_CACHE_TTL = float(os.getenv("FUSION_MOTION_CACHE_TTL", 300))
+# Messages with fewer tracks are checked track by track (see bench_motion_table.py)
+FUSION_MOTION_VECTORIZE_FROM = int(os.getenv("FUSION_MOTION_VECTORIZE_FROM", 32))
+
+# Last known position per track_id. Bounded + expiring because Axis track ids
+# keep increasing and old tracks never come back.
+_track_motion_cache = MotionTable(
+    max_size=FUSION_MOTION_CACHE_SIZE,
+    ttl_seconds=FUSION_MOTION_CACHE_TTL,
+    vectorize_from=FUSION_MOTION_VECTORIZE_FROM,
+)
 
-_track_motion_cache: Dict[str, Dict[str, Any]] = {}
+# Track-list path that matched last time, per camera serial
+FUSION_LAYOUT_CACHE_SIZE = int(os.getenv("FUSION_LAYOUT_CACHE_SIZE", 256))
+_layout_cache = BoundedTTLCache(max_size=FUSION_LAYOUT_CACHE_SIZE, ttl_seconds=24 * 3600)
 
 
 def is_fusion_topic(topic: str) -> bool:
@@ -165,61 +187,78 @@ def _extract_speed(track: Dict[str, Any]) -> Optional[float]:
     return None
 
 
-def _extract_tracks(payload: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
-    """Yield normalized per-track payloads according to Axis fusion schema."""
-
-    def _pluck(candidate: Any) -> Iterable[Dict[str, Any]]:
-        if isinstance(candidate, list):
-            for item in candidate:
-                if isinstance(item, dict):
-                    yield item
-
-    def _with_ids(items: Iterable[Dict[str, Any]]):
-        valid = []
-        for item in items:
-            if any(k in item for k in ("track_id", "id", "uuid", "object_id", "uid")):
-                valid.append(item)
-        return valid
-
+_TRACK_ID_KEYS = ("track_id", "id", "uuid", "object_id", "uid")
+
+# Where the track list can live, in probing order. The empty path means the
+# payload itself is a single track.
+_TRACK_PATHS: Tuple[Tuple[str, ...], ...] = (
+    ("tracks",),
+    ("objects",),
+    ("observations",),
+    ("message", "tracks"),
+    ("message", "objects"),
+    ("message", "observations"),
+    ("data", "tracks"),
+    ("data", "objects"),
+    ("data", "observations"),
+    (),
+    ("frame", "observations"),
+)
+
+
+def _tracks_at(payload: Dict[str, Any], path: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    if not path:
+        return [payload] if any(k in payload for k in _TRACK_ID_KEYS) else []
+
+    candidate: Any = payload
+    for key in path:
+        if not isinstance(candidate, dict):
+            return []
+        candidate = candidate.get(key)
+    if not isinstance(candidate, list):
+        return []
+    return [
+        item
+        for item in candidate
+        if isinstance(item, dict) and any(k in item for k in _TRACK_ID_KEYS)
+    ]
+
+
+def _extract_tracks(
+    payload: Dict[str, Any], camera_serial: Optional[str] = None
+) -> Iterable[Dict[str, Any]]:
+    """
+    Yield normalized per-track payloads according to Axis fusion schema.
+    A camera always sends the same layout, so the list path that matched is
+    remembered per `camera_serial` and tried first. It is only a first guess:
+    when it comes back empty the full probe runs again in `_TRACK_PATHS` order.
+    The empty path is never remembered, since an envelope with an id but an
+    empty track list would otherwise be taken as a track from then on.
+    """
     if not isinstance(payload, dict):
         return []
 
-    for key in ("tracks", "objects", "observations"):
-        if key in payload:
-            candidates = _with_ids(list(_pluck(payload[key])))
-            if candidates:
-                return candidates
-
-    message = payload.get("message")
-    if isinstance(message, dict):
-        for key in ("tracks", "objects", "observations"):
-            if key in message:
-                candidates = _with_ids(list(_pluck(message[key])))
-                if candidates:
-                    return candidates
-
-    data = payload.get("data")
-    if isinstance(data, dict):
-        for key in ("tracks", "objects", "observations"):
-            if key in data:
-                candidates = _with_ids(list(_pluck(data[key])))
-                if candidates:
-                    return candidates
-
-    if isinstance(payload, dict) and any(
-        key in payload for key in ("track_id", "id", "uuid", "object_id", "uid")
-    ):
-        return [payload]
+    learned = _layout_cache.get(camera_serial) if camera_serial is not None else None
+    if learned is not None:
+        candidates = _tracks_at(payload, learned)
+        if candidates:
+            return candidates
 
-    frame = payload.get("frame")
-    if isinstance(frame, dict) and isinstance(frame.get("observations"), list):
-        candidates = _with_ids(list(_pluck(frame["observations"])))
+    for path in _TRACK_PATHS:
+        candidates = _tracks_at(payload, path)
         if candidates:
+            if camera_serial is not None and path and path != learned:
+                _layout_cache.set(camera_serial, path)
             return candidates
 
     return []
 
 
+def get_layout_cache_stats() -> Dict[str, Any]:
+    """Hit rate of the per-camera payload layout cache."""
+    return _layout_cache.stats()
+
+
 def _extract_snapshot(track: Dict[str, Any]) -> Optional[str]:
     snapshot = track.get("snapshot") or track.get("image")
     if isinstance(snapshot, dict):
@@ -229,76 +268,136 @@ def _extract_snapshot(track: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def _haversine_meters(p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
-    if None in (*p1, *p2):
-        return 0.0
-    lat1, lon1 = map(math.radians, p1)
-    lat2, lon2 = map(math.radians, p2)
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+def _probe_track(track: Dict[str, Any]) -> Optional[FusionTrack]:
+    """Generic decoder: probe every known alternative key (slow path)."""
+    track_id = _extract_track_id(track)
+    if not track_id:
+        return None
+
+    bbox = _extract_bbox(track)
+    geo = _extract_geoposition(track)
+    cls = _extract_class(track)
+    obs = _latest_observation(track)
+    return FusionTrack(
+        track_id=track_id,
+        confidence=track.get("confidence")
+        or track.get("probability")
+        or cls.get("score"),
+        class_type=cls.get("type"),
+        class_score=cls.get("score"),
+        upper_clothing_colors=_extract_colors(track, "upper", cls),
+        lower_clothing_colors=_extract_colors(track, "lower", cls),
+        bbox_top=bbox["top"],
+        bbox_bottom=bbox["bottom"],
+        bbox_left=bbox["left"],
+        bbox_right=bbox["right"],
+        latitude=geo["latitude"],
+        longitude=geo["longitude"],
+        speed=_extract_speed(track),
+        timestamp=track.get("timestamp") or track.get("time"),
+        observation_timestamp=obs.get("timestamp") if isinstance(obs, dict) else None,
+        start_time=track.get("start_time") or track.get("first_seen"),
+        observations=track.get("observations") or track.get("history"),
+        snapshot=_extract_snapshot(track),
+        raw=track,
     )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return 6371000 * c
 
 
-def _record_motion(track_id: str, geo_pos, bbox_center, timestamp):
-    _track_motion_cache[track_id] = {
-        "geo": geo_pos,
-        "bbox": bbox_center,
-        "timestamp": timestamp,
-    }
+def decode_track(track: Dict[str, Any], fast: Optional[bool] = None) -> Optional[FusionTrack]:
+    """Decode one track, trying the canonical Axis fast path before probing."""
+    if FUSION_FAST_DECODER if fast is None else fast:
+        decoded = decode_axis_track(track)
+        if decoded is not None:
+            return decoded
+    return _probe_track(track)
+
+
+def track_positions(
+    payload: Dict[str, Any], camera_serial: Optional[str] = None
+) -> List[Tuple[Any, float, float]]:
+    """(track_id, latitude, longitude) of every geolocated track in a fusion payload."""
+    positions = []
+    for track in _extract_tracks(payload, camera_serial):
+        decoded = decode_track(track)
+        if decoded is not None and decoded.latitude is not None and decoded.longitude is not None:
+            positions.append((decoded.track_id, decoded.latitude, decoded.longitude))
+    return positions
+
+
+def strip_snapshot(track: Dict[str, Any], digest: str, size: int) -> Dict[str, Any]:
+    """Copy of `track` with the inline base64 image replaced by a store reference."""
+    reference = {"hash": digest, "size": size}
+    stripped = dict(track)
+    for key in ("snapshot", "image"):
+        value = stripped.get(key)
+        if isinstance(value, str):
+            stripped[key] = reference
+        elif isinstance(value, dict) and ("data" in value or "base64" in value):
+            value = {k: v for k, v in value.items() if k not in ("data", "base64")}
+            value.update(reference)
+            stripped[key] = value
+    return stripped
+
+
+def _store_snapshot(track: Dict[str, Any], snapshot: Optional[str], log):
+    """
+    Move a base64 snapshot into the snapshot store.
+    Returns (snapshot_hash, snapshot_size, inline_base64, raw_payload).
+    If the image cannot be stored it stays inline so nothing is lost.
+    """
+    if not snapshot:
+        return None, None, None, track
+    try:
+        digest, size = snapshot_store.put_base64(snapshot)
+    except (OSError, ValueError) as exc:
+        log(f"[Fusion] Could not store snapshot, keeping it inline: {exc}")
+        return None, None, snapshot, track
+    return digest, size, None, strip_snapshot(track, digest, size)
+
+
+def get_motion_cache_stats() -> Dict[str, Any]:
+    """Size and hit rate of the stationary-track motion cache."""
+    return _track_motion_cache.stats()
+
+
+def _stationary_mask(decoded_tracks: List[FusionTrack]):
+    """Stationary flag for every track of one message (one vectorized pass for large messages)."""
+    return _track_motion_cache.check(
+        [t.track_id for t in decoded_tracks],
+        [t.latitude for t in decoded_tracks],
+        [t.longitude for t in decoded_tracks],
+        [t.bbox_center() for t in decoded_tracks],
+        [t.speed for t in decoded_tracks],
+        min_speed=FUSION_MIN_SPEED_MPS,
+        min_distance=FUSION_MIN_DISTANCE_M,
+    )
 
 
-def _is_stationary(
-    track_id: str, geo_pos, bbox_center, timestamp, speed: Optional[float]
+def store_fusion_message(
+    topic: str,
+    payload: Any,
+    flask_app=None,
+    log_fn=None,
+    camera_serial=None,
+    writer=None,
 ):
-    if speed is not None and speed >= FUSION_MIN_SPEED_MPS:
-        _record_motion(track_id, geo_pos, bbox_center, timestamp)
-        return False
-
-    previous = _track_motion_cache.get(track_id)
-    if not previous:
-        _record_motion(track_id, geo_pos, bbox_center, timestamp)
-        return False
-
-    moved_m = 0.0
-    if (
-        geo_pos
-        and previous.get("geo")
-        and None not in (geo_pos.get("latitude"), geo_pos.get("longitude"))
-        and None
-        not in (
-            previous["geo"].get("latitude"),
-            previous["geo"].get("longitude"),
-        )
-    ):
-        moved_m = _haversine_meters(
-            (geo_pos["latitude"], geo_pos["longitude"]),
-            (previous["geo"]["latitude"], previous["geo"]["longitude"]),
-        )
-    elif bbox_center and previous.get("bbox"):
-        moved_m = (
-            (bbox_center[0] - previous["bbox"][0]) ** 2
-            + (bbox_center[1] - previous["bbox"][1]) ** 2
-        ) ** 0.5
-
-    _record_motion(track_id, geo_pos, bbox_center, timestamp)
-    return moved_m < FUSION_MIN_DISTANCE_M
-
-
-def store_fusion_message(topic: str, payload: Any, flask_app=None, log_fn=None):
+    """
+    Persist the tracks of one fusion message.
+    Callers that already routed the message by topic (see mqtt_client) pass
+    `camera_serial` so the topic regex does not have to run again.
+    With a `writer` (FusionWriteBehind) the rows are queued for a batched
+    bulk insert; otherwise they are bulk-inserted and committed right away.
+    """
     log = log_fn or (lambda _msg: None)
 
-    if not isinstance(payload, dict) or not is_fusion_topic(topic):
+    if not isinstance(payload, dict):
         return
 
-    match = FUSION_TOPIC_RE.match(topic)
-    if not match:
-        return
-    camera_serial = match.group(1)
+    if camera_serial is None:
+        match = FUSION_TOPIC_RE.match(topic)
+        if not match:
+            return
+        camera_serial = match.group(1)
 
     envelope_timestamp = (
         payload.get("timestamp")
@@ -308,76 +407,80 @@ def store_fusion_message(topic: str, payload: Any, flask_app=None, log_fn=None):
     )
     envelope_dt = _parse_iso8601(envelope_timestamp)
 
-    tracks = list(_extract_tracks(payload))
+    tracks = list(_extract_tracks(payload, camera_serial))
     if not tracks:
         log(f"[Fusion] No tracks in payload for {topic}")
         return
 
-    saved = 0
+    decoded_tracks = []
+    for track in tracks:
+        decoded = decode_track(track)
+        if decoded is not None:
+            decoded_tracks.append((track, decoded))
+    if not decoded_tracks:
+        return
+
+    stationary = _stationary_mask([decoded for _track, decoded in decoded_tracks])
+
+    rows = []
+    for (track, decoded), is_stationary in zip(decoded_tracks, stationary):
+        track_id = decoded.track_id
+        if is_stationary:
+            log(f"[Fusion] Skipped stationary track {track_id}")
+            continue
+
+        event_dt = (
+            _parse_iso8601(decoded.timestamp)
+            or envelope_dt
+            or _parse_iso8601(decoded.observation_timestamp)
+        )
+        if event_dt is None:
+            event_dt = datetime.datetime.utcnow()
+
+        snapshot_hash, snapshot_size, snapshot_base64, raw_payload = _store_snapshot(
+            track, decoded.snapshot, log
+        )
+
+        rows.append(
+            {
+                "camera_serial": camera_serial,
+                "track_id": track_id,
+                "confidence": decoded.confidence,
+                "class_type": decoded.class_type,
+                "class_score": decoded.class_score,
+                "upper_clothing_colors": decoded.upper_clothing_colors,
+                "lower_clothing_colors": decoded.lower_clothing_colors,
+                "bounding_box_top": decoded.bbox_top,
+                "bounding_box_bottom": decoded.bbox_bottom,
+                "bounding_box_left": decoded.bbox_left,
+                "bounding_box_right": decoded.bbox_right,
+                "latitude": decoded.latitude,
+                "longitude": decoded.longitude,
+                "start_time": _parse_iso8601(decoded.start_time),
+                "event_timestamp": event_dt,
+                "observations": decoded.observations,
+                "snapshot_hash": snapshot_hash,
+                "snapshot_size": snapshot_size,
+                "snapshot_base64": snapshot_base64,
+                "raw_payload": raw_payload,
+            }
+        )
+
+    if not rows:
+        return
+
+    if writer is not None:
+        writer.add(rows)
+        log(f"[Fusion] Queued {len(rows)} tracks from {topic}")
+        return
+
     with _app_context(flask_app):
-        for track in tracks:
-            track_id = _extract_track_id(track)
-            if not track_id:
-                continue
-
-            bbox = _extract_bbox(track)
-            geo = _extract_geoposition(track)
-            cls = _extract_class(track)
-            speed = _extract_speed(track)
-            bbox_center = _bbox_center(bbox)
-            obs = _latest_observation(track)
-            obs_timestamp = (
-                _parse_iso8601(obs.get("timestamp")) if isinstance(obs, dict) else None
-            )
-            event_dt = (
-                _parse_iso8601(track.get("timestamp") or track.get("time"))
-                or envelope_dt
-                or obs_timestamp
-            )
-            if event_dt is None:
-                event_dt = datetime.datetime.utcnow()
-
-            if _is_stationary(track_id, geo, bbox_center, event_dt, speed):
-                log(f"[Fusion] Skipped stationary track {track_id}")
-                continue
-
-            record = FusionData(
-                camera_serial=camera_serial,
-                track_id=track_id,
-                confidence=track.get("confidence")
-                or track.get("probability")
-                or cls.get("score"),
-                class_type=cls.get("type"),
-                class_score=cls.get("score"),
-                upper_clothing_colors=_extract_colors(track, "upper", cls),
-                lower_clothing_colors=_extract_colors(track, "lower", cls),
-                bounding_box_top=bbox["top"],
-                bounding_box_bottom=bbox["bottom"],
-                bounding_box_left=bbox["left"],
-                bounding_box_right=bbox["right"],
-                latitude=geo["latitude"],
-                longitude=geo["longitude"],
-                start_time=_parse_iso8601(
-                    track.get("start_time") or track.get("first_seen")
-                ),
-                event_timestamp=event_dt,
-                observations=track.get("observations") or track.get("history"),
-                snapshot_base64=_extract_snapshot(track),
-                raw_payload=track,
-            )
-
-            try:
-                db.session.add(record)
-                saved += 1
-            except Exception as exc:
-                log(f"[Fusion] Failed to stage track {track_id}: {exc}")
-
-        if saved:
-            try:
-                db.session.commit()
-            except Exception as exc:
-                db.session.rollback()
-                log(f"[Fusion] Commit failed ({topic}): {exc}")
-                return
-
-        log(f"[Fusion] Stored {saved} tracks from {topic}")
+        try:
+            db.session.execute(insert(FusionData), rows)
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            log(f"[Fusion] Commit failed ({topic}): {exc}")
+            return
+
+    log(f"[Fusion] Stored {len(rows)} tracks from {topic}")
@@ -0,0 +1,200 @@
+"""
+Per-floorplan multi-camera track fusion.
+
+Cameras only fuse with the other cameras of their own floorplan, so every
+floorplan gets its own ``TrackFusion`` and ``PositionProcessor``, created on
+first use with the floorplan origin (``bottom_left``) from the camera registry.
+Every fusion MQTT message is fused exactly once, by the MQTT worker that handles
+it; the fused positions go into a ring buffer that the ``/stream/positions``
+generators read with their own cursor, so the number of open streams does not
+change the work done or the ``fuse_calls`` reported. Each floorplan has its own
+lock: workers fusing for different floorplans run in parallel, the ones sharing
+a floorplan are serialized instead of racing on the same track store. Messages from
+cameras that are not placed on a floorplan (or whose floorplan has no
+georeferenced corners) are still fused, together on the ``DEFAULT_BOTTOM_LEFT``
+origin under floorplan ``None``, and counted as unplaced.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from infrastructure.camera_registry import CameraInfo, camera_registry
+from infrastructure.event_buffer import EventRingBuffer
+from infrastructure.floorplan_handler import DEFAULT_BOTTOM_LEFT, FloorplanManager
+from infrastructure.position_processor import PositionProcessor
+from infrastructure.track_fusion import TrackFusion
+
+FUSION_DISTANCE_M = float(os.getenv("FUSION_DISTANCE_M", 0.5))
+FUSION_TRACK_TIMEOUT = float(os.getenv("FUSION_TRACK_TIMEOUT", 3.0))
+FUSION_RATE_WINDOW_SECONDS = float(os.getenv("FUSION_RATE_WINDOW_SECONDS", 10))
+FUSION_POSITION_BUFFER_SIZE = int(os.getenv("FUSION_POSITION_BUFFER_SIZE", 1000))
+
+
+def _camera_serial(topic: str) -> Optional[str]:
+    parts = topic.split("/")
+    if len(parts) >= 2 and parts[0] == "axis":
+        return parts[1]
+    return None
+
+
+class FloorplanFusion:
+    """Track fusion of one floorplan; every use of ``fusion``/``processor`` holds ``lock``."""
+
+    def __init__(self, floorplan_id: Optional[int], bottom_left, fusion: TrackFusion, processor: PositionProcessor,
+                 clock: Callable[[], float], rate_window: float, published: EventRingBuffer):
+        self.floorplan_id = floorplan_id
+        self.fusion = fusion
+        self.processor = processor
+        self.lock = threading.Lock()
+        self._clock = clock
+        self._rate_window = rate_window
+        self.bottom_left = bottom_left
+        self._published = published
+
+        self._fuse_calls = 0
+        self._window_start = clock()
+        self._window_calls = 0
+        self._rate = 0.0
+
+    def process(self, event: Dict[str, Any], bottom_left) -> List[Dict[str, Any]]:
+        with self.lock:
+            if bottom_left != self.bottom_left:
+                # floorplan corners were edited; existing tracks time out on their own
+                self.bottom_left = bottom_left
+                self.processor.bottom_left_coord = list(bottom_left)
+            positions = self.processor.process_mqtt_event(event)
+            if positions:
+                self._count_fuse_call()
+            for position in positions:
+                position["floorplan_id"] = self.floorplan_id
+                # published under the lock so streams see a floorplan's positions in fusion order
+                self._published.append(position)
+        return positions
+
+    def _count_fuse_call(self):
+        # PositionProcessor makes one fuse_frame call per message with located observations
+        now = self._clock()
+        elapsed = now - self._window_start
+        if elapsed >= self._rate_window:
+            self._rate = self._window_calls / elapsed
+            self._window_start = now
+            self._window_calls = 0
+        self._fuse_calls += 1
+        self._window_calls += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            elapsed = self._clock() - self._window_start
+            # an idle floorplan decays to 0 instead of reporting its last busy window forever
+            rate = self._window_calls / elapsed if elapsed >= self._rate_window else self._rate
+            return {
+                "active_tracks": self.fusion.get_track_count(),
+                "fuse_calls": self._fuse_calls,
+                "fuse_calls_per_s": round(rate, 2),
+                "bottom_left": list(self.bottom_left),
+            }
+
+
+class FusionRegistry:
+    def __init__(
+        self,
+        lookup: Callable[[str], Optional[CameraInfo]] = camera_registry.by_serial,
+        fusion_distance: float = FUSION_DISTANCE_M,
+        track_timeout: float = FUSION_TRACK_TIMEOUT,
+        floorplan_manager=FloorplanManager,
+        rate_window: float = FUSION_RATE_WINDOW_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        buffer_size: int = FUSION_POSITION_BUFFER_SIZE,
+    ):
+        self._lookup = lookup
+        self.fusion_distance = fusion_distance
+        self.track_timeout = track_timeout
+        self._floorplan_manager = floorplan_manager
+        self._rate_window = rate_window
+        self._clock = clock
+        # only guards the floorplan dict and counters, never held while fusing
+        self._lock = threading.Lock()
+        self._floorplans: Dict[Optional[int], FloorplanFusion] = {}
+        self._unplaced = 0
+        self._positions = EventRingBuffer(capacity=buffer_size)
+
+    def for_floorplan(self, floorplan_id: Optional[int], bottom_left) -> FloorplanFusion:
+        with self._lock:
+            entry = self._floorplans.get(floorplan_id)
+            if entry is None:
+                fusion = TrackFusion(fusion_distance=self.fusion_distance, track_timeout=self.track_timeout)
+                processor = PositionProcessor(
+                    track_fusion=fusion,
+                    floorplan_manager=self._floorplan_manager,
+                    bottom_left_coord=list(bottom_left),
+                )
+                entry = FloorplanFusion(floorplan_id, bottom_left, fusion, processor, self._clock, self._rate_window,
+                                        self._positions)
+                self._floorplans[floorplan_id] = entry
+            return entry
+
+    def process_mqtt_event(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Fuse one MQTT event on the floorplan of its camera, publish the
+        positions for read_since() and return them, each tagged with
+        ``floorplan_id`` (``None`` for unplaced cameras). Call it once per
+        event (the MQTT worker does); readers never fuse.
+        """
+        serial = _camera_serial(event.get("topic", ""))
+        if serial is None:
+            return []
+        camera = self._lookup(serial)
+        if camera is None or camera.floorplan_id is None or camera.bottom_left is None:
+            with self._lock:
+                self._unplaced += 1
+            target, bottom_left = None, DEFAULT_BOTTOM_LEFT
+        else:
+            target, bottom_left = camera.floorplan_id, camera.bottom_left
+        return self.for_floorplan(target, bottom_left).process(event, bottom_left)
+
+    def cursor(self) -> int:
+        """Cursor that makes read_since() return only positions fused from now on."""
+        return self._positions.cursor()
+
+    def read_since(self, cursor: int, floorplan_id: Optional[int] = None,
+                   limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Return ``(positions, next_cursor)`` for the positions fused after
+        ``cursor``; with ``floorplan_id`` set, only the ones of that floorplan.
+        """
+        positions, cursor = self._positions.read_since(cursor, limit=limit)
+        if floorplan_id is not None:
+            positions = [p for p in positions if p["floorplan_id"] == floorplan_id]
+        return positions, cursor
+
+    def reset(self):
+        with self._lock:
+            self._floorplans.clear()
+            self._unplaced = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            floorplans = dict(self._floorplans)
+            unplaced = self._unplaced
+        return {
+            "floorplans": {
+                "unplaced" if fid is None else str(fid): entry.stats()
+                for fid, entry in sorted(floorplans.items(), key=lambda item: (item[0] is not None, item[0] or 0))
+            },
+            "unplaced_events": unplaced,
+            "published_positions": self._positions.cursor(),
+            "fusion_distance_m": self.fusion_distance,
+            "track_timeout_seconds": self.track_timeout,
+            "rate_window_seconds": self._rate_window,
+        }
+
+
+fusion_registry = FusionRegistry()
+
+
+def get_fusion_registry_stats() -> Dict[str, Any]:
+    return fusion_registry.stats()
@@ -0,0 +1,196 @@
+"""
+Write-behind buffer for FusionData rows.
+
+store_fusion_message hands its rows to FusionWriteBehind instead of committing
+per MQTT message. Rows from many messages are collected (see BatchQueue) and
+written as one bulk INSERT every ``max_rows`` rows or ``max_delay_ms``
+milliseconds, whichever comes first. If the INSERT fails, the batch is retried
+in halves down to single rows, so one bad row only costs that row and not the
+whole batch. Only data errors are split this way: when the database is
+unreachable the batch is kept and retried as a whole, and new rows beyond
+``max_pending_rows`` are rejected meanwhile.
+
+The same buffer batches the PositionHistory heatmap rows of the fused
+positions (``model=PositionHistory``).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, OperationalError
+
+from domain.models import FusionData, db
+from infrastructure.batch_queue import BatchQueue
+
+
+def is_database_unavailable(exc: BaseException) -> bool:
+    """Connection-level failure: the rows are fine and worth retrying once the database is back."""
+    return isinstance(exc, OperationalError) or (isinstance(exc, DBAPIError) and exc.connection_invalidated)
+
+
+class FusionWriteBehind:
+    def __init__(
+        self,
+        flask_app=None,
+        max_rows: int = 200,
+        max_delay_ms: int = 500,
+        log_fn: Optional[Callable[[str], None]] = None,
+        model=FusionData,
+        label: str = "Fusion",
+        max_pending_rows: Optional[int] = None,
+    ):
+        self.flask_app = flask_app
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self._log = log_fn or (lambda _msg: None)
+        self.model = model
+        self.label = label
+        # without the background thread rows still collect until max_rows, then flush synchronously
+        self._queue = BatchQueue(
+            self._flush_rows,
+            max_batch=max_rows,
+            max_delay_ms=max_delay_ms,
+            sync_threshold=max_rows,
+            # bounds the backlog while the database is unreachable (default 50 flushes)
+            capacity=max_pending_rows or max_rows * 50,
+            name=f"{label.lower()}-writer",
+            label=label,
+            log_fn=self._log,
+        )
+        self._lock = threading.Lock()
+
+        # metrics
+        self._flushes = 0
+        self._rows_written = 0
+        self._rows_dropped = 0
+        self._split_retries = 0
+        self._deferred_flushes = 0
+        self._last_flush_size = 0
+        self._max_flush_size = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ---- lifecycle ----
+    def start(self):
+        self._queue.start()
+
+    def close(self, timeout: float = 5.0):
+        """Flush-on-shutdown hook: stop the background thread and write what is left."""
+        self._queue.close(timeout)
+
+    # ---- producer side ----
+    def add(self, rows: List[Dict[str, Any]]):
+        self._queue.put(rows)
+
+    # ---- flushing ----
+    def flush(self) -> int:
+        """Write every pending row in one bulk INSERT. Returns the number of rows written."""
+        return self._queue.flush()
+
+    def _flush_rows(self, rows: List[Dict[str, Any]]) -> int:
+        start = time.perf_counter()
+        progress = {"settled": 0, "written": 0, "retries": 0}
+        error = None
+        context = self.flask_app.app_context() if self.flask_app is not None else nullcontext()
+        with context:
+            try:
+                self._write(rows, progress)
+            except Exception as exc:
+                error = exc
+            finally:
+                if self.flask_app is not None:
+                    db.session.remove()
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+
+        written = progress["written"]
+        dropped = progress["settled"] - written
+        unsettled = rows[progress["settled"]:]
+        deferred = error is not None and is_database_unavailable(error)
+        if deferred:
+            self._queue.requeue(unsettled)
+        elif error is not None:
+            dropped += len(unsettled)
+        with self._lock:
+            self._flushes += 1
+            self._rows_written += written
+            self._rows_dropped += dropped
+            self._split_retries += progress["retries"]
+            self._deferred_flushes += deferred
+            self._last_flush_size = len(rows)
+            self._max_flush_size = max(self._max_flush_size, len(rows))
+            self._last_flush_ms = elapsed_ms
+            self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+        if written:
+            self._log(f"[{self.label}] Flushed {written} rows in {elapsed_ms:.1f} ms")
+        if deferred:
+            self._log(f"[{self.label}] Database unavailable, keeping {len(unsettled)} rows for retry: {error}")
+        elif error is not None:
+            self._log(f"[{self.label}] Flush failed: {error}")
+        if dropped:
+            self._log(f"[{self.label}] Dropped {dropped} of {len(rows)} rows")
+        return written
+
+    def _write(self, rows: List[Dict[str, Any]], progress: Dict[str, int]):
+        """
+        Insert rows, bisecting a batch that fails on bad data (IntegrityError,
+        DataError) down to the rows at fault. `progress` counts the rows settled
+        (written or dropped, always a leading part of `rows`), the rows written
+        and the split retries. Any other error is raised after a rollback: it
+        is not the rows' fault, so splitting would only multiply round trips.
+        """
+        try:
+            # Core executemany; SQLAlchemy batches this into multi-row
+            # INSERT ... VALUES statements on PostgreSQL (insertmanyvalues)
+            db.session.execute(insert(self.model), rows)
+            db.session.commit()
+        except (IntegrityError, DataError) as exc:
+            db.session.rollback()
+            if len(rows) == 1:
+                self._log(f"[{self.label}] Dropping row of track {rows[0].get('track_id')!r}: {exc}")
+                progress["settled"] += 1
+                return
+        except Exception:
+            db.session.rollback()
+            raise
+        else:
+            progress["settled"] += len(rows)
+            progress["written"] += len(rows)
+            return
+        progress["retries"] += 1
+        middle = len(rows) // 2
+        self._write(rows[:middle], progress)
+        self._write(rows[middle:], progress)
+
+    # ---- metrics ----
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._queue.running,
+                "pending_rows": self._queue.pending,
+                "max_rows": self.max_rows,
+                "max_delay_ms": int(self.max_delay * 1000),
+                "flushes": self._flushes,
+                "rows_written": self._rows_written,
+                "rows_dropped": self._rows_dropped,
+                "split_retries": self._split_retries,
+                "deferred_flushes": self._deferred_flushes,
+                "rows_requeued": self._queue.requeued,
+                "rows_rejected": self._queue.dropped,
+                "last_flush_size": self._last_flush_size,
+                "max_flush_size": self._max_flush_size,
+                "avg_flush_size": (self._rows_written + self._rows_dropped) / self._flushes
+                if self._flushes
+                else 0.0,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+                "max_flush_ms": round(self._max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self._flushes, 3)
+                if self._flushes
+                else 0.0,
+            }
@@ -0,0 +1,108 @@
+"""
+Vectorized point-in-polygon tests.
+
+``PolygonSet`` flattens the edges of many polygons into NumPy arrays once, and
+``contains`` then answers "which of these points lie in which polygon" for a
+whole frame of track positions in one pass. It uses the same even-odd ray
+casting rule as ``point_in_polygon`` in intrusion_detection.py (and the
+frontend), so both agree on every point. ``contains_pairs`` applies the same
+rule to selected (point, polygon) pairs only, e.g. the candidates returned by
+a spatial index, and touches only the edges of those polygons.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# Bounds the (points x edges) temporaries to roughly this many elements
+_MAX_CHUNK_ELEMENTS = 1_000_000
+
+
+class PolygonSet:
+    def __init__(self, polygons: Sequence[Sequence[Tuple[float, float]]]):
+        self.count = len(polygons)
+        xi, yi, xj, yj, starts, columns = [], [], [], [], [], []
+        n_edges = 0
+        for column, polygon in enumerate(polygons):
+            vertices = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+            if len(vertices) < 3:
+                continue  # never contains anything
+            previous = np.roll(vertices, 1, axis=0)  # edge i runs from vertex i-1 to vertex i
+            xi.append(vertices[:, 0])
+            yi.append(vertices[:, 1])
+            xj.append(previous[:, 0])
+            yj.append(previous[:, 1])
+            starts.append(n_edges)
+            columns.append(column)
+            n_edges += len(vertices)
+
+        self._columns = np.asarray(columns, dtype=np.intp)
+        self._starts = np.asarray(starts, dtype=np.intp)
+        # per polygon column: first edge and edge count (0 for degenerate polygons)
+        self._edge_starts = np.zeros(self.count, dtype=np.intp)
+        self._edge_starts[self._columns] = self._starts
+        self._edge_counts = np.zeros(self.count, dtype=np.intp)
+        self._edge_counts[self._columns] = np.diff(np.append(self._starts, n_edges))
+        if n_edges:
+            self._xi, self._yi = np.concatenate(xi), np.concatenate(yi)
+            self._xj, self._yj = np.concatenate(xj), np.concatenate(yj)
+            # slope term of the crossing x, precomputed per edge
+            self._dx_dy = (self._xj - self._xi) / ((self._yj - self._yi) + 1e-9)
+        self._n_edges = n_edges
+
+    def contains(self, points) -> np.ndarray:
+        """
+        Membership matrix for an (N, 2) array of points: result[p, z] is True
+        when point p lies inside polygon z.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = np.zeros((len(pts), self.count), dtype=bool)
+        if not len(pts) or not self._n_edges:
+            return result
+
+        chunk = max(1, _MAX_CHUNK_ELEMENTS // self._n_edges)
+        for start in range(0, len(pts), chunk):
+            px = pts[start:start + chunk, 0:1]
+            py = pts[start:start + chunk, 1:2]
+            straddles = (self._yi > py) != (self._yj > py)
+            crosses = straddles & (px < self._dx_dy * (py - self._yi) + self._xi)
+            # odd number of crossings per polygon -> inside
+            result[start:start + chunk, self._columns] = np.logical_xor.reduceat(crosses, self._starts, axis=1)
+        return result
+
+    def contains_pairs(self, points, point_index, columns) -> np.ndarray:
+        """
+        For pair k, whether point ``point_index[k]`` lies inside polygon
+        ``columns[k]``. Only the edges of the paired polygons are tested.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        point_index = np.asarray(point_index, dtype=np.intp)
+        columns = np.asarray(columns, dtype=np.intp)
+        result = np.zeros(len(columns), dtype=bool)
+        counts = self._edge_counts[columns]
+        pairs = np.flatnonzero(counts)
+        if not len(pairs):
+            return result
+
+        chunk = max(1, _MAX_CHUNK_ELEMENTS // int(counts.max()))
+        for start in range(0, len(pairs), chunk):
+            part = pairs[start:start + chunk]
+            part_counts = counts[part]
+            # one entry per (pair, edge of the pair's polygon)
+            first = np.cumsum(part_counts) - part_counts
+            edge = np.repeat(self._edge_starts[columns[part]] - first, part_counts) + np.arange(part_counts.sum())
+            px = np.repeat(pts[point_index[part], 0], part_counts)
+            py = np.repeat(pts[point_index[part], 1], part_counts)
+            yi = self._yi[edge]
+            straddles = (yi > py) != (self._yj[edge] > py)
+            crosses = straddles & (px < self._dx_dy[edge] * (py - yi) + self._xi[edge])
+            # odd number of crossings per pair -> inside
+            result[part] = np.logical_xor.reduceat(crosses, first)
+        return result
+
+
+def points_in_polygons(points, polygons: Sequence[Sequence[Tuple[float, float]]]) -> np.ndarray:
+    """One-shot helper: membership matrix of `points` (N, 2) against `polygons`."""
+    return PolygonSet(polygons).contains(points)
@@ -217,6 +217,11 @@ class VideoCamera:
                 return None
             return self.encoded_frame
 
+    def latest_jpeg(self):
+        """(JPEG bytes, time.time() it was encoded) of the newest frame, or (None, 0)"""
+        with self.thread_lock:
+            return self.encoded_frame, self.encoding_timestamp
+
     def is_connected(self):
         """Check if camera is connected"""
         return self.cap is not None and self.cap.isOpened() and self.frame is not None
@@ -268,4 +273,24 @@ class VideoCamera:
     
     def __del__(self):
         """Cleanup when object is destroyed"""
-        self.stop()
\ No newline at end of file
+        self.stop()
+
+# One capture thread (and RTSP session) per camera IP, shared by every module
+_shared_cameras = {}
+_shared_lock = threading.Lock()
+
+
+def shared_camera(camera_ip):
+    """VideoCamera for an IP, started on first use and reused afterwards"""
+    with _shared_lock:
+        camera = _shared_cameras.get(camera_ip)
+        if camera is None:
+            camera = VideoCamera(camera_ip)
+            _shared_cameras[camera_ip] = camera
+        return camera
+
+
+def running_camera(camera_ip):
+    """The shared VideoCamera for an IP if one was started, without starting it"""
+    with _shared_lock:
+        return _shared_cameras.get(camera_ip)
@@ -0,0 +1,295 @@
+"""
+Array-backed table of the last known position per fusion track.
+
+Used by store_fusion_message to decide, for all tracks of one message at
+once, which tracks have not moved since they were last seen. Positions live
+in preallocated NumPy arrays indexed by a slot per track id, so the haversine
+and bounding-box distances are computed as a single vectorized operation
+instead of one Python call per track. The NumPy call overhead only pays off
+from a few dozen tracks on, so smaller messages (``vectorize_from``) are
+checked track by track against the same arrays.
+
+Like BoundedTTLCache the table is bounded (least recently seen tracks are
+evicted when full) and entries expire after ``ttl_seconds`` without updates.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_meters(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Element-wise great-circle distance in meters between arrays of degrees."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _as_array(values) -> np.ndarray:
+    # None -> NaN so missing coordinates can be masked out
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+class MotionTable:
+    _SWEEP_INTERVAL = 1.0  # seconds between expiry sweeps
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+        vectorize_from: int = 32,
+    ):
+        if max_size <= 0 or ttl_seconds <= 0:
+            raise ValueError("max_size and ttl_seconds must be positive")
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.vectorize_from = vectorize_from  # tracks per message, see bench_motion_table.py
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # slot -> previous position; NaN marks a missing coordinate
+        self._lat = np.full(max_size, np.nan)
+        self._lon = np.full(max_size, np.nan)
+        self._bbox_x = np.full(max_size, np.nan)
+        self._bbox_y = np.full(max_size, np.nan)
+        self._touched = np.full(max_size, -np.inf)
+        self._keys: List[Optional[Hashable]] = [None] * max_size
+
+        self._slots: Dict[Hashable, int] = {}  # track id -> slot
+        self._free = list(range(max_size - 1, -1, -1))
+        self._last_sweep = -np.inf
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    # ---- slot management (lock held) ----
+    def _release(self, slot: int):
+        del self._slots[self._keys[slot]]
+        self._keys[slot] = None
+        self._touched[slot] = -np.inf
+        self._free.append(slot)
+
+    def _sweep(self, now: float):
+        self._last_sweep = now
+        # free slots hold -inf and are skipped
+        expired = np.flatnonzero((self._touched < now - self.ttl) & (self._touched > -np.inf))
+        for slot in expired:
+            self._release(int(slot))
+            self._expirations += 1
+
+    def _allocate(self, count: int) -> List[int]:
+        if len(self._free) < count:
+            self._sweep(self._clock())
+        missing = count - len(self._free)
+        if missing > 0:
+            # evict the least recently seen tracks (free slots are not candidates)
+            order = self._touched.copy()
+            order[self._free] = np.inf
+            for slot in np.argpartition(order, missing - 1)[:missing]:
+                self._release(int(slot))
+                self._evictions += 1
+        return [self._free.pop() for _ in range(count)]
+
+    # ---- public API ----
+    def check(
+        self,
+        keys: Sequence[Hashable],
+        latitudes: Sequence[Optional[float]],
+        longitudes: Sequence[Optional[float]],
+        bbox_centers: Sequence[Optional[tuple]],
+        speeds: Sequence[Optional[float]],
+        min_speed: float,
+        min_distance: float,
+    ) -> np.ndarray:
+        """
+        Return a boolean array telling which tracks are stationary, and record
+        their positions. A track is stationary when it reports a speed below
+        `min_speed` (or none) and moved less than `min_distance` since it was
+        last seen: geodesic meters when both positions have coordinates,
+        otherwise the distance between bounding-box centers.
+        A track id that occurs several times is handled in message order.
+        """
+        n = len(keys)
+        # a message larger than the table goes through the vectorized pass, which keeps its last tracks
+        if n < self.vectorize_from and n <= self.max_size:
+            return self._check_each(keys, latitudes, longitudes, bbox_centers, speeds, min_speed, min_distance)
+        stationary = np.zeros(n, dtype=bool)
+
+        lat = _as_array(latitudes)
+        lon = _as_array(longitudes)
+        bbox_x = _as_array(c[0] if c else None for c in bbox_centers)
+        bbox_y = _as_array(c[1] if c else None for c in bbox_centers)
+        speed = _as_array(speeds)
+        moving = speed >= min_speed  # NaN (no speed) compares False
+
+        # k-th occurrence of a track id goes into pass k
+        if len(set(keys)) == n:
+            passes = [list(range(n))]
+        else:
+            seen: Dict[Hashable, int] = {}
+            passes = []
+            for i, key in enumerate(keys):
+                rank = seen.get(key, 0)
+                seen[key] = rank + 1
+                if rank == len(passes):
+                    passes.append([])
+                passes[rank].append(i)
+
+        with self._lock:
+            now = self._clock()
+            if now - self._last_sweep >= self._SWEEP_INTERVAL:
+                self._sweep(now)
+            for indices in passes:
+                idx = np.asarray(indices, dtype=np.intp)
+                stationary[idx] = self._check_unique(keys, indices, idx, lat, lon, bbox_x, bbox_y, moving, min_distance, now)
+        return stationary
+
+    def _check_each(self, keys, latitudes, longitudes, bbox_centers, speeds, min_speed, min_distance) -> np.ndarray:
+        """Same decisions as the vectorized pass, one track at a time with math.* instead of NumPy."""
+        stationary = np.zeros(len(keys), dtype=bool)
+        nan = math.nan
+        with self._lock:
+            now = self._clock()
+            if now - self._last_sweep >= self._SWEEP_INTERVAL:
+                self._sweep(now)
+            for i, key in enumerate(keys):
+                lat = nan if latitudes[i] is None else latitudes[i]
+                lon = nan if longitudes[i] is None else longitudes[i]
+                bbox = bbox_centers[i]
+                bbox_x, bbox_y = (nan if v is None else v for v in bbox) if bbox else (nan, nan)
+
+                slot = self._slots.get(key)
+                if slot is not None and self._touched[slot] < now - self.ttl:
+                    self._release(slot)
+                    self._expirations += 1
+                    slot = None
+
+                speed = speeds[i]
+                if speed is None or not speed >= min_speed:
+                    if slot is None:
+                        self._misses += 1
+                    else:
+                        self._hits += 1
+                        stationary[i] = self._moved(slot, lat, lon, bbox_x, bbox_y) < min_distance
+
+                if slot is None:
+                    slot = self._allocate(1)[0]
+                    self._keys[slot] = key
+                    self._slots[key] = slot
+                self._lat[slot] = lat
+                self._lon[slot] = lon
+                self._bbox_x[slot] = bbox_x
+                self._bbox_y[slot] = bbox_y
+                self._touched[slot] = now
+        return stationary
+
+    def _moved(self, slot: int, lat: float, lon: float, bbox_x: float, bbox_y: float) -> float:
+        prev_lat, prev_lon = float(self._lat[slot]), float(self._lon[slot])
+        if not math.isnan(lat + lon + prev_lat + prev_lon):
+            lat1, lon1, lat2, lon2 = map(math.radians, (lat, lon, prev_lat, prev_lon))
+            a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+            return 2 * EARTH_RADIUS_M * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        prev_x, prev_y = float(self._bbox_x[slot]), float(self._bbox_y[slot])
+        if not math.isnan(bbox_x + bbox_y + prev_x + prev_y):
+            return math.hypot(bbox_x - prev_x, bbox_y - prev_y)
+        return 0.0
+
+    def _check_unique(self, keys, indices, idx, lat, lon, bbox_x, bbox_y, moving, min_distance, now) -> np.ndarray:
+        lookup = self._slots.get
+        slots = np.fromiter((lookup(keys[i], -1) for i in indices), dtype=np.intp, count=len(indices))
+        stale = np.flatnonzero((slots >= 0) & (self._touched[slots] < now - self.ttl))
+        for j in stale:
+            self._release(int(slots[j]))
+            self._expirations += 1
+            slots[j] = -1
+
+        known = slots >= 0
+        looked_up = ~moving[idx]
+        self._hits += int(np.count_nonzero(known & looked_up))
+        self._misses += int(np.count_nonzero(~known & looked_up))
+
+        check = known & looked_up
+        result = np.zeros(len(idx), dtype=bool)
+        if check.any():
+            rows = idx[check]
+            prev = slots[check]
+            moved = np.zeros(len(rows))
+
+            geo = ~(np.isnan(lat[rows]) | np.isnan(lon[rows]) | np.isnan(self._lat[prev]) | np.isnan(self._lon[prev]))
+            if geo.any():
+                moved[geo] = haversine_meters(lat[rows][geo], lon[rows][geo], self._lat[prev][geo], self._lon[prev][geo])
+
+            box = ~geo & ~(
+                np.isnan(bbox_x[rows]) | np.isnan(bbox_y[rows]) | np.isnan(self._bbox_x[prev]) | np.isnan(self._bbox_y[prev])
+            )
+            if box.any():
+                moved[box] = np.hypot(bbox_x[rows][box] - self._bbox_x[prev][box],
+                                      bbox_y[rows][box] - self._bbox_y[prev][box])
+            result[check] = moved < min_distance
+
+        # record every position; known tracks first so a full table evicts older ones
+        self._touched[slots[known]] = now
+        new = np.flatnonzero(~known)
+        if len(new) > self.max_size:
+            new = new[-self.max_size:]
+        if len(new):
+            evictions = self._evictions
+            allocated = self._allocate(len(new))
+            if self._evictions != evictions:
+                # a batch larger than the table may have evicted its own tracks
+                for j in np.flatnonzero(known):
+                    if self._keys[slots[j]] != keys[idx[j]]:
+                        slots[j] = -1
+            for j, slot in zip(new, allocated):
+                slots[j] = slot
+                self._keys[slot] = keys[idx[j]]
+                self._slots[keys[idx[j]]] = slot
+        write = slots >= 0
+        target, rows = slots[write], idx[write]
+        self._lat[target] = lat[rows]
+        self._lon[target] = lon[rows]
+        self._bbox_x[target] = bbox_x[rows]
+        self._bbox_y[target] = bbox_y[rows]
+        self._touched[target] = now
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self._keys = [None] * self.max_size
+            self._touched.fill(-np.inf)
+            self._free = list(range(self.max_size - 1, -1, -1))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            slot = self._slots.get(key)
+            return slot is not None and self._touched[slot] >= self._clock() - self.ttl
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sweep(self._clock())
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._slots),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
@@ -11,9 +11,23 @@ import os
 import time
 import datetime
 import subprocess
+import atexit
+from contextlib import nullcontext
 import paho.mqtt.client as mqtt
-from infrastructure.fusion_persistence import is_fusion_topic, store_fusion_message
-from infrastructure.intrusion_detection import trigger_intrusion, process_fusion_for_intrusion
+from domain.models import PositionHistory
+from infrastructure.fusion_persistence import store_fusion_message
+from infrastructure.fusion_registry import fusion_registry
+from infrastructure.intrusion_detection import (
+    trigger_intrusion, process_fusion_for_intrusion, start_zone_expiry, stop_zone_expiry,
+)
+from infrastructure.event_buffer import EventRingBuffer
+from infrastructure.fusion_decoder import loads as decode_json
+from infrastructure.mqtt_pipeline import MessagePipeline
+from infrastructure.fusion_writer import FusionWriteBehind
+from infrastructure.event_sink import event_sink
+from infrastructure.event_journal import event_journal
+from infrastructure.segment_buffer import segment_buffer
+from infrastructure.topic_router import TopicRouter
 
 # START  ----------
 import json
@@ -22,12 +36,28 @@ import re
 # STOP ----------
 
 # In-memory store for API access
-events = []
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", 200))
+events = EventRingBuffer(capacity=EVENT_BUFFER_SIZE)
 EVENT_DIR = os.getenv("EVENT_DIR", "events")    # the directory to store events, snapshots, and clips, with a default of "events"
 COOLDOWN_SECONDS = int(os.getenv("COOLDOWN_SECONDS", 10))   # cooldown period between processing events from the same camera
 last_trigger_time = {}
 _flask_app = None
-CAMERA_MAP = {"B8A44F9EED3B": 1, "E8272505477E": 2, "B8A44F9EEE36": 3}
+
+# Worker pipeline between on_message and the (slow) DB work
+MQTT_WORKERS = int(os.getenv("MQTT_WORKERS", 2))
+MQTT_QUEUE_SIZE = int(os.getenv("MQTT_QUEUE_SIZE", 1000))
+MQTT_QUEUE_OVERFLOW = os.getenv("MQTT_QUEUE_OVERFLOW", "drop_oldest")  # "drop_oldest" or "block"
+_pipeline = None
+
+# Write-behind batching of FusionData rows (flush every N rows or T ms)
+FUSION_FLUSH_ROWS = int(os.getenv("FUSION_FLUSH_ROWS", 200))
+FUSION_FLUSH_MS = int(os.getenv("FUSION_FLUSH_MS", 500))
+_fusion_writer = None
+
+# Heatmap rows (PositionHistory) of the fused positions, batched the same way
+HEATMAP_FLUSH_ROWS = int(os.getenv("HEATMAP_FLUSH_ROWS", 500))
+HEATMAP_FLUSH_MS = int(os.getenv("HEATMAP_FLUSH_MS", 5000))
+_heatmap_writer = None
 
 
 
@@ -108,43 +138,96 @@ def on_connect(client, userdata, flags, rc):
     print(f"[MQTT] Connected to broker (code: {rc})")
     print(f"{'='*60}\n")
 
-    # Subscribe to Axis Scene Metadata topics
-    client.subscribe("com.axis.analytics_scene_description.v0.beta")
-    client.subscribe("axis/+/analytics/scene/#")
-    client.subscribe("axis/+/analytics/fusion/#")
-    client.subscribe("axis/+/scene/metadata")
+    # Subscribe to every topic filter that has handlers registered
+    router.compile()
+    for topic_filter in router.filters():
+        client.subscribe(topic_filter)
 
     print("[MQTT] Subscribed to Axis Scene Metadata topics")
-    print("  - axis/+/analytics/fusion (Fusion Analytics)")
+    for topic_filter in router.filters():
+        print(f"  - {topic_filter}")
     print()
 
 
 def on_message(client, userdata, msg):
-    # log_event(f"[DEBUG] MQTT Payload: {msg.payload.decode()}")
+    # Runs on the paho network thread: only hand the message to the workers
+    if _pipeline is None:
+        process_message(msg.topic, msg.payload)
+        return
+    _pipeline.submit((msg.topic, msg.payload))
+
+
+def _process_queued_message(item):
+    topic, raw_payload = item
+    process_message(topic, raw_payload)
+
+
+def _message_partition(item):
+    """Camera serial of a queued message, so one camera's frames stay on one worker and in order."""
+    parts = item[0].split("/")
+    return parts[1] if len(parts) >= 2 else item[0]
+
+
+def _app_context():
+    if _flask_app is None:
+        return nullcontext()
+    return _flask_app.app_context()
+
+
+def process_message(topic, raw_payload):
+    """Decode one MQTT message and run the handlers registered for its topic (worker thread)."""
+    # log_event(f"[DEBUG] MQTT Payload: {raw_payload.decode()}")
 
     try:
-        payload = json.loads(msg.payload.decode())
+        payload = decode_json(raw_payload)
     except:
-        payload = msg.payload.decode()
-
-    if is_fusion_topic(msg.topic):
-        log_event(f"[Fusion] Topic: {msg.topic}")
-        store_fusion_message(msg.topic, payload, flask_app=_flask_app, log_fn=log_event)
-        
+        payload = raw_payload.decode(errors="replace")
+
+    # Store event for API access (the ring buffer drops the oldest entry itself).
+    # Done before the DB work so position streaming does not wait on the database.
+    events.append({"topic": topic, "payload": payload})
+
+    # Only the handlers registered for this topic run (see _build_router)
+    router.dispatch(topic, payload)
+
+
+def _fuse_positions(topic, payload):
+    # The only place positions are fused: once per message, whatever the number of open streams
+    positions = fusion_registry.process_mqtt_event({"topic": topic, "payload": payload})
+    if positions and _heatmap_writer is not None:
+        now = datetime.datetime.utcnow()
+        _heatmap_writer.add([
+            {
+                "track_id": position["track_id"],
+                "x_m": position["x_m"],
+                "y_m": position["y_m"],
+                "floorplan_id": position["floorplan_id"],
+                "timestamp": now,
+            }
+            for position in positions
+        ])
+
+
+def _store_fusion(topic, payload):
+    log_event(f"[Fusion] Topic: {topic}")
+    store_fusion_message(
+        topic,
+        payload,
+        flask_app=_flask_app,
+        log_fn=log_event,
+        camera_serial=topic.split("/")[1],
+        writer=_fusion_writer,
+    )
 
 
-    event = {"topic": msg.topic, "payload": payload}
-    events.append(event)
-    if len(events) > 200:
-        events.pop(0)
+def _evaluate_intrusion(topic, payload):
+    if isinstance(payload, dict):
+        with _app_context():
+            process_fusion_for_intrusion(payload, camera_serial=topic.split("/")[1])
 
-    # Store event for API access
-    event = {"topic": msg.topic, "payload": payload}
-    events.append(event)
-    
-    process_fusion_for_intrusion(payload)
 
 #------------------------START: Can be removed /Victor --------------------------
+def _print_scene_observations(topic, payload):
     # Process scene metadata
     if isinstance(payload, dict):
         if "frame" in payload and "observations" in payload.get("frame", {}):
@@ -156,15 +239,10 @@ def on_message(client, userdata, msg):
                 obj_type = obj_class.get("type", "")
 
                 if obj_type in ["Human", "Person", "person", "human"]:
-                    process_person_detection(obs, msg.topic)
+                    process_person_detection(obs, topic)
 
 #------------------------END: Can be removed /Victor --------------------------
 
-
-    # Limit event history
-    if len(events) > 200:
-        events.pop(0)
-
 #------------------------START: Can be removed /Victor --------------------------
 def process_person_detection(obs, topic):
     """Process and print person detection."""
@@ -201,8 +279,61 @@ def process_person_detection(obs, topic):
 
 #------------------------END: Can be removed /Victor --------------------------
 
+def _build_router():
+    """Topic filter -> handlers. Each message only runs the handlers of the filters it matches."""
+    topic_router = TopicRouter(log_fn=log_event)
+    topic_router.register("axis/+/analytics/fusion/#", _fuse_positions, _store_fusion, _evaluate_intrusion)
+    # scene frames carry geopositioned observations too; they are streamed like fusion frames
+    topic_router.register("axis/+/analytics/scene/#", _fuse_positions, _print_scene_observations)
+    topic_router.register("axis/+/scene/metadata", _fuse_positions, _print_scene_observations)
+    topic_router.register("com.axis.analytics_scene_description.v0.beta", _print_scene_observations)
+    return topic_router
+
+
+router = _build_router()
+
+
 def start_mqtt(flask_app=None, debug=True):
+    global _pipeline, _fusion_writer, _heatmap_writer
     _set_flask_app(flask_app)
+
+    if _fusion_writer is None:
+        _fusion_writer = FusionWriteBehind(
+            flask_app=flask_app,
+            max_rows=FUSION_FLUSH_ROWS,
+            max_delay_ms=FUSION_FLUSH_MS,
+            log_fn=log_event,
+        )
+        _fusion_writer.start()
+
+    if _heatmap_writer is None:
+        _heatmap_writer = FusionWriteBehind(
+            flask_app=flask_app,
+            max_rows=HEATMAP_FLUSH_ROWS,
+            max_delay_ms=HEATMAP_FLUSH_MS,
+            log_fn=log_event,
+            model=PositionHistory,
+            label="Heatmap",
+        )
+        _heatmap_writer.start()
+
+    if event_sink.flask_app is None:
+        event_sink.flask_app = flask_app
+    event_sink.start()
+    event_journal.start()
+    start_zone_expiry()
+
+    if _pipeline is None:
+        _pipeline = MessagePipeline(
+            handler=_process_queued_message,
+            workers=MQTT_WORKERS,
+            max_size=MQTT_QUEUE_SIZE,
+            overflow=MQTT_QUEUE_OVERFLOW,
+            log_fn=log_event,
+            key=_message_partition,
+        )
+        _pipeline.start()
+        atexit.register(stop_mqtt_pipeline)
     broker_host = os.getenv("MQTT_BROKER_HOST", "localhost")
     broker_port = int(os.getenv("MQTT_BROKER_PORT", 1883))
 
@@ -227,18 +358,45 @@ def start_mqtt(flask_app=None, debug=True):
 
 def get_events():
     """Return recent MQTT events for API access."""
-    return events[-50:]
+    return events.latest(50)
 
 
-# Added by Delber in case you want to remove this its fine
-# Match: axis/<camera-id>/analytics/fusion (optionally with subpaths)
-FUSION_TOPIC_RE = re.compile(r"^axis/([^/]+)/analytics/fusion(?:/.*)?$")
+def get_pipeline_stats():
+    """Queue depth, drop and throughput counters of the MQTT worker pipeline."""
+    if _pipeline is None:
+        return {"running": False}
+    return _pipeline.stats()
+
+
+def get_fusion_writer_stats():
+    """Flush size / latency metrics of the FusionData write-behind buffer."""
+    if _fusion_writer is None:
+        return {"running": False}
+    return _fusion_writer.stats()
 
 
-def is_fusion_topic(topic: str) -> bool:
-    return bool(FUSION_TOPIC_RE.match(topic))
+def get_heatmap_writer_stats():
+    """Flush size / latency metrics of the PositionHistory (heatmap) write-behind buffer."""
+    if _heatmap_writer is None:
+        return {"running": False}
+    return _heatmap_writer.stats()
 
 
+def stop_mqtt_pipeline(timeout=5.0):
+    """Process what is still queued, then flush the buffered fusion rows, intrusion events and journal."""
+    if _pipeline is not None:
+        _pipeline.stop(timeout=timeout)
+    if _fusion_writer is not None:
+        _fusion_writer.close(timeout=timeout)
+    if _heatmap_writer is not None:
+        _heatmap_writer.close(timeout=timeout)
+    stop_zone_expiry(timeout=timeout)
+    event_sink.close(timeout=timeout)
+    event_journal.close(timeout=timeout)
+    segment_buffer.stop()
+
+
+# Added by Delber in case you want to remove this its fine
 def handle_fusion_message(topic: str, payload):
     """
     Pretty-print everything the Fusion topic publishes,
@@ -0,0 +1,190 @@
+"""
+Bounded work queue and worker pool that sits behind the MQTT on_message callback.
+
+The paho network thread only enqueues raw messages here; decoding, persistence
+and intrusion evaluation run on the worker threads, so a slow database no longer
+stalls the MQTT loop. Each worker has its own queue and items are routed by
+``key(item)`` (the camera serial for MQTT messages), so the frames of one camera
+are handled by one worker, in the order they arrived.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_BLOCK = "block"
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK)
+
+
+class MessagePipeline:
+    """
+    Fixed-size queue drained by ``workers`` daemon threads that call ``handler(item)``.
+
+    Items with the same ``key(item)`` always go to the same worker and are
+    processed in submission order; without a ``key`` items are spread round-robin.
+
+    Overflow policy when the queue is full:
+    - ``drop_oldest``: discard the oldest queued message and accept the new one.
+      The producer never waits, which keeps the MQTT loop on time.
+    - ``block``: the producer waits (up to ``block_timeout`` seconds) for room;
+      if the wait times out the new message is dropped.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], None],
+        workers: int = 2,
+        max_size: int = 1000,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        block_timeout: Optional[float] = 1.0,
+        log_fn: Optional[Callable[[str], None]] = None,
+        name: str = "mqtt-worker",
+        key: Optional[Callable[[Any], Any]] = None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        if workers <= 0 or max_size <= 0:
+            raise ValueError("workers and max_size must be positive")
+
+        self.handler = handler
+        self.workers = workers
+        self.max_size = max_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.name = name
+        self._key = key
+        self._log = log_fn or (lambda _msg: None)
+
+        # one queue per worker; max_size bounds all of them together
+        self._queues = [deque() for _ in range(workers)]
+        self._depth = 0
+        self._next_queue = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+
+        # counters, only touched while holding self._cond
+        self._enqueued = 0
+        self._processed = 0
+        self._dropped = 0
+        self._errors = 0
+        self._in_flight = 0
+        self._max_depth = 0
+
+    # ---- lifecycle ----
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, args=(self._queues[i],), name=f"{self.name}-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0, drain: bool = True):
+        """Stop the workers. With drain=True queued messages are processed first."""
+        deadline = time.time() + timeout
+        if drain:
+            with self._cond:
+                while (self._depth or self._in_flight) and self._running:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.time()))
+        self._threads = []
+
+    # ---- producer side ----
+    def submit(self, item: Any) -> bool:
+        """Queue an item. Returns False if the item itself was dropped."""
+        with self._cond:
+            queue = self._queue_for(item)
+            if self._depth >= self.max_size:
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    # prefer dropping from the item's own queue, so other cameras keep their backlog
+                    victim = queue if queue else max(self._queues, key=len)
+                    victim.popleft()
+                    self._depth -= 1
+                    self._dropped += 1
+                else:
+                    has_room = self._cond.wait_for(
+                        lambda: self._depth < self.max_size or not self._running,
+                        timeout=self.block_timeout,
+                    )
+                    if not has_room or self._depth >= self.max_size:
+                        self._dropped += 1
+                        return False
+
+            queue.append(item)
+            self._depth += 1
+            self._enqueued += 1
+            if self._depth > self._max_depth:
+                self._max_depth = self._depth
+            self._cond.notify_all()
+            return True
+
+    def _queue_for(self, item: Any) -> deque:
+        if self._key is None:
+            index = self._next_queue
+            self._next_queue = (index + 1) % self.workers
+        else:
+            index = hash(self._key(item)) % self.workers
+        return self._queues[index]
+
+    # ---- consumer side ----
+    def _worker_loop(self, queue: deque):
+        while True:
+            with self._cond:
+                while not queue and self._running:
+                    self._cond.wait()
+                if not queue:
+                    return  # stopped and nothing left
+                item = queue.popleft()
+                self._depth -= 1
+                self._in_flight += 1
+                # wake producers waiting for room under the block policy
+                self._cond.notify_all()
+
+            failed = False
+            try:
+                self.handler(item)
+            except Exception as exc:
+                failed = True
+                self._log(f"[MQTT] Worker error: {exc}")
+
+            with self._cond:
+                self._in_flight -= 1
+                if failed:
+                    self._errors += 1
+                else:
+                    self._processed += 1
+                self._cond.notify_all()
+
+    # ---- metrics ----
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "running": self._running,
+                "workers": self.workers,
+                "overflow_policy": self.overflow,
+                "queue_depth": self._depth,
+                "queue_depths": [len(queue) for queue in self._queues],
+                "queue_capacity": self.max_size,
+                "max_queue_depth": self._max_depth,
+                "in_flight": self._in_flight,
+                "enqueued": self._enqueued,
+                "processed": self._processed,
+                "dropped": self._dropped,
+                "errors": self._errors,
+            }
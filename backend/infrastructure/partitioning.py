@@ -0,0 +1,382 @@
+"""
+Time partitioning and retention for the append-only tables (fusion_data and
+position_history).
+
+On PostgreSQL each table is converted once into a ``PARTITION BY RANGE`` table
+on its timestamp column. The rows that existed before the conversion become a
+single ``<table>_legacy_<end>`` partition, and day or week partitions
+(``<table>_<start>_<end>``) are created ahead of time. Retention then drops
+whole partitions, which is instant and leaves no dead tuples. Queries that
+filter on the timestamp column only scan the partitions in their window.
+
+Rows outside every range (e.g. maintenance was down for longer than the
+premake horizon) land in ``<table>_default``. Before a range partition is
+created for them they are moved out of the default partition, and retention
+deletes expired rows from it by timestamp.
+
+SQLite has no partitioning, so retention deletes expired rows in bounded
+batches and commits between batches.
+"""
+
+from __future__ import annotations
+
+import atexit
+import datetime
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import MetaData, Table, delete, select, text
+
+PARTITION_INTERVAL = os.getenv("PARTITION_INTERVAL", "day")  # "day" or "week"
+PARTITION_PREMAKE = int(os.getenv("PARTITION_PREMAKE", 3))  # periods created ahead of now
+FUSION_RETENTION_DAYS = int(os.getenv("FUSION_RETENTION_DAYS", 30))  # 0 keeps rows forever
+POSITION_HISTORY_RETENTION_DAYS = int(os.getenv("POSITION_HISTORY_RETENTION_DAYS", 30))
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", 3600))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 5000))
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    name: str
+    column: str  # range partition key, must always be set on insert
+    retention_days: int
+
+
+PARTITIONED_TABLES = {
+    "fusion_data": PartitionedTable("fusion_data", "event_timestamp", FUSION_RETENTION_DAYS),
+    "position_history": PartitionedTable("position_history", "timestamp", POSITION_HISTORY_RETENTION_DAYS),
+}
+
+_DATE_FORMAT = "%Y%m%d"
+
+
+def period_start(day: datetime.date, interval: str = PARTITION_INTERVAL) -> datetime.date:
+    """First day of the day/week period containing `day` (weeks start on Monday)."""
+    if interval == "day":
+        return day
+    if interval == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    raise ValueError(f"unknown partition interval: {interval!r}")
+
+
+def period_end(start: datetime.date, interval: str = PARTITION_INTERVAL) -> datetime.date:
+    return start + datetime.timedelta(days=1 if interval == "day" else 7)
+
+
+def partition_name(table: str, start: Optional[datetime.date], end: datetime.date) -> str:
+    prefix = "legacy" if start is None else start.strftime(_DATE_FORMAT)
+    return f"{table}_{prefix}_{end.strftime(_DATE_FORMAT)}"
+
+
+def parse_partition_name(table: str, name: str) -> Optional[Tuple[Optional[datetime.date], datetime.date]]:
+    """Inverse of partition_name; None for partitions this module does not manage."""
+    match = re.fullmatch(rf"{re.escape(table)}_(legacy|\d{{8}})_(\d{{8}})", name)
+    if not match:
+        return None
+    start = None if match.group(1) == "legacy" else datetime.datetime.strptime(match.group(1), _DATE_FORMAT).date()
+    return start, datetime.datetime.strptime(match.group(2), _DATE_FORMAT).date()
+
+
+def _bound(day: datetime.date) -> str:
+    # pinned to UTC so timestamptz columns are cut at UTC midnight
+    return f"'{day.isoformat()} 00:00:00+00'"
+
+
+class PartitionManager:
+    def __init__(
+        self,
+        engine,
+        tables: Optional[Dict[str, PartitionedTable]] = None,
+        interval: str = PARTITION_INTERVAL,
+        premake: int = PARTITION_PREMAKE,
+        batch_size: int = RETENTION_BATCH_SIZE,
+        log_fn: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], datetime.datetime] = datetime.datetime.utcnow,
+    ):
+        period_start(datetime.date.today(), interval)  # validates interval
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.engine = engine
+        self.tables = PARTITIONED_TABLES if tables is None else tables
+        self.interval = interval
+        self.premake = premake
+        self.batch_size = batch_size
+        self._log = log_fn or (lambda _msg: None)
+        self._clock = clock
+
+    @property
+    def is_postgres(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    # ---- PostgreSQL partition maintenance ----
+    def _relkind(self, conn, table: str) -> Optional[str]:
+        return conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}
+        ).scalar()
+
+    def _partitions(self, conn, table: str) -> Dict[str, Tuple[Optional[datetime.date], datetime.date]]:
+        names = conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:t)"
+            ),
+            {"t": table},
+        ).scalars()
+        partitions = {}
+        for name in names:
+            bounds = parse_partition_name(table, name)
+            if bounds is not None:
+                partitions[name] = bounds
+        return partitions
+
+    def conversion_statements(self, spec: PartitionedTable, cutoff: datetime.date, sequence: Optional[str]) -> List[str]:
+        """DDL turning a plain table into a partitioned one holding the old rows below `cutoff`."""
+        table = Table(spec.name, MetaData(), autoload_with=self.engine)
+        legacy = partition_name(spec.name, None, cutoff)
+        column = f'"{spec.column}"'  # "timestamp" is also a type name
+        statements = [
+            f"LOCK TABLE {spec.name} IN ACCESS EXCLUSIVE MODE",
+            f"ALTER TABLE {spec.name} RENAME TO {legacy}",
+            # the partition key becomes part of the primary key, so it cannot be NULL;
+            # rows without one stay in the legacy partition and expire with it
+            f"UPDATE {legacy} SET {column} = 'epoch' WHERE {column} IS NULL",
+            f"ALTER TABLE {legacy} ALTER COLUMN {column} SET NOT NULL",
+            f"CREATE TABLE {spec.name} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({column})",
+            f"ALTER TABLE {spec.name} ADD PRIMARY KEY (id, {column})",
+        ]
+        for index in table.indexes:
+            columns = ", ".join(f'"{col.name}"' for col in index.columns)
+            statements.append(f"CREATE INDEX IF NOT EXISTS {index.name}_part ON {spec.name} ({columns})")
+        for fk in table.foreign_key_constraints:
+            local = ", ".join(col.name for col in fk.columns)
+            remote = ", ".join(element.column.name for element in fk.elements)
+            statements.append(
+                f"ALTER TABLE {spec.name} ADD FOREIGN KEY ({local}) REFERENCES {fk.referred_table.name} ({remote})"
+            )
+        if sequence:
+            # keep the id sequence alive when the legacy partition is dropped later
+            statements.append(f"ALTER SEQUENCE {sequence} OWNED BY {spec.name}.id")
+        statements += [
+            f"ALTER TABLE {spec.name} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ({_bound(cutoff)})",
+            f"CREATE TABLE IF NOT EXISTS {spec.name}_default PARTITION OF {spec.name} DEFAULT",
+        ]
+        return statements
+
+    def _convert(self, conn, spec: PartitionedTable, today: datetime.date):
+        newest = conn.execute(text(f'SELECT max("{spec.column}") FROM {spec.name}')).scalar()
+        newest_day = max(today, newest.date()) if newest is not None else today
+        cutoff = period_end(period_start(newest_day, self.interval), self.interval)
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": spec.name}).scalar()
+        for stmt in self.conversion_statements(spec, cutoff, sequence):
+            conn.execute(text(stmt))
+        self._log(f"[Partition] Converted {spec.name} to range partitions on {spec.column}")
+
+    def partition_statements(self, spec: PartitionedTable, start: datetime.date, end: datetime.date,
+                             move_default: bool = False) -> List[str]:
+        """
+        DDL creating the [start, end) partition. With `move_default`, the rows
+        of that range already in the default partition are moved into it (the
+        default partition is detached meanwhile, or PostgreSQL rejects the new range).
+        """
+        name = partition_name(spec.name, start, end)
+        create = (
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {spec.name} "
+            f"FOR VALUES FROM ({_bound(start)}) TO ({_bound(end)})"
+        )
+        if not move_default:
+            return [create]
+        default = f"{spec.name}_default"
+        in_range = f'"{spec.column}" >= {_bound(start)} AND "{spec.column}" < {_bound(end)}'
+        return [
+            f"ALTER TABLE {spec.name} DETACH PARTITION {default}",
+            create,
+            f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}",
+            f"DELETE FROM {default} WHERE {in_range}",
+            f"ALTER TABLE {spec.name} ATTACH PARTITION {default} DEFAULT",
+        ]
+
+    def _default_has_rows(self, conn, spec: PartitionedTable, start: datetime.date, end: datetime.date) -> bool:
+        default = f"{spec.name}_default"
+        if self._relkind(conn, default) is None:
+            return False
+        return bool(conn.execute(text(
+            f'SELECT EXISTS (SELECT 1 FROM {default} '
+            f'WHERE "{spec.column}" >= {_bound(start)} AND "{spec.column}" < {_bound(end)})'
+        )).scalar())
+
+    def _premake(self, conn, spec: PartitionedTable, today: datetime.date) -> List[str]:
+        existing = sorted(self._partitions(conn, spec.name).values(), key=lambda bounds: bounds[1])
+        created = []
+        start = period_start(today, self.interval)
+        for _ in range(self.premake + 1):
+            end = period_end(start, self.interval)
+            first = start
+            for part_start, part_end in existing:
+                if (part_start is None or part_start < end) and part_end > first:
+                    first = max(first, part_end)
+            if first < end:
+                move_default = self._default_has_rows(conn, spec, first, end)
+                for stmt in self.partition_statements(spec, first, end, move_default=move_default):
+                    conn.execute(text(stmt))
+                if move_default:
+                    self._log(f"[Partition] Moved {spec.name}_default rows into {partition_name(spec.name, first, end)}")
+                existing.append((first, end))
+                created.append(partition_name(spec.name, first, end))
+            start = end
+        return created
+
+    def ensure(self) -> Dict[str, List[str]]:
+        """Convert tables to partitioned form if needed and create upcoming partitions."""
+        if not self.is_postgres:
+            return {}
+        today = self._clock().date()
+        created = {}
+        for spec in self.tables.values():
+            with self.engine.begin() as conn:
+                kind = self._relkind(conn, spec.name)
+                if kind is None:
+                    continue
+                if kind == "r":
+                    self._convert(conn, spec, today)
+                created[spec.name] = self._premake(conn, spec, today)
+            if created[spec.name]:
+                self._log(f"[Partition] Created {', '.join(created[spec.name])}")
+        return created
+
+    # ---- retention ----
+    def _drop_partitions_before(self, spec: PartitionedTable, cutoff: datetime.datetime) -> int:
+        deleted = 0
+        with self.engine.begin() as conn:
+            if self._relkind(conn, spec.name) != "p":
+                return 0
+            for name, (_start, end) in self._partitions(conn, spec.name).items():
+                if end <= cutoff.date():
+                    deleted += conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+                    conn.execute(text(f"DROP TABLE {name}"))
+                    self._log(f"[Partition] Dropped {name}")
+            default = f"{spec.name}_default"
+            if self._relkind(conn, default) is not None:
+                # no range covers these rows, so no partition drop ever removes them
+                if cutoff.tzinfo is None:
+                    cutoff = cutoff.replace(tzinfo=datetime.timezone.utc)
+                deleted += conn.execute(
+                    text(f'DELETE FROM {default} WHERE "{spec.column}" < :cutoff'), {"cutoff": cutoff}
+                ).rowcount
+        return deleted
+
+    def _delete_in_batches(self, spec: PartitionedTable, cutoff: Optional[datetime.datetime]) -> int:
+        table = Table(spec.name, MetaData(), autoload_with=self.engine)
+        expired = select(table.c.id).limit(self.batch_size)
+        if cutoff is not None:
+            expired = expired.where(table.c[spec.column] < cutoff)
+        deleted = 0
+        while True:
+            with self.engine.begin() as conn:
+                count = conn.execute(delete(table).where(table.c.id.in_(expired))).rowcount
+            deleted += count
+            if count < self.batch_size:
+                return deleted
+
+    def purge_before(self, table: str, cutoff: Optional[datetime.datetime] = None) -> int:
+        """
+        Remove rows of `table` older than `cutoff` (all rows when None).
+        Whole partitions are dropped where possible; the rest is deleted in
+        batches of `batch_size`. Returns the number of rows removed.
+        """
+        spec = self.tables[table]
+        if cutoff is None and self.is_postgres:
+            with self.engine.begin() as conn:
+                deleted = conn.execute(text(f"SELECT count(*) FROM {spec.name}")).scalar()
+                conn.execute(text(f"TRUNCATE {spec.name}"))
+            return deleted
+        deleted = 0
+        if cutoff is not None and self.is_postgres:
+            deleted += self._drop_partitions_before(spec, cutoff)
+        return deleted + self._delete_in_batches(spec, cutoff)
+
+    def apply_retention(self) -> Dict[str, int]:
+        """Drop (or delete) everything older than each table's retention period."""
+        now = self._clock()
+        removed = {}
+        for spec in self.tables.values():
+            if spec.retention_days <= 0:
+                continue
+            cutoff = now - datetime.timedelta(days=spec.retention_days)
+            if self.is_postgres:
+                # only whole partitions (plus expired rows of the default partition);
+                # rows in the boundary partition go with it later
+                removed[spec.name] = self._drop_partitions_before(spec, cutoff)
+            else:
+                removed[spec.name] = self._delete_in_batches(spec, cutoff)
+        return removed
+
+
+class RetentionWorker:
+    """Background thread that keeps partitions ahead of time and applies retention."""
+
+    def __init__(self, manager: PartitionManager, interval_seconds: float = RETENTION_INTERVAL_SECONDS,
+                 log_fn: Optional[Callable[[str], None]] = None):
+        self.manager = manager
+        self.interval = interval_seconds
+        self._log = log_fn or (lambda _msg: None)
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_run: Dict[str, Any] = {}
+
+    def run_once(self) -> Dict[str, Any]:
+        result = {"created": self.manager.ensure(), "removed": self.manager.apply_retention()}
+        self._last_run = {"at": datetime.datetime.utcnow().isoformat(), **result}
+        return result
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as exc:
+                self._log(f"[Partition] Retention run failed: {exc}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"interval_seconds": self.interval, "last_run": self._last_run}
+
+
+_retention_worker: Optional[RetentionWorker] = None
+
+
+def start_retention(flask_app, log_fn: Optional[Callable[[str], None]] = print) -> RetentionWorker:
+    """Run partition maintenance once (so partitions exist before inserts), then every interval."""
+    global _retention_worker
+    from domain.models import db
+
+    with flask_app.app_context():
+        manager = PartitionManager(db.engine, log_fn=log_fn)
+    worker = RetentionWorker(manager, log_fn=log_fn)
+    try:
+        worker.run_once()
+    except Exception as exc:
+        if log_fn:
+            log_fn(f"[Partition] Initial maintenance failed: {exc}")
+    worker.start()
+    atexit.register(worker.stop)
+    _retention_worker = worker
+    return worker
+
+
+def get_retention_stats() -> Dict[str, Any]:
+    return _retention_worker.stats() if _retention_worker is not None else {}
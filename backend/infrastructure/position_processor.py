@@ -22,14 +22,28 @@ class PositionProcessor:
             return []
 
         observations = payload['frame'].get('observations', [])
-        positions = []
 
-        #Process each person detected in the frame
+        #Floorplan positions of every person detected in the frame
+        located = []
         for obs in observations:
-            position = self._process_observation(camera_id, obs)
+            position = self._locate_observation(obs)
             if position:
-                positions.append(position)
+                located.append(position)
+        if not located:
+            return []
 
+        #Merge them with other camera observations in one step, one global track per person
+        global_ids = self.track_fusion.fuse_frame(camera_id, located)
+
+        positions = []
+        for global_id in global_ids:
+            #Get the combined position from all cameras
+            fused_position = self.track_fusion.get_track_position(global_id)
+            positions.append({
+                'track_id': global_id,
+                'x_m': fused_position['x_m'],
+                'y_m': fused_position['y_m']
+            })
         return positions
     
     def _extract_camera_id(self, topic):
@@ -39,8 +53,8 @@ class PositionProcessor:
                 return parts[1] 
         return None
 
-    #Turn a single detection into a fused position
-    def _process_observation(self, camera_id, obs):
+    #Turn a single detection into (track_id, x_m, y_m) on the floorplan
+    def _locate_observation(self, obs):
         track_id = obs.get('track_id')
         geo = obs.get('geoposition', {})
 
@@ -57,19 +71,4 @@ class PositionProcessor:
         pos_on_floorplan = self.floorplan_manager.calculate_position_on_floorplan(
             float(lat), float(lon), self.bottom_left_coord
         )
-
-        #Merge this with other camera observations of same person
-        global_id = self.track_fusion.fuse_track(
-            camera_id,
-            track_id,
-            pos_on_floorplan['x_m'],
-            pos_on_floorplan['y_m']
-        )
-
-        #Get the combined position from all cameras
-        fused_position = self.track_fusion.get_track_position(global_id)
-        return {
-            'track_id': global_id,
-            'x_m': fused_position['x_m'],
-            'y_m': fused_position['y_m']
-        }
\ No newline at end of file
+        return track_id, pos_on_floorplan['x_m'], pos_on_floorplan['y_m']
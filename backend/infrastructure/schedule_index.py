@@ -0,0 +1,149 @@
+"""
+In-memory per-floorplan schedule model used to arm zones for intrusion detection.
+
+The schedules of a floorplan are loaded once and compiled into detached
+``ScheduleWindow`` objects. ``FloorplanSchedules.armed_zone_ids(t)`` evaluates
+them once, remembers the result together with the next instant at which any
+schedule starts or ends, and answers every later call before that instant
+with the cached set, so the per-frame check is O(1).
+
+Arming rule: a zone without enabled schedules is always armed (the previous
+behaviour); a zone with enabled schedules is armed only while one of them is
+active. Disabling a schedule lifts its restriction instead of silencing the
+zone.
+
+Schedule and zone writes call ``notify_zones_changed``, which drops the
+floorplan; entries also expire after ``SCHEDULE_INDEX_TTL`` seconds so that
+changes made by another process are eventually picked up.
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from domain.models.zone import ScheduleWindow, ZoneSchedule, Zone, on_zones_changed
+
+SCHEDULE_INDEX_TTL = float(os.getenv("SCHEDULE_INDEX_TTL", 60))
+
+
+class FloorplanSchedules:
+    """Compiled schedules of one floorplan plus the cached armed state."""
+
+    def __init__(self, windows: Iterable[ScheduleWindow]):
+        self.windows: Tuple[ScheduleWindow, ...] = tuple(windows)
+        self._enabled = tuple(w for w in self.windows if w.enabled)
+        # zones restricted by at least one enabled schedule
+        self.scheduled_zone_ids: FrozenSet[int] = frozenset(
+            w.zone_id for w in self._enabled if w.zone_id is not None
+        )
+        self._lock = threading.Lock()
+        # (valid_from, valid_until, active zone ids); valid_until None = forever
+        self._state: Optional[Tuple[datetime.datetime, Optional[datetime.datetime], FrozenSet[int]]] = None
+        self.evaluations = 0
+
+    def _evaluate(self, at: datetime.datetime):
+        active = frozenset(w.zone_id for w in self._enabled if w.is_active(at))
+        transitions = [t for t in (w.next_transition(at) for w in self._enabled) if t is not None]
+        return at, (min(transitions) if transitions else None), active
+
+    def active_zone_ids(self, at: datetime.datetime) -> FrozenSet[int]:
+        """Zones with an enabled schedule active at `at`."""
+        state = self._state
+        if state is None or at < state[0] or (state[1] is not None and at >= state[1]):
+            state = self._evaluate(at)
+            with self._lock:
+                self._state = state
+                self.evaluations += 1
+        return state[2]
+
+    def next_transition(self, at: datetime.datetime) -> Optional[datetime.datetime]:
+        """Next instant after `at` at which the armed state may change."""
+        self.active_zone_ids(at)
+        return self._state[1]
+
+    def is_armed(self, zone_id: int, at: datetime.datetime) -> bool:
+        return zone_id not in self.scheduled_zone_ids or zone_id in self.active_zone_ids(at)
+
+
+def _load_schedules(floorplan_id: int) -> List[Any]:
+    return (
+        ZoneSchedule.query.join(Zone)
+        .filter(Zone.floorplan_id == floorplan_id)
+        .order_by(ZoneSchedule.id)
+        .all()
+    )
+
+
+class ScheduleIndex:
+    def __init__(
+        self,
+        loader: Callable[[int], List[Any]] = _load_schedules,
+        ttl_seconds: float = SCHEDULE_INDEX_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._loader = loader
+        self.ttl = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[FloorplanSchedules, float]] = {}
+        # bumped on every invalidation so a load racing with a schedule write is not cached
+        self._generation = 0
+
+        self._hits = 0
+        self._loads = 0
+        self._invalidations = 0
+
+    def floorplan(self, floorplan_id: int) -> FloorplanSchedules:
+        """Compiled schedules of a floorplan. Loads from the database on a miss (needs an app context)."""
+        with self._lock:
+            entry = self._entries.get(floorplan_id)
+            if entry is not None and self._clock() - entry[1] <= self.ttl:
+                self._hits += 1
+                return entry[0]
+            generation = self._generation
+
+        entry = FloorplanSchedules(row.window() for row in self._loader(floorplan_id))
+
+        with self._lock:
+            self._loads += 1
+            if generation == self._generation:
+                self._entries[floorplan_id] = (entry, self._clock())
+        return entry
+
+    def is_armed(self, floorplan_id: int, zone_id: int, at: Optional[datetime.datetime] = None) -> bool:
+        """Whether intrusions in the zone should trigger at `at` (default: now, local time)."""
+        return self.floorplan(floorplan_id).is_armed(zone_id, at or datetime.datetime.now())
+
+    def invalidate(self, floorplan_id: Optional[int] = None):
+        """Drop one floorplan (or everything when None) from the index."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            if floorplan_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(floorplan_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "floorplans": len(self._entries),
+                "schedules": sum(len(s.windows) for s, _ in self._entries.values()),
+                "evaluations": sum(s.evaluations for s, _ in self._entries.values()),
+                "hits": self._hits,
+                "loads": self._loads,
+                "invalidations": self._invalidations,
+                "ttl_seconds": self.ttl,
+            }
+
+
+schedule_index = ScheduleIndex()
+on_zones_changed(schedule_index.invalidate)
+
+
+def get_schedule_index_stats() -> Dict[str, Any]:
+    return schedule_index.stats()
@@ -0,0 +1,411 @@
+"""
+Per-camera pre-roll ring buffer for intrusion clips and snapshots.
+
+One long-running ffmpeg per camera stream-copies the RTSP feed into short
+MPEG-TS segments (``seg_<unix start time>.ts``) in ``SEGMENT_DIR``, a tmpfs
+directory by default, and segments older than ``SEGMENT_RETENTION_SECONDS``
+are deleted. An event clip is then assembled from segments that already exist
+with a stream-copy concat covering ``PRE_ROLL_SECONDS`` before and
+``POST_ROLL_SECONDS`` after the trigger, and a snapshot is the last frame of
+the newest complete segment. Neither opens a new RTSP session, and the
+seconds before the trigger end up in the clip.
+
+Cameras without a running recorder that wrote a segment recently make
+``save_clip``/``save_snapshot`` return False so the caller can fall back to a
+direct RTSP capture; a clip whose assembly fails later calls ``on_failure``
+for the same reason. Recorders follow the camera table: after
+``start_segment_buffers`` every ``notify_cameras_changed`` starts recorders
+for new cameras and stops those of removed ones.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from domain.models.camera import on_cameras_changed
+from infrastructure.camera_registry import camera_registry
+
+SEGMENT_BUFFER_ENABLED = os.getenv("SEGMENT_BUFFER_ENABLED", "1") not in ("0", "false", "False")
+SEGMENT_DIR = os.getenv(
+    "SEGMENT_DIR",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "axis-segments"),
+)
+SEGMENT_SECONDS = float(os.getenv("SEGMENT_SECONDS", 2))
+SEGMENT_RETENTION_SECONDS = float(os.getenv("SEGMENT_RETENTION_SECONDS", 60))
+PRE_ROLL_SECONDS = float(os.getenv("PRE_ROLL_SECONDS", 5))
+POST_ROLL_SECONDS = float(os.getenv("POST_ROLL_SECONDS", 10))
+
+_SEGMENT_RE = re.compile(r"^seg_(\d+)\.ts$")
+
+
+def _default_schedule(delay: float, fn: Callable[[], Any]):
+    timer = threading.Timer(max(0.0, delay), fn)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+class SegmentRecorder:
+    """Keeps one ffmpeg segmenting a camera's RTSP stream into `directory`, restarting it if it dies."""
+
+    def __init__(
+        self,
+        camera_id: Any,
+        rtsp_url: str,
+        directory: str,
+        segment_seconds: float = SEGMENT_SECONDS,
+        retention_seconds: float = SEGMENT_RETENTION_SECONDS,
+        popen: Callable[..., Any] = subprocess.Popen,
+        clock: Callable[[], float] = time.time,
+        log_fn: Optional[Callable[[str], None]] = None,
+    ):
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self._popen = popen
+        self._clock = clock
+        self._log = log_fn or print
+        self._process = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.restarts = 0
+
+    def command(self) -> List[str]:
+        return [
+            "ffmpeg",
+            "-nostdin",
+            "-loglevel", "error",
+            "-rtsp_transport", "tcp",
+            "-i", self.rtsp_url,
+            "-map", "0",
+            "-c", "copy",
+            "-f", "segment",
+            "-segment_time", str(self.segment_seconds),
+            "-segment_format", "mpegts",
+            "-reset_timestamps", "1",
+            "-strftime", "1",
+            os.path.join(self.directory, "seg_%s.ts"),
+        ]
+
+    # ---- lifecycle ----
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._supervise, name=f"segments-{self.camera_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        self._terminate()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def fresh(self, now: Optional[float] = None) -> bool:
+        """Whether a segment was completed within the last few segment lengths, i.e. the stream is flowing."""
+        now = self._clock() if now is None else now
+        complete = self.complete_segments()
+        return bool(complete) and complete[-1][1] >= now - 3 * self.segment_seconds
+
+    def _spawn(self):
+        self._process = self._popen(self.command(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _terminate(self):
+        process, self._process = self._process, None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except Exception:
+                process.kill()
+
+    def _supervise(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            if not self.running():
+                try:
+                    self._spawn()
+                    self.restarts += 1
+                except Exception as exc:
+                    self._log(f"[Segments] camera {self.camera_id}: cannot start ffmpeg: {exc}")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                    continue
+            else:
+                backoff = 1.0
+            self.prune()
+            self._stop.wait(self.segment_seconds)
+
+    # ---- segments ----
+    def segments(self) -> List[Tuple[float, str]]:
+        """(start time, path) of the buffered segments, oldest first. The last one may still be written."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            match = _SEGMENT_RE.match(name)
+            if match:
+                found.append((float(match.group(1)), os.path.join(self.directory, name)))
+        found.sort()
+        return found
+
+    def complete_segments(self) -> List[Tuple[float, float, str]]:
+        """(start, end, path) of segments that are finished, i.e. have a successor."""
+        segments = self.segments()
+        return [(start, segments[i + 1][0], path) for i, (start, path) in enumerate(segments[:-1])]
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete segments that ended more than `retention_seconds` ago."""
+        now = self._clock() if now is None else now
+        removed = 0
+        for start, end, path in self.complete_segments():
+            if end < now - self.retention_seconds:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+class SegmentBuffer:
+    """Recorders for all cameras plus clip/snapshot assembly from their segments."""
+
+    def __init__(
+        self,
+        root: str = SEGMENT_DIR,
+        segment_seconds: float = SEGMENT_SECONDS,
+        retention_seconds: float = SEGMENT_RETENTION_SECONDS,
+        pre_roll: float = PRE_ROLL_SECONDS,
+        post_roll: float = POST_ROLL_SECONDS,
+        popen: Callable[..., Any] = subprocess.Popen,
+        run: Callable[..., Any] = subprocess.run,
+        schedule: Callable[[float, Callable[[], Any]], Any] = _default_schedule,
+        clock: Callable[[], float] = time.time,
+        log_fn: Optional[Callable[[str], None]] = None,
+    ):
+        self.root = root
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self._popen = popen
+        self._run = run
+        self._schedule = schedule
+        self._clock = clock
+        self._log = log_fn or print
+        self._lock = threading.Lock()
+        self._recorders: Dict[Any, SegmentRecorder] = {}
+
+        self._clips = 0
+        self._clip_failures = 0
+        self._snapshots = 0
+
+    # ---- recorders ----
+    def ensure(self, camera_id: Any, rtsp_url: str) -> SegmentRecorder:
+        """Start (or keep) the recorder of a camera; restarts it if the URL changed."""
+        with self._lock:
+            recorder = self._recorders.get(camera_id)
+            if recorder is not None and recorder.rtsp_url == rtsp_url:
+                return recorder
+            if recorder is not None:
+                recorder.stop()
+            recorder = SegmentRecorder(
+                camera_id, rtsp_url, os.path.join(self.root, str(camera_id)),
+                segment_seconds=self.segment_seconds, retention_seconds=self.retention_seconds,
+                popen=self._popen, clock=self._clock, log_fn=self._log,
+            )
+            self._recorders[camera_id] = recorder
+        recorder.start()
+        return recorder
+
+    def recorder(self, camera_id: Any) -> Optional[SegmentRecorder]:
+        with self._lock:
+            return self._recorders.get(camera_id)
+
+    def stop(self):
+        with self._lock:
+            recorders, self._recorders = list(self._recorders.values()), {}
+        for recorder in recorders:
+            recorder.stop()
+
+    def sync(self, cameras) -> Tuple[int, int]:
+        """
+        Run a recorder for exactly the given cameras (CameraInfo records):
+        start new ones, restart changed URLs, stop the rest. Returns (running, stopped).
+        """
+        wanted = {camera.id: camera.rtsp_url for camera in cameras if camera.rtsp_url}
+        with self._lock:
+            removed = [self._recorders.pop(camera_id) for camera_id in list(self._recorders) if camera_id not in wanted]
+        for recorder in removed:
+            recorder.stop()
+        for camera_id, rtsp_url in wanted.items():
+            self.ensure(camera_id, rtsp_url)
+        return len(wanted), len(removed)
+
+    # ---- clips ----
+    def save_clip(
+        self,
+        camera_id: Any,
+        output_path: str,
+        event_time: Optional[float] = None,
+        on_failure: Optional[Callable[[], Any]] = None,
+    ) -> bool:
+        """
+        Schedule `output_path` to be assembled from the pre/post-roll segments
+        around `event_time` once the post-roll has been recorded. Returns False
+        when the camera has no running recorder or it has not completed a
+        segment recently (ffmpeg dead or reconnecting). If the assembly fails
+        anyway, `on_failure` is called so the caller can still capture a clip.
+        """
+        recorder = self.recorder(camera_id)
+        if recorder is None or not recorder.running() or not recorder.fresh():
+            return False
+        event_time = self._clock() if event_time is None else event_time
+        # wait for the post-roll plus one segment, so the segment covering it is closed
+        delay = event_time + self.post_roll + self.segment_seconds - self._clock()
+
+        def assemble():
+            if not self.assemble_clip(recorder, output_path, event_time) and on_failure is not None:
+                on_failure()
+
+        self._schedule(delay, assemble)
+        return True
+
+    def assemble_clip(self, recorder: SegmentRecorder, output_path: str, event_time: float) -> bool:
+        """Concatenate (stream copy) the complete segments overlapping the pre/post-roll window."""
+        window_start, window_end = event_time - self.pre_roll, event_time + self.post_roll
+        paths = [path for start, end, path in recorder.complete_segments() if end > window_start and start < window_end]
+        if not paths:
+            self._log(f"[Segments] camera {recorder.camera_id}: no segments for clip {output_path}")
+            with self._lock:
+                self._clip_failures += 1
+            return False
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        list_path = f"{output_path}.segments.txt"
+        with open(list_path, "w") as f:
+            for path in paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            result = self._run(
+                ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", "-y", output_path],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60,
+            )
+            ok = result.returncode == 0
+        except Exception as exc:
+            self._log(f"[Segments] camera {recorder.camera_id}: concat failed: {exc}")
+            ok = False
+        finally:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+
+        with self._lock:
+            if ok:
+                self._clips += 1
+            else:
+                self._clip_failures += 1
+        if ok:
+            self._log(f"[Clip] Saved {len(paths)} segments → {output_path}")
+        return ok
+
+    # ---- snapshots ----
+    def save_snapshot(self, camera_id: Any, output_path: str) -> bool:
+        """
+        Write the last frame of the newest complete segment to `output_path`
+        (synchronous). Returns False under the same conditions as save_clip, so
+        a stale frame is never passed off as the event snapshot.
+        """
+        recorder = self.recorder(camera_id)
+        if recorder is None or not recorder.running() or not recorder.fresh():
+            return False
+        complete = recorder.complete_segments()
+        if not complete:
+            return False
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        try:
+            result = self._run(
+                ["ffmpeg", "-nostdin", "-loglevel", "error", "-sseof", "-0.5", "-i", complete[-1][2],
+                 "-frames:v", "1", "-q:v", "2", "-y", output_path],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10,
+            )
+        except Exception as exc:
+            self._log(f"[Segments] camera {camera_id}: snapshot failed: {exc}")
+            return False
+        if result.returncode != 0:
+            return False
+        with self._lock:
+            self._snapshots += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recorders = dict(self._recorders)
+            stats = {
+                "enabled": SEGMENT_BUFFER_ENABLED,
+                "root": self.root,
+                "clips": self._clips,
+                "clip_failures": self._clip_failures,
+                "snapshots": self._snapshots,
+                "pre_roll_seconds": self.pre_roll,
+                "post_roll_seconds": self.post_roll,
+            }
+        stats["cameras"] = {
+            str(camera_id): {
+                "running": recorder.running(),
+                "fresh": recorder.fresh(),
+                "segments": len(recorder.segments()),
+                "restarts": recorder.restarts,
+            }
+            for camera_id, recorder in recorders.items()
+        }
+        return stats
+
+
+segment_buffer = SegmentBuffer()
+_following_cameras = False
+
+
+def start_segment_buffers(cameras) -> int:
+    """
+    Start a recorder for every camera (CameraInfo records) and keep the set in
+    step with later camera changes. Returns how many run.
+    """
+    global _following_cameras
+    if not SEGMENT_BUFFER_ENABLED:
+        return 0
+    running, _ = segment_buffer.sync(cameras)
+    if not _following_cameras:
+        _following_cameras = True
+        on_cameras_changed(_resync_segment_buffers)
+    return running
+
+
+def _resync_segment_buffers():
+    # Runs in the request that changed the cameras (app context available), after
+    # the registry dropped its snapshot; stopping ffmpeg can take seconds, so the
+    # recorders are adjusted on a separate thread.
+    cameras = camera_registry.cameras()
+    threading.Thread(target=segment_buffer.sync, args=(cameras,), name="segments-sync", daemon=True).start()
+
+
+def get_segment_buffer_stats() -> Dict[str, Any]:
+    return segment_buffer.stats()
@@ -0,0 +1,68 @@
+"""
+Backfill job that moves inline base64 snapshots out of fusion_data rows and
+into the content-addressed snapshot store.
+
+Rows are processed in primary-key order in batches, committing after every
+batch, so the job can be interrupted and restarted at any time.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+from domain.models import FusionData, db
+from infrastructure.fusion_persistence import strip_snapshot
+from infrastructure.snapshot_store import SnapshotStore, snapshot_store
+
+
+def backfill_fusion_snapshots(
+    batch_size: int = 500,
+    store: Optional[SnapshotStore] = None,
+    max_batches: Optional[int] = None,
+    log_fn: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Move snapshot_base64 of every FusionData row into the snapshot store.
+    Must run inside an app context. Returns a summary of what was done.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    store = store or snapshot_store
+    log = log_fn or (lambda _msg: None)
+
+    summary = {"batches": 0, "migrated": 0, "failed": 0, "bytes": 0}
+    last_id = 0
+    while max_batches is None or summary["batches"] < max_batches:
+        rows = (
+            FusionData.query.filter(
+                FusionData.id > last_id,
+                FusionData.snapshot_base64.isnot(None),
+            )
+            .order_by(FusionData.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        for row in rows:
+            last_id = row.id
+            try:
+                digest, size = store.put_base64(row.snapshot_base64)
+            except (OSError, ValueError) as exc:
+                summary["failed"] += 1
+                log(f"[Backfill] fusion_data {row.id}: {exc}")
+                continue
+            row.snapshot_hash = digest
+            row.snapshot_size = size
+            row.snapshot_base64 = None
+            if isinstance(row.raw_payload, dict):
+                row.raw_payload = strip_snapshot(row.raw_payload, digest, size)
+            summary["migrated"] += 1
+            summary["bytes"] += size
+
+        db.session.commit()
+        summary["batches"] += 1
+        log(f"[Backfill] batch {summary['batches']}: up to id {last_id}, {summary['migrated']} migrated")
+
+    return summary
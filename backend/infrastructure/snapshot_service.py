@@ -0,0 +1,170 @@
+"""
+Camera snapshots from the live frame buffer, with VAPIX and ffmpeg fallbacks.
+
+The shared ``VideoCamera`` of a camera (see ``livestream.shared_camera``)
+already decodes the stream and keeps the newest frame JPEG-encoded, so a
+snapshot is normally a copy of those bytes. Only when no capture thread runs
+for the camera, or its newest frame is older than ``SNAPSHOT_MAX_AGE_SECONDS``
+(stream paused or disconnected), is the camera asked for a new image: first
+over VAPIX (``axis-cgi/jpg/image.cgi``), then by grabbing one frame from RTSP
+with ffmpeg. Every result says which source produced it and how old the frame
+was, and the counters are reported by ``stats()``.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from infrastructure.camera_registry import CAMERA_PASS, CAMERA_USER, camera_registry, rtsp_url_for
+from infrastructure.livestream import running_camera
+
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", 2))
+SNAPSHOT_TIMEOUT_SECONDS = float(os.getenv("SNAPSHOT_TIMEOUT_SECONDS", 10))
+
+LIVE = "live"
+VAPIX = "vapix"
+FFMPEG = "ffmpeg"
+
+
+@dataclass(frozen=True)
+class SnapshotImage:
+    data: bytes  # JPEG
+    source: str  # LIVE, VAPIX or FFMPEG
+    age_seconds: float  # how old the frame was when it was taken; 0 for a fresh grab
+
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.data)
+        return path
+
+    def info(self) -> Dict[str, Any]:
+        return {"source": self.source, "age_seconds": round(self.age_seconds, 3), "file_size": len(self.data)}
+
+
+class SnapshotService:
+    def __init__(
+        self,
+        frame_source: Callable[[str], Any] = running_camera,
+        http_get: Callable[..., Any] = requests.get,
+        run: Callable[..., Any] = subprocess.run,
+        max_age_seconds: float = SNAPSHOT_MAX_AGE_SECONDS,
+        timeout: float = SNAPSHOT_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.time,
+        log_fn: Optional[Callable[[str], None]] = None,
+    ):
+        self._frame_source = frame_source
+        self._http_get = http_get
+        self._run = run
+        self.max_age = max_age_seconds
+        self.timeout = timeout
+        self._clock = clock
+        self._log = log_fn or print
+        self._lock = threading.Lock()
+
+        self._counts = {LIVE: 0, VAPIX: 0, FFMPEG: 0}
+        self._stale = 0  # live frame present but older than max_age
+        self._failures = 0
+        self._last: Optional[Dict[str, Any]] = None
+
+    # ---- sources ----
+    def live(self, ip_address: str) -> Optional[SnapshotImage]:
+        """Newest frame of the camera's capture thread if it is fresh enough."""
+        camera = self._frame_source(ip_address)
+        if camera is None:
+            return None
+        data, encoded_at = camera.latest_jpeg()
+        if not data:
+            return None
+        age = max(0.0, self._clock() - encoded_at)
+        if age > self.max_age:
+            with self._lock:
+                self._stale += 1
+            return None
+        return SnapshotImage(data, LIVE, age)
+
+    def vapix(self, ip_address: str) -> Optional[SnapshotImage]:
+        try:
+            response = self._http_get(
+                f"http://{ip_address}/axis-cgi/jpg/image.cgi",
+                auth=(CAMERA_USER, CAMERA_PASS),
+                timeout=self.timeout,
+            )
+        except Exception as exc:
+            self._log(f"[Snapshot] VAPIX request to {ip_address} failed: {exc}")
+            return None
+        if response.status_code != 200 or not response.content:
+            self._log(f"[Snapshot] VAPIX returned {response.status_code} for {ip_address}")
+            return None
+        return SnapshotImage(response.content, VAPIX, 0.0)
+
+    def ffmpeg(self, rtsp_url: str) -> Optional[SnapshotImage]:
+        try:
+            result = self._run(
+                ["ffmpeg", "-nostdin", "-loglevel", "error", "-rtsp_transport", "tcp", "-i", rtsp_url,
+                 "-frames:v", "1", "-q:v", "2", "-f", "image2", "-c:v", "mjpeg", "pipe:1"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=self.timeout,
+            )
+        except Exception as exc:
+            self._log(f"[Snapshot] ffmpeg grab failed: {exc}")
+            return None
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return SnapshotImage(result.stdout, FFMPEG, 0.0)
+
+    # ---- entry points ----
+    def capture(
+        self, ip_address: str, rtsp_url: Optional[str] = None, use_live: bool = True, fallback: bool = True
+    ) -> Optional[SnapshotImage]:
+        """
+        Live frame, else VAPIX, else ffmpeg; None if every source failed.
+        With fallback=False only the live frame is tried (a miss is not counted as a failure).
+        """
+        snapshot = self.live(ip_address) if use_live else None
+        if snapshot is None and not fallback:
+            return None
+        if snapshot is None:
+            snapshot = self.vapix(ip_address) or self.ffmpeg(rtsp_url or rtsp_url_for(ip_address))
+        self._record(ip_address, snapshot)
+        return snapshot
+
+    def capture_camera(self, camera_id, use_live: bool = True, fallback: bool = True) -> Optional[SnapshotImage]:
+        """capture() for a camera id from the camera registry."""
+        camera = camera_registry.by_id(camera_id)
+        if camera is None:
+            return None
+        return self.capture(camera.ip_address, camera.rtsp_url, use_live=use_live, fallback=fallback)
+
+    def _record(self, ip_address: str, snapshot: Optional[SnapshotImage]):
+        with self._lock:
+            if snapshot is None:
+                self._failures += 1
+                return
+            self._counts[snapshot.source] += 1
+            self._last = {"ip": ip_address, **snapshot.info()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "live": self._counts[LIVE],
+                "vapix": self._counts[VAPIX],
+                "ffmpeg": self._counts[FFMPEG],
+                "stale_live_frames": self._stale,
+                "failures": self._failures,
+                "last": self._last,
+                "max_age_seconds": self.max_age,
+            }
+
+
+snapshot_service = SnapshotService()
+
+
+def get_snapshot_service_stats() -> Dict[str, Any]:
+    return snapshot_service.stats()
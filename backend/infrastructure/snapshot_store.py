@@ -0,0 +1,79 @@
+"""
+Content-addressed on-disk store for fusion snapshots.
+
+Images are stored once under their SHA-256 digest
+(``<root>/<first two hex chars>/<digest>``), so identical snapshots are
+deduplicated and the database only needs to keep the digest and size.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from typing import Optional, Tuple
+
+SNAPSHOT_STORE_DIR = os.getenv("SNAPSHOT_STORE_DIR", "snapshots/fusion")
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def decode_base64_image(data: str) -> bytes:
+    """Decode a base64 snapshot, accepting an optional ``data:image/...;base64,`` prefix."""
+    if data.startswith("data:"):
+        _, _, data = data.partition(",")
+    try:
+        return base64.b64decode(data, validate=False)
+    except binascii.Error as exc:
+        raise ValueError(f"invalid base64 snapshot: {exc}") from exc
+
+
+class SnapshotStore:
+    def __init__(self, root: str = SNAPSHOT_STORE_DIR):
+        self.root = root
+
+    def path_for(self, digest: str) -> str:
+        if not _DIGEST_RE.match(digest or ""):
+            raise ValueError("invalid snapshot digest")
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        try:
+            return os.path.isfile(self.path_for(digest))
+        except ValueError:
+            return False
+
+    def put_bytes(self, data: bytes) -> Tuple[str, int]:
+        """Store image bytes (no-op if already present). Returns (sha256 hex digest, size)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if not os.path.exists(path):
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            # write to a temp file and rename so readers never see a partial image
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return digest, len(data)
+
+    def put_base64(self, data: str) -> Tuple[str, int]:
+        return self.put_bytes(decode_base64_image(data))
+
+    def read(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self.path_for(digest), "rb") as f:
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+
+snapshot_store = SnapshotStore()
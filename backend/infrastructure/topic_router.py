@@ -0,0 +1,97 @@
+"""Maps MQTT topic filters to the handlers that should run for matching messages."""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Handler = Callable[[str, Any], None]
+
+
+def compile_topic_filter(topic_filter: str) -> re.Pattern:
+    """
+    Translate an MQTT topic filter into a regex.
+    '+' matches exactly one level, a trailing '#' matches the parent level and
+    everything below it (so 'a/#' matches 'a' and 'a/b/c').
+    """
+    levels = topic_filter.split("/")
+    parts = []
+    for i, level in enumerate(levels):
+        if level == "#":
+            if i != len(levels) - 1:
+                raise ValueError(f"'#' must be the last level in {topic_filter!r}")
+            return re.compile("^" + "".join(parts) + "(?:/.*)?$" if parts else "^.*$")
+        if level == "+":
+            token = "[^/]*"
+        elif "+" in level or "#" in level:
+            raise ValueError(f"wildcards must occupy a whole level in {topic_filter!r}")
+        else:
+            token = re.escape(level)
+        parts.append(token if i == 0 else "/" + token)
+    return re.compile("^" + "".join(parts) + "$")
+
+
+class TopicRouter:
+    """
+    Registry of topic filter -> handler list.
+
+    Filters are compiled once (at subscribe time) and the handler tuple resolved
+    for each concrete topic is memoized, so a message from a topic we have seen
+    before costs a single dict lookup instead of one regex per filter.
+    """
+
+    def __init__(self, log_fn: Optional[Callable[[str], None]] = None, max_cached_topics: int = 4096):
+        self._log = log_fn or (lambda _msg: None)
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._compiled: Optional[List[Tuple[re.Pattern, Tuple[Handler, ...]]]] = None
+        self._topic_cache: Dict[str, Tuple[Handler, ...]] = {}
+        self._max_cached_topics = max_cached_topics
+
+    def register(self, topic_filter: str, *handlers: Handler):
+        """Append one or more handlers for a topic filter (run in registration order)."""
+        compile_topic_filter(topic_filter)  # validate early
+        self._handlers.setdefault(topic_filter, []).extend(handlers)
+        self._compiled = None
+        self._topic_cache = {}
+
+    def filters(self) -> List[str]:
+        """Topic filters to subscribe to, in registration order."""
+        return list(self._handlers)
+
+    def compile(self):
+        self._compiled = [
+            (compile_topic_filter(topic_filter), tuple(handlers))
+            for topic_filter, handlers in self._handlers.items()
+        ]
+        self._topic_cache = {}
+
+    def handlers_for(self, topic: str) -> Tuple[Handler, ...]:
+        cached = self._topic_cache.get(topic)
+        if cached is not None:
+            return cached
+
+        if self._compiled is None:
+            self.compile()
+
+        matched: List[Handler] = []
+        for pattern, handlers in self._compiled:
+            if pattern.match(topic):
+                for handler in handlers:
+                    if handler not in matched:  # overlapping filters run a handler once
+                        matched.append(handler)
+
+        resolved = tuple(matched)
+        if len(self._topic_cache) >= self._max_cached_topics:
+            self._topic_cache.clear()
+        self._topic_cache[topic] = resolved
+        return resolved
+
+    def dispatch(self, topic: str, payload: Any) -> int:
+        """Run every handler registered for `topic`. Returns how many handlers ran."""
+        handlers = self.handlers_for(topic)
+        for handler in handlers:
+            try:
+                handler(topic, payload)
+            except Exception as exc:
+                self._log(f"[MQTT] Handler {getattr(handler, '__name__', handler)} failed for {topic}: {exc}")
+        return len(handlers)
@@ -1,124 +1,324 @@
 #Combines tracks from multiple cameras into single global tracks
+import heapq
 import time
 import math
+from collections import namedtuple
+
+import numpy as np
+
+#All active tracks at one moment: global IDs plus parallel NumPy arrays
+TrackSnapshot = namedtuple('TrackSnapshot', ['ids', 'x_m', 'y_m', 'last_seen'])
+
+_ID_PREFIX = "global_"
+
 
 class TrackFusion:
-    
+
     #Set up the track fusion system with distance and timeout settings, 3 second and 0.5m right now
-    def __init__(self, fusion_distance=0.5, track_timeout=3.0):
-        self.fusion_distance = fusion_distance 
-        self.track_timeout = track_timeout 
+    #Stale tracks are removed at most once per cleanup_interval (default: a quarter of the timeout, max 0.1s)
+    def __init__(self, fusion_distance=0.5, track_timeout=3.0, cleanup_interval=None, clock=time.time,
+                 initial_capacity=64):
+        self.fusion_distance = fusion_distance
+        self.track_timeout = track_timeout
+        self.cleanup_interval = min(0.1, track_timeout / 4) if cleanup_interval is None else cleanup_interval
+        self._clock = clock
 
-        self._global_tracks = {}  #Stores all active global tracks
-        self._camera_to_global = {}  #Maps camera tracks to global IDs
+        #Columnar track store: one slot per track in preallocated arrays, freed slots are reused.
+        #Global IDs ("global_<number>") only exist at the API boundary, internally a track is its slot.
+        self._allocate(max(1, initial_capacity))
+        self._free_slots = []
+        self._slot_count = 0  #Slots ever handed out (high-water mark)
+        self._slot_of_number = {}  #Global ID number -> slot
+        self._track_count = 0
+
+        self._camera_to_global = {}  #Maps camera tracks to slots
+        self._global_to_cameras = {}  #Reverse index: slot -> set of camera track keys
         self._next_global_id = 1
 
+        #Min-heap of (last_seen, slot, number) with one entry per track; an entry whose
+        #track was seen again since it was pushed is re-pushed when it reaches the top
+        self._expiry_heap = []
+        self._next_cleanup = 0.0
+
+        #Spatial hash: (cell_x, cell_y) -> set of slots, cell size = fusion distance,
+        #so every track within fusion_distance of a point is in the 3x3 cells around it
+        self._cell_size = fusion_distance if fusion_distance > 0 else 1.0
+        self._grid = {}
+
+    def _allocate(self, capacity):
+        self._x = np.zeros(capacity, dtype=np.float64)
+        self._y = np.zeros(capacity, dtype=np.float64)
+        self._last_seen = np.zeros(capacity, dtype=np.float64)
+        self._number = np.zeros(capacity, dtype=np.int64)  #Global ID number, 0 = free slot
+        self._cell_x = np.zeros(capacity, dtype=np.int64)
+        self._cell_y = np.zeros(capacity, dtype=np.int64)
+        self._active = np.zeros(capacity, dtype=bool)
+
+    def _columns(self):
+        return self._x, self._y, self._last_seen, self._number, self._cell_x, self._cell_y, self._active
+
+    #Double the arrays when every slot is in use
+    def _grow(self):
+        old = self._columns()
+        self._allocate(len(self._x) * 2)
+        for new_column, old_column in zip(self._columns(), old):
+            new_column[:len(old_column)] = old_column
+
     #Takes a camera observation and assigns it to a global track
     def fuse_track(self, camera_id, track_id, x_m, y_m):
-        self._cleanup_stale_tracks()
+        now = self._clock()
+        self._cleanup_stale_tracks(now)
 
         camera_track_key = (camera_id, track_id)
-        now = time.time()
 
         #Check if we've seen this camera track before
-        if camera_track_key in self._camera_to_global:
-            global_id = self._camera_to_global[camera_track_key]
-            if global_id in self._global_tracks:
-                self._update_track_position(global_id, x_m, y_m, now)
-                return global_id
+        slot = self._camera_to_global.get(camera_track_key)
+        if slot is not None and self._active[slot]:
+            self._update_track_position(slot, x_m, y_m, now)
+            return self._global_id(slot)
 
         #Try to find a nearby existing track
-        matched_global_id = self._find_nearby_track(x_m, y_m)
-        if matched_global_id:
-            self._associate_camera_track(camera_track_key, matched_global_id)
-            self._merge_position(matched_global_id, x_m, y_m, now)
-            return matched_global_id
+        matched_slot = self._find_nearby_track(x_m, y_m)
+        if matched_slot is not None:
+            self._associate_camera_track(camera_track_key, matched_slot)
+            self._merge_position(matched_slot, x_m, y_m, now)
+            return self._global_id(matched_slot)
 
         #No match found, create a new global track
-        return self._create_new_track(camera_track_key, x_m, y_m, now)
+        return self._global_id(self._create_new_track(camera_track_key, x_m, y_m, now))
+
+    #Associates all observations of one camera frame at once: observations is a list of
+    #(track_id, x_m, y_m); returns the global ID of each observation, in the same order
+    def fuse_frame(self, camera_id, observations):
+        now = self._clock()
+        self._cleanup_stale_tracks(now)
+
+        slots = [None] * len(observations)
+        claimed = set()  #Tracks already used by this frame
+        pending = []  #Indexes of observations without a known camera track
+
+        #Camera tracks we have seen before keep their global track
+        for i, (track_id, x_m, y_m) in enumerate(observations):
+            slot = self._camera_to_global.get((camera_id, track_id))
+            if slot is not None and self._active[slot]:
+                self._update_track_position(slot, x_m, y_m, now)
+                slots[i] = slot
+                claimed.add(slot)
+            else:
+                pending.append(i)
+
+        if pending:
+            #One-to-one matching of the new camera tracks with nearby unclaimed tracks,
+            #closest pairs first (a camera sees each person at most once per frame)
+            points = np.array([observations[i][1:] for i in pending], dtype=np.float64)
+            candidates = np.array(sorted({
+                slot for x_m, y_m in points for slot in self._nearby_slots(x_m, y_m)
+            } - claimed), dtype=np.int64)
+            matches = {}
+            if len(candidates):
+                distances = np.hypot(
+                    points[:, None, 0] - self._x[candidates][None, :],
+                    points[:, None, 1] - self._y[candidates][None, :],
+                )
+                rows, cols = np.nonzero(distances < self.fusion_distance)
+                order = np.argsort(distances[rows, cols], kind='stable')
+                used_tracks = set()
+                for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+                    if row not in matches and col not in used_tracks:
+                        matches[row] = col
+                        used_tracks.add(col)
+
+            for row, i in enumerate(pending):
+                track_id, x_m, y_m = observations[i]
+                camera_track_key = (camera_id, track_id)
+                if row in matches:
+                    slot = int(candidates[matches[row]])
+                    self._associate_camera_track(camera_track_key, slot)
+                    self._merge_position(slot, x_m, y_m, now)
+                else:
+                    slot = self._create_new_track(camera_track_key, x_m, y_m, now)
+                slots[i] = slot
+
+        return [self._global_id(slot) for slot in slots]
 
     #Get the current position of a global track
     def get_track_position(self, global_id):
-        track = self._global_tracks.get(global_id)
-        if track:
-            return {'x_m': track['x_m'], 'y_m': track['y_m']}
-        return None
+        slot = self._slot(global_id)
+        if slot is None:
+            return None
+        return {'x_m': float(self._x[slot]), 'y_m': float(self._y[slot])}
+
+    #All active tracks as parallel arrays, gathered from the store in one vectorized step
+    def snapshot(self):
+        slots = np.flatnonzero(self._active[:self._slot_count])
+        return TrackSnapshot(
+            ids=[f"{_ID_PREFIX}{number}" for number in self._number[slots].tolist()],
+            x_m=self._x[slots],
+            y_m=self._y[slots],
+            last_seen=self._last_seen[slots],
+        )
 
     #Get all active tracks with their positions
     def get_active_tracks(self):
-        return dict(self._global_tracks)
+        snap = self.snapshot()
+        return {
+            gid: {'x_m': x_m, 'y_m': y_m, 'last_seen': last_seen}
+            for gid, x_m, y_m, last_seen in zip(
+                snap.ids, snap.x_m.tolist(), snap.y_m.tolist(), snap.last_seen.tolist()
+            )
+        }
 
     #Count how many tracks are currently active
     def get_track_count(self):
-        return len(self._global_tracks)
+        return self._track_count
 
     #Clear all tracks (useful for testing)
     def reset(self):
-        self._global_tracks.clear()
+        self._active[:] = False
+        self._number[:] = 0
+        self._free_slots.clear()
+        self._slot_count = 0
+        self._slot_of_number.clear()
+        self._track_count = 0
         self._camera_to_global.clear()
+        self._global_to_cameras.clear()
+        self._grid.clear()
+        self._expiry_heap.clear()
+        self._next_cleanup = 0.0
         self._next_global_id = 1
 
-    #Remove old tracks that haven't been seen recently
-    def _cleanup_stale_tracks(self):
-        now = time.time()
-        stale_tracks = [
-            gid for gid, data in self._global_tracks.items()
-            if now - data['last_seen'] > self.track_timeout
-        ]
-
-        for gid in stale_tracks:
-            del self._global_tracks[gid]
-            self._camera_to_global = {
-                key: val for key, val in self._camera_to_global.items()
-                if val != gid
-            }
+    #Slot of a "global_<number>" ID, None if it is not an active track
+    def _slot(self, global_id):
+        if not isinstance(global_id, str) or not global_id.startswith(_ID_PREFIX):
+            return None
+        try:
+            number = int(global_id[len(_ID_PREFIX):])
+        except ValueError:
+            return None
+        return self._slot_of_number.get(number)
+
+    def _global_id(self, slot):
+        return f"{_ID_PREFIX}{int(self._number[slot])}"
+
+    #Remove old tracks that haven't been seen recently; O(expired) and at most once per cleanup_interval
+    def _cleanup_stale_tracks(self, now=None):
+        now = self._clock() if now is None else now
+        if now < self._next_cleanup:
+            return
+        self._next_cleanup = now + self.cleanup_interval
+
+        deadline = now - self.track_timeout
+        heap = self._expiry_heap
+        while heap and heap[0][0] < deadline:
+            _, slot, number = heapq.heappop(heap)
+            if self._number[slot] != number:
+                continue  #Track already gone (slot free or reused)
+            last_seen = float(self._last_seen[slot])
+            if last_seen >= deadline:
+                #Seen again since this entry was pushed: reschedule
+                heapq.heappush(heap, (last_seen, slot, number))
+                continue
+            self._remove_track(slot)
+
+    #Drop a track with its grid cell and camera track mappings, and free its slot
+    def _remove_track(self, slot):
+        self._grid_remove(slot, (int(self._cell_x[slot]), int(self._cell_y[slot])))
+        for key in self._global_to_cameras.pop(slot, ()):
+            if self._camera_to_global.get(key) == slot:
+                del self._camera_to_global[key]
+        del self._slot_of_number[int(self._number[slot])]
+        self._number[slot] = 0
+        self._active[slot] = False
+        self._free_slots.append(slot)
+        self._track_count -= 1
 
     #Update position and timestamp for an existing track
-    def _update_track_position(self, global_id, x_m, y_m, timestamp):
-        self._global_tracks[global_id].update({
-            'x_m': x_m,
-            'y_m': y_m,
-            'last_seen': timestamp
-        })
-
-    #Find an existing track close to the given position
+    def _update_track_position(self, slot, x_m, y_m, timestamp):
+        self._x[slot] = x_m
+        self._y[slot] = y_m
+        self._last_seen[slot] = timestamp
+        self._grid_move(slot, x_m, y_m)
+
+    #Find the nearest existing track closer than fusion_distance to the given position
     def _find_nearby_track(self, x_m, y_m):
-        for gid, data in self._global_tracks.items():
-            distance = self._calculate_distance(
-                data['x_m'], data['y_m'],
-                x_m, y_m
-            )
-            if distance < self.fusion_distance:
-                return gid
+        candidates = list(self._nearby_slots(x_m, y_m))
+        if not candidates:
+            return None
+        distances = np.hypot(self._x[candidates] - x_m, self._y[candidates] - y_m)
+        best = int(np.argmin(distances))
+        if distances[best] < self.fusion_distance:
+            return candidates[best]
         return None
 
-    #Calculate straight-line distance between two points
-    def _calculate_distance(self, x1, y1, x2, y2):
-        return math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+    #Slots in the 3x3 grid cells around a position (a superset of the tracks within fusion_distance)
+    def _nearby_slots(self, x_m, y_m):
+        cx, cy = self._cell(x_m, y_m)
+        for nx in (cx - 1, cx, cx + 1):
+            for ny in (cy - 1, cy, cy + 1):
+                yield from self._grid.get((nx, ny), ())
+
+    #Grid cell containing a position
+    def _cell(self, x_m, y_m):
+        return math.floor(x_m / self._cell_size), math.floor(y_m / self._cell_size)
+
+    def _grid_add(self, slot, cell):
+        self._grid.setdefault(cell, set()).add(slot)
+
+    def _grid_remove(self, slot, cell):
+        members = self._grid.get(cell)
+        if members is not None:
+            members.discard(slot)
+            if not members:
+                del self._grid[cell]
+
+    #Move a track to the cell of its new position (no-op if it stays in the same cell)
+    def _grid_move(self, slot, x_m, y_m):
+        cell = self._cell(x_m, y_m)
+        old_cell = (int(self._cell_x[slot]), int(self._cell_y[slot]))
+        if cell != old_cell:
+            self._grid_remove(slot, old_cell)
+            self._grid_add(slot, cell)
+            self._cell_x[slot], self._cell_y[slot] = cell
 
     #Link a camera track to a global track
-    def _associate_camera_track(self, camera_track_key, global_id):
-        self._camera_to_global[camera_track_key] = global_id
+    def _associate_camera_track(self, camera_track_key, slot):
+        previous = self._camera_to_global.get(camera_track_key)
+        if previous is not None and previous != slot:
+            self._global_to_cameras.get(previous, set()).discard(camera_track_key)
+        self._camera_to_global[camera_track_key] = slot
+        self._global_to_cameras.setdefault(slot, set()).add(camera_track_key)
 
     #Combine new position with existing track position by averaging
-    def _merge_position(self, global_id, x_m, y_m, timestamp):
-        existing = self._global_tracks[global_id]
-        self._global_tracks[global_id].update({
-            'x_m': (existing['x_m'] + x_m) / 2,
-            'y_m': (existing['y_m'] + y_m) / 2,
-            'last_seen': timestamp
-        })
+    def _merge_position(self, slot, x_m, y_m, timestamp):
+        self._update_track_position(
+            slot, (self._x[slot] + x_m) / 2, (self._y[slot] + y_m) / 2, timestamp
+        )
 
     #Create a brand new global track
     def _create_new_track(self, camera_track_key, x_m, y_m, timestamp):
-        new_global_id = f"global_{self._next_global_id}"
+        number = self._next_global_id
         self._next_global_id += 1
 
-        self._global_tracks[new_global_id] = {
-            'x_m': x_m,
-            'y_m': y_m,
-            'last_seen': timestamp
-        }
-        self._camera_to_global[camera_track_key] = new_global_id
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            if self._slot_count == len(self._x):
+                self._grow()
+            slot = self._slot_count
+            self._slot_count += 1
+
+        cell = self._cell(x_m, y_m)
+        self._x[slot] = x_m
+        self._y[slot] = y_m
+        self._last_seen[slot] = timestamp
+        self._number[slot] = number
+        self._cell_x[slot], self._cell_y[slot] = cell
+        self._active[slot] = True
+        self._slot_of_number[number] = slot
+        self._track_count += 1
+
+        self._grid_add(slot, cell)
+        heapq.heappush(self._expiry_heap, (timestamp, slot, number))
+        self._associate_camera_track(camera_track_key, slot)
 
-        return new_global_id
\ No newline at end of file
+        return slot
@@ -0,0 +1,107 @@
+"""Thread-safe LRU cache with a size bound and idle-time expiry."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class BoundedTTLCache:
+    """
+    Holds at most ``max_size`` entries. An entry expires when it has not been
+    read or written for ``ttl_seconds``; when the cache is full the least
+    recently used entry is evicted.
+
+    Entries are kept in access order, which (because every access refreshes
+    the timestamp) is also expiry order, so expired entries are always at the
+    front and sweeping them costs O(expired).
+    """
+
+    _MISSING = object()
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size <= 0 or ttl_seconds <= 0:
+            raise ValueError("max_size and ttl_seconds must be positive")
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, touched_at)
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _sweep(self, now: float):
+        while self._data:
+            key, (_value, touched_at) = next(iter(self._data.items()))
+            if now - touched_at <= self.ttl:
+                break
+            del self._data[key]
+            self._expirations += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            now = self._clock()
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING or now - entry[1] > self.ttl:
+                if entry is not self._MISSING:
+                    del self._data[key]
+                    self._expirations += 1
+                self._misses += 1
+                return default
+            self._data[key] = (entry[0], now)
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            now = self._clock()
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            self._sweep(now)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, self._MISSING)
+            return default if entry is self._MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            return entry is not self._MISSING and self._clock() - entry[1] <= self.ttl
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sweep(self._clock())
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
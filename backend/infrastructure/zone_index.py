@@ -0,0 +1,263 @@
+"""
+In-memory per-floorplan zone index used by intrusion detection.
+
+The zones of a floorplan are loaded from the database once, their polygons
+parsed and turned into prepared shapely geometry, and kept until the zones
+change. Zone writes (domain.models.zone helpers and the zone routes) call
+``notify_zones_changed`` which drops the cached floorplan, so intrusion checks
+on the MQTT hot path normally do no database work for zones at all.
+
+Each floorplan also gets a uniform grid over the zone bboxes, so finding the
+zones that contain a point is one dict lookup plus exact tests on the few
+candidates in that cell instead of a test against every zone. For a whole
+frame of tracks, ``FloorplanZones.membership`` looks up the cell of every
+position and ray-casts all (position, candidate zone) pairs in one vectorized
+pass (see infrastructure.geometry).
+
+Entries also expire after ``ZONE_INDEX_TTL`` seconds so that changes made by
+another process are eventually picked up.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+from domain.models.zone import Zone, on_zones_changed
+from infrastructure.geometry import PolygonSet
+
+ZONE_INDEX_TTL = float(os.getenv("ZONE_INDEX_TTL", 60))
+# Upper bound on grid cells per axis, so one huge zone cannot blow up the grid
+ZONE_GRID_MAX_CELLS = 64
+# Packs a (cell_x, cell_y) pair into one int64 in FloorplanZones.membership
+_CELL_KEY_STRIDE = 1 << 32
+
+
+@dataclass(frozen=True)
+class IndexedZone:
+    id: int
+    name: str
+    floorplan_id: int
+    points: Tuple[Tuple[float, float], ...]
+    bbox: Tuple[float, float, float, float]  # min_x, min_y, max_x, max_y
+    geometry: Any = field(compare=False, repr=False)  # prepared shapely geometry
+
+    def contains(self, x: float, y: float) -> bool:
+        min_x, min_y, max_x, max_y = self.bbox
+        if x < min_x or x > max_x or y < min_y or y > max_y:
+            return False
+        return bool(shapely.contains_xy(self.geometry, x, y))
+
+
+def _parse_points(coordinates) -> List[Tuple[float, float]]:
+    # coordinates is a JSON column (a list), but older rows may hold a JSON string
+    if isinstance(coordinates, str):
+        coordinates = json.loads(coordinates)
+    return [(float(p["x"]), float(p["y"])) for p in coordinates or []]
+
+
+def build_indexed_zone(zone) -> Optional[IndexedZone]:
+    """IndexedZone for a Zone row, or None if its polygon is unusable."""
+    try:
+        points = _parse_points(zone.coordinates)
+    except (ValueError, TypeError, KeyError):
+        return None
+    if len(points) < 3:
+        return None
+
+    geometry = Polygon(points)
+    if not geometry.is_valid:
+        # e.g. self-intersecting outlines drawn in the frontend
+        geometry = shapely.make_valid(geometry)
+    shapely.prepare(geometry)
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return IndexedZone(
+        id=int(zone.id),
+        name=zone.name,
+        floorplan_id=int(zone.floorplan_id),
+        points=tuple(points),
+        bbox=(min(xs), min(ys), max(xs), max(ys)),
+        geometry=geometry,
+    )
+
+
+class FloorplanZones:
+    """
+    The usable zones of one floorplan plus a uniform grid over their bboxes.
+    The cell size follows the median zone size, so a cell holds a handful of
+    candidates however many zones the floorplan has.
+    """
+
+    __slots__ = ("zones", "_cell", "_grid", "_grid_columns", "_polygons")
+
+    def __init__(self, zones):
+        self.zones: Tuple[IndexedZone, ...] = tuple(zones)
+        self._polygons: Optional[PolygonSet] = None  # built on first membership() call
+        self._grid: Dict[Tuple[int, int], Tuple[IndexedZone, ...]] = {}
+        self._grid_columns: Dict[Tuple[int, int], Tuple[int, ...]] = {}  # same cells, as zone columns
+        self._cell = 1.0
+        if not self.zones:
+            return
+
+        sizes = sorted(max(z.bbox[2] - z.bbox[0], z.bbox[3] - z.bbox[1]) for z in self.zones)
+        extent = max(
+            max(z.bbox[2] for z in self.zones) - min(z.bbox[0] for z in self.zones),
+            max(z.bbox[3] for z in self.zones) - min(z.bbox[1] for z in self.zones),
+        )
+        self._cell = max(sizes[len(sizes) // 2], extent / ZONE_GRID_MAX_CELLS, 1e-6)
+
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for column, zone in enumerate(self.zones):
+            min_x, min_y, max_x, max_y = zone.bbox
+            for cx in range(self._key(min_x), self._key(max_x) + 1):
+                for cy in range(self._key(min_y), self._key(max_y) + 1):
+                    cells.setdefault((cx, cy), []).append(column)
+        self._grid_columns = {key: tuple(columns) for key, columns in cells.items()}
+        self._grid = {key: tuple(self.zones[c] for c in columns) for key, columns in cells.items()}
+
+    def _key(self, value: float) -> int:
+        return math.floor(value / self._cell)
+
+    def candidates(self, x: float, y: float) -> Tuple[IndexedZone, ...]:
+        """Zones whose bbox may contain (x, y)."""
+        return self._grid.get((self._key(x), self._key(y)), ())
+
+    def containing(self, x: float, y: float) -> List[IndexedZone]:
+        """Every zone containing (x, y), in zone id order."""
+        return [zone for zone in self.candidates(x, y) if zone.contains(x, y)]
+
+    def membership(self, points) -> np.ndarray:
+        """
+        (N, len(zones)) bool matrix for an (N, 2) array of positions; columns
+        follow ``zones``. Uses ray casting, so points exactly on an edge may
+        differ from ``containing``. Each position is only ray-cast against the
+        candidate zones of its grid cell.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = np.zeros((len(pts), len(self.zones)), dtype=bool)
+        if not len(pts) or not self.zones:
+            return result
+
+        keys = np.floor(pts / self._cell).astype(np.int64)
+        # one int64 per (cell_x, cell_y) so np.unique runs on a flat array; the
+        # cell itself is read back from the first row that falls in it
+        _, first, inverse = np.unique(
+            keys[:, 0] * _CELL_KEY_STRIDE + keys[:, 1], return_index=True, return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+        candidates = [self._grid_columns.get(cell, ()) for cell in map(tuple, keys[first].tolist())]
+
+        # (row, zone column) pairs: every position against the candidates of its own cell
+        per_cell = np.fromiter(map(len, candidates), dtype=np.intp, count=len(candidates))
+        counts = per_cell[inverse]
+        if not counts.any():
+            return result
+        flat = np.fromiter((c for cell in candidates for c in cell), dtype=np.intp, count=int(per_cell.sum()))
+        cell_start = np.cumsum(per_cell) - per_cell
+        pair_start = np.cumsum(counts) - counts
+        rows = np.repeat(np.arange(len(pts)), counts)
+        columns = flat[np.repeat(cell_start[inverse] - pair_start, counts) + np.arange(counts.sum())]
+
+        if self._polygons is None:
+            self._polygons = PolygonSet([zone.points for zone in self.zones])
+        result[rows, columns] = self._polygons.contains_pairs(pts, rows, columns)
+        return result
+
+    def __iter__(self):
+        return iter(self.zones)
+
+    def __len__(self):
+        return len(self.zones)
+
+
+def _load_zones(floorplan_id: int) -> List[Any]:
+    return Zone.query.filter_by(floorplan_id=floorplan_id).order_by(Zone.id).all()
+
+
+class ZoneIndex:
+    def __init__(
+        self,
+        loader: Callable[[int], List[Any]] = _load_zones,
+        ttl_seconds: float = ZONE_INDEX_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._loader = loader
+        self.ttl = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[FloorplanZones, float]] = {}
+        # bumped on every invalidation so a load racing with a zone write is not cached
+        self._generation = 0
+
+        self._hits = 0
+        self._loads = 0
+        self._invalidations = 0
+
+    def floorplan(self, floorplan_id: int) -> FloorplanZones:
+        """Indexed zones of a floorplan. Loads from the database on a miss (needs an app context)."""
+        with self._lock:
+            entry = self._entries.get(floorplan_id)
+            if entry is not None and self._clock() - entry[1] <= self.ttl:
+                self._hits += 1
+                return entry[0]
+            generation = self._generation
+
+        zones = []
+        for row in self._loader(floorplan_id):
+            indexed = build_indexed_zone(row)
+            if indexed is not None:
+                zones.append(indexed)
+        entry = FloorplanZones(zones)
+
+        with self._lock:
+            self._loads += 1
+            if generation == self._generation:
+                self._entries[floorplan_id] = (entry, self._clock())
+        return entry
+
+    def zones_for(self, floorplan_id: int) -> Tuple[IndexedZone, ...]:
+        """All usable zones of a floorplan."""
+        return self.floorplan(floorplan_id).zones
+
+    def zones_containing(self, floorplan_id: int, x: float, y: float) -> List[IndexedZone]:
+        """All zones of the floorplan containing (x, y)."""
+        return self.floorplan(floorplan_id).containing(x, y)
+
+    def invalidate(self, floorplan_id: Optional[int] = None):
+        """Drop one floorplan (or everything when None) from the index."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            if floorplan_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(floorplan_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "floorplans": len(self._entries),
+                "zones": sum(len(zones) for zones, _ in self._entries.values()),
+                "hits": self._hits,
+                "loads": self._loads,
+                "invalidations": self._invalidations,
+                "ttl_seconds": self.ttl,
+            }
+
+
+zone_index = ZoneIndex()
+on_zones_changed(zone_index.invalidate)
+
+
+def get_zone_index_stats() -> Dict[str, Any]:
+    return zone_index.stats()
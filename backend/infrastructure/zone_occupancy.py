@@ -0,0 +1,224 @@
+"""
+Per-track zone occupancy for intrusion detection.
+
+Instead of acting on every frame in which a position lies inside a zone,
+``ZoneOccupancyTracker`` keeps one state per (camera, track, zone) and emits
+transitions:
+
+- ``enter``: the track was not in the zone and now is,
+- ``dwell``: the track has stayed ``ZONE_DWELL_SECONDS`` (once per visit),
+- ``exit``: the track moved more than ``ZONE_EXIT_MARGIN_M`` outside the
+  polygon, the zone was removed, or the track was not seen for
+  ``ZONE_TRACK_TIMEOUT`` seconds.
+
+The exit margin is spatial hysteresis: a person standing on the boundary
+jitters in and out of the polygon but produces a single enter, not one per
+jitter. Each transition is handled once downstream, so snapshot/clip/alarm
+work is not spawned again for someone who stays in a zone.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+
+ZONE_DWELL_SECONDS = float(os.getenv("ZONE_DWELL_SECONDS", 10))
+ZONE_EXIT_MARGIN_M = float(os.getenv("ZONE_EXIT_MARGIN_M", 0.5))
+ZONE_TRACK_TIMEOUT = float(os.getenv("ZONE_TRACK_TIMEOUT", 5))
+
+ENTER = "enter"
+DWELL = "dwell"
+EXIT = "exit"
+
+
+@dataclass(frozen=True)
+class ZoneTransition:
+    kind: str  # ENTER, DWELL or EXIT
+    camera_id: Any
+    track_id: Any
+    zone_id: int
+    zone_name: str
+    x: float
+    y: float
+    dwell_seconds: float
+
+
+@dataclass
+class _Occupancy:
+    zone_name: str
+    entered_at: float
+    last_seen: float
+    x: float
+    y: float
+    dwell_sent: bool = False
+
+
+class ZoneOccupancyTracker:
+    def __init__(
+        self,
+        dwell_seconds: float = ZONE_DWELL_SECONDS,
+        exit_margin: float = ZONE_EXIT_MARGIN_M,
+        track_timeout: float = ZONE_TRACK_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.dwell_seconds = dwell_seconds
+        self.exit_margin = exit_margin
+        self.track_timeout = track_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        # camera_id -> {(track_id, zone_id): _Occupancy}
+        self._states: Dict[Any, Dict[Tuple[Any, int], _Occupancy]] = {}
+        self._next_sweep = 0.0
+
+        self._counts = {ENTER: 0, DWELL: 0, EXIT: 0}
+
+    def update(
+        self,
+        camera_id: Any,
+        track_ids: Sequence[Any],
+        points,
+        zones,
+        inside,
+        now: Optional[float] = None,
+    ) -> List[ZoneTransition]:
+        """
+        Feed one frame of a camera.
+        `points` is (N, 2) floorplan positions for `track_ids`, `zones` the
+        FloorplanZones of the camera's floorplan and `inside` the (N, len(zones))
+        membership matrix, with columns of disarmed zones cleared (a disarmed
+        zone produces no enters; a track already inside leaves as usual).
+        """
+        now = self._clock() if now is None else now
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        inside = np.asarray(inside, dtype=bool)
+        rows = {track_id: row for row, track_id in enumerate(track_ids)}
+        columns = {zone.id: column for column, zone in enumerate(zones.zones)}
+        transitions: List[ZoneTransition] = []
+
+        with self._lock:
+            states = self._states.setdefault(camera_id, {})
+
+            # 1) tracks already in a zone: still inside, inside the exit margin, or gone
+            margin_checks = []
+            for key, occupancy in list(states.items()):
+                track_id, zone_id = key
+                row = rows.get(track_id)
+                if row is None:
+                    continue  # not in this frame; the timeout sweep handles it
+                column = columns.get(zone_id)
+                if column is None:  # zone was removed
+                    transitions.append(self._exit(states, camera_id, key, occupancy))
+                elif inside[row, column]:
+                    self._seen(occupancy, points[row], now)
+                else:
+                    margin_checks.append((key, occupancy, row, column))
+
+            if margin_checks:
+                geometries = np.array([zones.zones[column].geometry for _, _, _, column in margin_checks], dtype=object)
+                xy = points[[row for _, _, row, _ in margin_checks]]
+                near = shapely.dwithin(geometries, shapely.points(xy), self.exit_margin)
+                for (key, occupancy, row, _column), keep in zip(margin_checks, near):
+                    if keep:
+                        self._seen(occupancy, points[row], now)
+                    else:
+                        occupancy.x, occupancy.y = float(points[row, 0]), float(points[row, 1])
+                        transitions.append(self._exit(states, camera_id, key, occupancy))
+
+            # 2) new (track, zone) pairs
+            for row, column in zip(*inside.nonzero()):
+                zone = zones.zones[column]
+                key = (track_ids[row], zone.id)
+                if key in states:
+                    continue
+                x, y = float(points[row, 0]), float(points[row, 1])
+                states[key] = _Occupancy(zone.name, now, now, x, y)
+                self._counts[ENTER] += 1
+                transitions.append(ZoneTransition(ENTER, camera_id, key[0], zone.id, zone.name, x, y, 0.0))
+
+            # 3) dwell threshold, once per visit
+            for key, occupancy in states.items():
+                if not occupancy.dwell_sent and occupancy.last_seen - occupancy.entered_at >= self.dwell_seconds:
+                    occupancy.dwell_sent = True
+                    self._counts[DWELL] += 1
+                    transitions.append(self._transition(DWELL, camera_id, key, occupancy))
+
+            transitions.extend(self._sweep(now))
+        return transitions
+
+    def expire(self, now: Optional[float] = None, force: bool = True) -> List[ZoneTransition]:
+        """
+        Exit transitions for tracks not seen for `track_timeout` seconds.
+        Meant for frames that never reach ``update`` (no positions, no zones) and
+        for a periodic timer; with ``force=False`` the sweep is throttled like
+        the one inside ``update``.
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            if force:
+                self._next_sweep = 0.0
+            return self._sweep(now)
+
+    def _sweep(self, now: float) -> List[ZoneTransition]:
+        if now < self._next_sweep:
+            return []
+        self._next_sweep = now + min(1.0, self.track_timeout)
+        transitions = []
+        for camera_id, states in list(self._states.items()):
+            for key, occupancy in list(states.items()):
+                if now - occupancy.last_seen > self.track_timeout:
+                    transitions.append(self._exit(states, camera_id, key, occupancy))
+            if not states:
+                del self._states[camera_id]
+        return transitions
+
+    @staticmethod
+    def _seen(occupancy: _Occupancy, point, now: float):
+        occupancy.last_seen = now
+        occupancy.x, occupancy.y = float(point[0]), float(point[1])
+
+    def _exit(self, states, camera_id, key, occupancy) -> ZoneTransition:
+        del states[key]
+        self._counts[EXIT] += 1
+        return self._transition(EXIT, camera_id, key, occupancy)
+
+    @staticmethod
+    def _transition(kind, camera_id, key, occupancy) -> ZoneTransition:
+        return ZoneTransition(
+            kind, camera_id, key[0], key[1], occupancy.zone_name,
+            occupancy.x, occupancy.y, occupancy.last_seen - occupancy.entered_at,
+        )
+
+    def occupied(self, camera_id: Any) -> List[Tuple[Any, int]]:
+        """(track_id, zone_id) pairs currently inside a zone for a camera."""
+        with self._lock:
+            return list(self._states.get(camera_id, {}))
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self._next_sweep = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "occupied": sum(len(states) for states in self._states.values()),
+                "enters": self._counts[ENTER],
+                "dwells": self._counts[DWELL],
+                "exits": self._counts[EXIT],
+                "dwell_seconds": self.dwell_seconds,
+                "exit_margin_m": self.exit_margin,
+                "track_timeout_seconds": self.track_timeout,
+            }
+
+
+zone_tracker = ZoneOccupancyTracker()
+
+
+def get_zone_tracker_stats() -> Dict[str, Any]:
+    return zone_tracker.stats()
@@ -8,9 +8,23 @@ from flask_migrate import Migrate
 
 # import requests
 import os
-from infrastructure.livestream import VideoCamera
+import click
+from infrastructure.livestream import shared_camera
 from infrastructure.video_saver import recording_manager
-from infrastructure.mqtt_client import start_mqtt, get_events
+from infrastructure.mqtt_client import (
+    start_mqtt, get_events, get_pipeline_stats, get_fusion_writer_stats, get_heatmap_writer_stats,
+)
+from infrastructure.fusion_persistence import get_motion_cache_stats, get_layout_cache_stats
+from infrastructure.partitioning import start_retention, get_retention_stats
+from infrastructure.zone_index import get_zone_index_stats
+from infrastructure.schedule_index import get_schedule_index_stats
+from infrastructure.zone_occupancy import get_zone_tracker_stats
+from infrastructure.event_sink import get_event_sink_stats
+from infrastructure.event_journal import get_event_journal_stats
+from infrastructure.camera_registry import camera_registry, get_camera_registry_stats
+from infrastructure.segment_buffer import start_segment_buffers, get_segment_buffer_stats
+from infrastructure.snapshot_service import get_snapshot_service_stats
+from infrastructure.fusion_registry import get_fusion_registry_stats
 from flask import request, jsonify
 import time
 
@@ -65,9 +79,9 @@ app.register_blueprint(ai_bp) # AI-Agent blueprint
 
 
 cameras = {
-    1: VideoCamera(os.getenv("CAMERA1_IP", "192.168.0.97")),
-    # 2: VideoCamera(os.getenv("CAMERA2_IP", "192.168.0.98")),
-    # 3: VideoCamera(os.getenv("CAMERA3_IP", "192.168.0.96"))
+    1: shared_camera(os.getenv("CAMERA1_IP", "192.168.0.97")),
+    # 2: shared_camera(os.getenv("CAMERA2_IP", "192.168.0.98")),
+    # 3: shared_camera(os.getenv("CAMERA3_IP", "192.168.0.96"))
 }
 
 ##register_cameras(cameras)
@@ -151,6 +165,31 @@ def ensure_user_columns():
             for stmt in statements:
                 conn.execute(text(stmt))
 
+def ensure_fusion_columns():
+    """Ensure the snapshot store columns exist on the fusion_data table."""
+    inspector = inspect(db.engine)
+    try:
+        columns = {col["name"] for col in inspector.get_columns("fusion_data")}
+    except Exception:
+        columns = set()
+
+    statements = []
+    dialect = db.engine.dialect.name
+    if_not_exists = "" if dialect == "sqlite" else "IF NOT EXISTS "
+
+    if "snapshot_hash" not in columns:
+        statements.append(f"ALTER TABLE fusion_data ADD COLUMN {if_not_exists}snapshot_hash VARCHAR(64)")
+        statements.append(
+            "CREATE INDEX IF NOT EXISTS ix_fusion_data_snapshot_hash ON fusion_data (snapshot_hash)"
+        )
+    if "snapshot_size" not in columns:
+        statements.append(f"ALTER TABLE fusion_data ADD COLUMN {if_not_exists}snapshot_size INTEGER")
+
+    if statements:
+        with db.engine.begin() as conn:
+            for stmt in statements:
+                conn.execute(text(stmt))
+
 # db = SQLAlchemy(app)
 
 with app.app_context():
@@ -160,6 +199,10 @@ with app.app_context():
     # db.drop_all()  # <- This clears the local database (uncomment this the first time or if invitation key does not work)
     db.create_all()
     ensure_user_columns()
+    ensure_fusion_columns()
+    camera_registry.load()
+    # one persistent RTSP connection per camera feeding the pre-roll buffer
+    start_segment_buffers(camera_registry.cameras())
     #Remove below in prod
     raw_key, key_hash = InviteKey.generate_key()
     invite = InviteKey(key_hash=key_hash)
@@ -169,6 +212,9 @@ with app.app_context():
     ####Remove above in prod
     print(f"✓ Database initialized at: {db_path}")
 
+# Partitions ahead of time + retention for fusion_data / position_history
+start_retention(app)
+
 
 @login_manager.unauthorized_handler
 def unauthorized():
@@ -199,6 +245,39 @@ def events():
     return jsonify(get_events())
 
 
+@app.route("/mqtt/stats", methods=["GET", "OPTIONS"])
+def mqtt_stats():
+    if request.method == "OPTIONS":
+        return _build_cors_preflight_response()
+    return jsonify({
+        "pipeline": get_pipeline_stats(),
+        "fusion_writer": get_fusion_writer_stats(),
+        "heatmap_writer": get_heatmap_writer_stats(),
+        "motion_cache": get_motion_cache_stats(),
+        "layout_cache": get_layout_cache_stats(),
+        "retention": get_retention_stats(),
+        "zone_index": get_zone_index_stats(),
+        "schedule_index": get_schedule_index_stats(),
+        "zone_tracker": get_zone_tracker_stats(),
+        "event_sink": get_event_sink_stats(),
+        "event_journal": get_event_journal_stats(),
+        "camera_registry": get_camera_registry_stats(),
+        "segment_buffer": get_segment_buffer_stats(),
+        "snapshots": get_snapshot_service_stats(),
+        "fusion": get_fusion_registry_stats(),
+    })
+
+
+@app.cli.command("backfill-snapshots")
+@click.option("--batch-size", default=500, show_default=True, help="Rows per commit.")
+def backfill_snapshots(batch_size):
+    """Move inline base64 fusion snapshots into the snapshot store."""
+    from infrastructure.snapshot_backfill import backfill_fusion_snapshots
+
+    summary = backfill_fusion_snapshots(batch_size=batch_size, log_fn=print)
+    print(f"✓ Snapshot backfill done: {summary}")
+
+
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()  # creates tables if they don’t exist
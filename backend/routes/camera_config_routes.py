@@ -12,15 +12,15 @@ import os
 import time
 import requests
 from requests.auth import HTTPDigestAuth, HTTPBasicAuth
-from infrastructure.mqtt_client import get_events
 from flask import Blueprint, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 from functools import wraps
 from domain.models import Camera, PositionHistory, db
+from domain.models.camera import notify_cameras_changed
 import traceback
-from infrastructure.floorplan_handler import FloorplanManager
-from infrastructure.track_fusion import TrackFusion
-from infrastructure.position_processor import PositionProcessor
+from infrastructure.floorplan_handler import DEFAULT_BOTTOM_LEFT, FloorplanManager
+from infrastructure.fusion_registry import fusion_registry
+from infrastructure.partitioning import PartitionManager
 from datetime import datetime
 
 camera_config_bp = Blueprint('camera_config', __name__)
@@ -35,19 +35,6 @@ CAMERA_IPS = {
 CAMERA_USER = os.getenv("camera_login", "root")
 CAMERA_PASS = os.getenv("camera_password", "pass")
 
-# Initialize track fusion manager for multi-camera tracking
-track_fusion = TrackFusion(fusion_distance=0.5, track_timeout=3.0)
-
-# Initialize position processor service
-position_processor = PositionProcessor(
-    track_fusion=track_fusion,
-    floorplan_manager=FloorplanManager,
-    bottom_left_coord=[58.395908306412494, 15.577992051878446]
-)
-
-# Initialize track fusion manager for multi-camera tracking
-track_fusion = TrackFusion(fusion_distance=0.5, track_timeout=3.0)
-
 #------------------------CONFIGS FOR CAMERA--------------------------
 def camera_request(url, timeout=10):
     try:
@@ -306,6 +293,7 @@ def configure_camera(camera_id):
         all_success = all(step.get("success", False) for step in results["steps"])
         results["success"] = all_success
         db.session.commit()
+        notify_cameras_changed()
         return jsonify(results), 200 if all_success else 207
 
 #Get current geolocation of camera
@@ -338,50 +326,28 @@ def get_camera_orientation(camera_id):
 @camera_config_bp.route('/stream/positions')
 def stream_positions():
     # Stream real-time position data to frontend
-    # Processes MQTT events and applies track fusion.
+    # Positions are fused (and written to the heatmap) once per MQTT message by
+    # the MQTT worker; every stream only reads them with its own cursor.
+    # ?floorplan_id=<id> only streams the positions of that floorplan.
+    floorplan_id = request.args.get('floorplan_id', type=int)
 
     def generate():
         last_sent = {}
-        position_batch = []
-        last_db_insert = time.time()
-        BATCH_INSERT_INTERVAL = 5.0  #Insert to DB every 5 seconds
+        cursor = fusion_registry.cursor()
 
         while True:
-            #Get events from MQTT client
-            for event in get_events():
-                # Process event into fused positions
-                positions = position_processor.process_mqtt_event(event)
-
-                #Stream each position update
-                for position in positions:
-                    track_id = position['track_id']
-
-                    #Only send if position changed, deduplicate
-                    if last_sent.get(track_id) != position:
-                        yield f"data: {json.dumps(position)}\n\n"
-                        last_sent[track_id] = position
-
-                        #updated the heatmap in batches to save performance
-                        position_batch.append({
-                            'track_id': track_id,
-                            'x_m': position['x_m'],
-                            'y_m': position['y_m'],
-                            'timestamp': datetime.utcnow()
-                        })
-
-            #Same here, updated db in batches every 5s
-            current_time = time.time()
-            if position_batch and (current_time - last_db_insert) >= BATCH_INSERT_INTERVAL:
-                try:
-                    db.session.bulk_insert_mappings(PositionHistory, position_batch)
-                    db.session.commit()
-                    position_batch.clear()
-                    last_db_insert = current_time
-                    print(f"[Stream] Saved batch of {len(position_batch)} positions to database for heatmap")
-                except Exception as e:
-                    db.session.rollback()
-                    print(f"[Error] Failed to insert positions to DB: {e}")
-                    position_batch.clear()
+            #Get only the positions fused since the last poll
+            positions, cursor = fusion_registry.read_since(cursor, floorplan_id=floorplan_id)
+
+            #Stream each position update
+            for position in positions:
+                #Global IDs are only unique within a floorplan
+                key = (position['floorplan_id'], position['track_id'])
+
+                #Only send if position changed, deduplicate
+                if last_sent.get(key) != position:
+                    yield f"data: {json.dumps(position)}\n\n"
+                    last_sent[key] = position
 
             time.sleep(0.5)
 
@@ -464,18 +430,14 @@ def clear_heatmap_history():
     try:
         older_than = request.args.get('older_than', type=int)
 
+        time_threshold = None
         if older_than:
             # Delete records older than specified duration
             from datetime import timedelta
             time_threshold = datetime.utcnow() - timedelta(seconds=older_than)
-            deleted_count = PositionHistory.query.filter(
-                PositionHistory.timestamp < time_threshold
-            ).delete()
-        else:
-            # Delete all records
-            deleted_count = PositionHistory.query.delete()
 
-        db.session.commit()
+        # Drops whole partitions on Postgres, deletes in batches otherwise
+        deleted_count = PartitionManager(db.engine).purge_before("position_history", time_threshold)
 
         print(f"[Heatmap] Cleared {deleted_count} position history records")
 
@@ -574,7 +536,8 @@ def calculate_position():
     POST body example:
     {
         "latitude": 58.396,
-        "longitude": 15.578
+        "longitude": 15.578,
+        "bottom_left": [58.39775183023039, 15.576700744793811]   (optional)
     }
     """
     if request.method == "OPTIONS":
@@ -584,12 +547,11 @@ def calculate_position():
     lat = data.get('latitude', 58.396)
     lon = data.get('longitude', 15.578)
 
-    # Use same bottom-left coord as stream endpoint
-    # [58.39775183023039,15.576700744793811]
-    tmp_bottom_left_coord = [58.39775183023039, 15.576700744793811]
+    # Same default origin as the stream uses for unplaced cameras
+    bottom_left = data.get('bottom_left') or DEFAULT_BOTTOM_LEFT
 
     pos_on_floorplan = FloorplanManager.calculate_position_on_floorplan(
-        float(lat), float(lon), tmp_bottom_left_coord
+        float(lat), float(lon), bottom_left
     )
 
     result = {
@@ -1,7 +1,10 @@
 from domain.models import db, Recording, Snapshot, Metadata, EventLog, Zone
 import os
 import datetime
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from infrastructure.event_sink import build_event, event_sink
+from infrastructure.event_journal import event_journal
 import traceback
 
 event_bp = Blueprint('event', __name__)
@@ -9,62 +12,48 @@ event_bp = Blueprint('event', __name__)
 @event_bp.route('/internal/create', methods=['POST'])
 def create_event_internal():
     """
-    Internal route called by the intrusion detection background thread.
-    Receives event data and saves it to the database.
-    Creates both Recording and EventLog entries.
+    Saves an intrusion event to the database.
+    Creates Recording, Snapshot and EventLog entries through the in-process
+    event sink (the intrusion path submits to the same sink directly).
     """
     try:
-        data = request.json
-        camera_id = data.get('camera_id')
-        timestamp_str = data.get('timestamp')
-        clip_path = data.get('clip_path')
-        snapshot_path = data.get('snapshot_path')
+        event = build_event(request.json or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        if not all([camera_id, timestamp_str, clip_path]):
-            return jsonify({"error": "Missing required fields"}), 400
+    stored = event_sink.write([event])
+    if not stored:
+        return jsonify({"error": f"Failed to store event {event.recording_id}"}), 500
 
-        # Parse timestamp (format: YYYYMMDDHHMMSS)
-        dt = datetime.datetime.strptime(timestamp_str, "%Y%m%d%H%M%S")
+    rec_id, event_id = stored[0]
+    return jsonify({
+        "message": "Event saved successfully",
+        "recording_id": rec_id,
+        "event_id": event_id
+    }), 201
+    
 
-        # Generate a unique ID (integer)
-        rec_id = int(f"{camera_id}{timestamp_str}")
+@event_bp.route('/internal/events/journal', methods=['GET'])
+def read_event_journal():
+    """
+    Streams journaled events (NDJSON) with start <= time < end.
+    Query: start, end (ISO local time, end defaults to now), optional camera_id.
+    """
+    try:
+        start = datetime.datetime.fromisoformat(request.args["start"])
+        end_arg = request.args.get("end")
+        end = datetime.datetime.fromisoformat(end_arg) if end_arg else datetime.datetime.now()
+        camera_id = request.args.get("camera_id", type=int)
+    except (KeyError, ValueError):
+        return jsonify({"error": "start (and end) must be ISO timestamps"}), 400
 
-        # 1. Create Recording entry (only has recording_id and url)
-        recording = Recording(
-            recording_id=rec_id,
-            url=clip_path
-        )
-        db.session.add(recording)
-        
-        # 2. Create Snapshot entry if snapshot_path exists
-        if snapshot_path:
-            snapshot = Snapshot(
-                recording_id=rec_id,
-                url=snapshot_path,
-                timestamp=dt
-            )
-            db.session.add(snapshot)
+    event_journal.flush()
+    records = event_journal.read_range(start, end, camera_id=camera_id)
+    return Response(
+        stream_with_context(json.dumps(record) + "\n" for record in records),
+        mimetype="application/x-ndjson",
+    )
 
-        # 3. Create EventLog entry WITHOUT zone_id (to avoid the missing column error)
-        event_log = EventLog()
-        
-        # 4. Link the recording to the event via the many-to-many relationship
-        event_log.recordings.append(recording)
-        
-        db.session.add(event_log)
-        db.session.commit()
-        
-        return jsonify({
-            "message": "Event saved successfully",
-            "recording_id": rec_id,
-            "event_id": event_log.id
-        }), 201
-
-    except Exception as e:
-        db.session.rollback()
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
-    
 
 @event_bp.route('/internal/events', methods=['GET'])
 def get_events_internal():
@@ -1,5 +1,7 @@
 from flask import Blueprint, send_from_directory, jsonify, request, Response
 from domain.models import db, Floorplan, Camera
+from domain.models.camera import notify_cameras_changed
+from domain.models.zone import notify_zones_changed
 import os
 from infrastructure.floorplan_handler import FloorplanManager
 from shapely.geometry import Point, LineString, mapping, Polygon
@@ -83,6 +85,8 @@ def handle_floorplan(floorplan_id):
         try:
             db.session.delete(floorplan)
             db.session.commit()
+            notify_zones_changed(floorplan.id)  # zones are deleted with the floorplan
+            notify_cameras_changed()  # its cameras lose their floorplan
             return jsonify({'message': 'Floorplan deleted successfully'}), 200
         except Exception as e:
             traceback.print_exc()
@@ -121,6 +125,7 @@ def handle_floorplan(floorplan_id):
                 )
             
             db.session.commit()
+            notify_cameras_changed()
 
             return jsonify({'message' : 'camera added to floorplan {floorplan_id}', 'floorplan corner coordinates' : floorplan.corner_geocoordinates}), 200
         except Exception as e:
@@ -146,6 +151,7 @@ def handle_floorplan(floorplan_id):
             if floorplan.camera_floorplancoordinates and str(camera_id) in floorplan.camera_floorplancoordinates:
                 del floorplan.camera_floorplancoordinates[str(camera_id)]
             db.session.commit()
+            notify_cameras_changed()
             return jsonify({'message' : 'camera removed from floorplan successfully'})
         except Exception as e:
             return jsonify({'error' : 'failed to remove floorplan from floorplan {floorplan_id}'})
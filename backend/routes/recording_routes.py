@@ -7,7 +7,7 @@ from infrastructure.video_saver import recording_manager
 from application.hls_handler import HLS_PLAYLIST_EXTENSION, HLS_SEGMENT_EXTENSION
 import time
 import cv2
-from infrastructure.livestream import VideoCamera
+from infrastructure.livestream import shared_camera
 # from backend_extensions import db
 from domain.models import db, Recording, Snapshot
 from datetime import datetime
@@ -28,9 +28,9 @@ VIDEO_NOT_FOUND_MESSAGE = "Video file not found"
 
 # Define cameras
 cameras = {
-    1: VideoCamera(os.getenv("CAMERA1_IP", "192.168.0.97")),
-    2: VideoCamera(os.getenv("CAMERA2_IP", "192.168.0.98")),
-    3: VideoCamera(os.getenv("CAMERA3_IP", "192.168.0.96"))
+    1: shared_camera(os.getenv("CAMERA1_IP", "192.168.0.97")),
+    2: shared_camera(os.getenv("CAMERA2_IP", "192.168.0.98")),
+    3: shared_camera(os.getenv("CAMERA3_IP", "192.168.0.96"))
 }
 
 def _normalize_rel_path(recordings_dir: str, root: str, file: str) -> str:
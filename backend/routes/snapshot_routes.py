@@ -1,19 +1,20 @@
 from flask import Blueprint, jsonify, send_file
-import requests
 from datetime import datetime
 import os
 from domain.models import db
 from domain.models.camera import Camera
 from domain.models.recording import Snapshot, Recording
-from infrastructure.livestream import VideoCamera
+from infrastructure.livestream import shared_camera
+from infrastructure.snapshot_store import snapshot_store
+from infrastructure.snapshot_service import snapshot_service
 
 
 snapshot_bp = Blueprint('snapshot', __name__)
 
 cameras = {
-    1: VideoCamera(os.getenv("CAMERA1_IP", "192.168.0.97")),
-    2: VideoCamera(os.getenv("CAMERA2_IP", "192.168.0.98")),
-    3: VideoCamera(os.getenv("CAMERA3_IP", "192.168.0.96"))
+    1: shared_camera(os.getenv("CAMERA1_IP", "192.168.0.97")),
+    2: shared_camera(os.getenv("CAMERA2_IP", "192.168.0.98")),
+    3: shared_camera(os.getenv("CAMERA3_IP", "192.168.0.96"))
 }
 
 @snapshot_bp.route('/api/recordings/<int:recording_id>/snapshots/capture', methods=['POST'])
@@ -32,16 +33,10 @@ def capture_snapshot(recording_id):
         if not camera:
             return jsonify({'error': 'Camera not found'}), 404
         
-        # Capture snapshot from camera
-        image_url = f"http://{camera.ip}/axis-cgi/jpg/image.cgi"
-        response = requests.get(
-            image_url,
-            auth=(camera.username, camera.password),
-            timeout=10
-        )
-        
-        if response.status_code != 200:
-            return jsonify({'error': f'Failed to capture snapshot. Status: {response.status_code}'}), 500
+        # Latest live frame, or a new image from the camera if none is fresh
+        image = snapshot_service.capture(camera.ip, camera.url)
+        if image is None:
+            return jsonify({'error': 'Failed to capture snapshot'}), 500
         
         # Save snapshot in the recording's directory (already exists)
         recording_dir = recording.url
@@ -52,8 +47,7 @@ def capture_snapshot(recording_id):
         filepath = os.path.join(recording_dir, filename)
         
         # Save image file
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
+        image.save(filepath)
         
         # Save to database
         snapshot = Snapshot(
@@ -70,7 +64,7 @@ def capture_snapshot(recording_id):
                 'recording_id': snapshot.recording_id,
                 'url': snapshot.url,
                 'timestamp': snapshot.timestamp.isoformat(),
-                'file_size': len(response.content)
+                **image.info()
             }
         }), 201
         
@@ -111,6 +105,24 @@ def get_snapshot_image(snapshot_id):
     return send_file(snapshot.url, mimetype='image/jpeg')
 
 
+@snapshot_bp.route('/api/fusion/snapshots/<digest>', methods=['GET'])
+def get_fusion_snapshot(digest):
+    """Stream a fusion snapshot from the content-addressed store"""
+    if not snapshot_store.exists(digest):
+        return jsonify({'error': 'Snapshot not found'}), 404
+
+    # Content never changes for a given digest, so it can be cached forever
+    response = send_file(
+        os.path.abspath(snapshot_store.path_for(digest)),
+        mimetype='image/jpeg',
+        etag=digest,
+        conditional=True,
+        max_age=31536000,
+    )
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 @snapshot_bp.route('/api/snapshots/<int:snapshot_id>', methods=['DELETE'])
 def delete_snapshot(snapshot_id):
     """Delete a snapshot (both file and database entry)"""
@@ -149,16 +161,10 @@ def test_capture_snapshot(camera_id):
         
         video_camera = cameras[camera_id]
         
-        # Capture snapshot from camera (use .username and .password from VideoCamera class)
-        image_url = f"http://{video_camera.ip}/axis-cgi/jpg/image.cgi"
-        response = requests.get(
-            image_url,
-            auth=(video_camera.username, video_camera.password),  # Correct attributes
-            timeout=10
-        )
-        print("username:", video_camera.username, "password:", video_camera.password)
-        if response.status_code != 200:
-            return jsonify({'error': f'Failed to capture snapshot. Status: {response.status_code}'}), 500
+        # Latest live frame, or a new image from the camera if none is fresh
+        image = snapshot_service.capture(video_camera.ip, video_camera.url)
+        if image is None:
+            return jsonify({'error': 'Failed to capture snapshot'}), 500
         
         # Create test snapshot directory
         test_dir = os.path.join("snapshots", "test_snapshots")
@@ -169,8 +175,7 @@ def test_capture_snapshot(camera_id):
         filename = f"camera{camera_id}_{timestamp}.jpg"
         filepath = os.path.join(test_dir, filename)
         
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
+        image.save(filepath)
         
         return jsonify({
             'success': True,
@@ -178,7 +183,7 @@ def test_capture_snapshot(camera_id):
             'filepath': filepath,
             'timestamp': timestamp,
             'camera_id': camera_id,
-            'file_size': len(response.content)
+            **image.info()
         }), 200
         
     except Exception as e:
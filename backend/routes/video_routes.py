@@ -1,15 +1,15 @@
 import time
 import os
 from flask import Response , Blueprint, request, jsonify
-from infrastructure.livestream import VideoCamera
+from infrastructure.livestream import shared_camera
 #from main import cameras, app, _build_cors_preflight_response
 video_bp = Blueprint('video', __name__) #Dont know if we should have the url_prefix
 
 
 cameras = {
-    1: VideoCamera(os.getenv("CAMERA1_IP", "192.168.0.97")),
-    2: VideoCamera(os.getenv("CAMERA2_IP", "192.168.0.98")),
-    3: VideoCamera(os.getenv("CAMERA3_IP", "192.168.0.96"))
+    1: shared_camera(os.getenv("CAMERA1_IP", "192.168.0.97")),
+    2: shared_camera(os.getenv("CAMERA2_IP", "192.168.0.98")),
+    3: shared_camera(os.getenv("CAMERA3_IP", "192.168.0.96"))
 }
 
 def generate_frames(camera_id):
@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify, request
 from domain.models import db
 from domain.models.zone import (
-    create_zone, delete_zone, get_zones_for_floorplan, Zone,
+    create_zone, delete_zone, get_zones_for_floorplan, notify_zones_changed, Zone,
     create_schedule, update_schedule, delete_schedule, get_schedules_for_zone, get_current_active_schedules
 )
 from infrastructure.intrusion_detection import trigger_zone_intrusion
@@ -80,6 +80,7 @@ def floorplan_zones(floorplan_id):
                         db.session.add(new_zone)
                         created_objs.append(new_zone)
                     # commit happens automatically at the end of `with db.session.begin()`
+                notify_zones_changed(floorplan_id)
                 # after commit, load serialized zones
                 saved = get_zones_for_floorplan(floorplan_id)
                 return jsonify({"zones": saved}), 200
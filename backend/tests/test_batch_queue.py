@@ -0,0 +1,150 @@
+"""
+Unit tests for the batch queue shared by the write-behind buffers.
+
+Covers batching by size and delay, the synchronous mode without a thread,
+bounded capacity, handing over on close, handler failures and retrying
+requeued batches.
+"""
+import threading
+import time
+
+import pytest
+
+from infrastructure.batch_queue import BatchQueue
+
+
+class Handler:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.done = threading.Event()
+
+    def __call__(self, batch):
+        self.batches.append(list(batch))
+        self.done.set()
+        if self.fail:
+            raise RuntimeError("boom")
+        return len(batch)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class TestBackground:
+    """The thread hands over full batches right away and partial ones after the delay"""
+
+    def test_full_batch_is_handed_over(self):
+        handler = Handler()
+        batches = BatchQueue(handler, max_batch=3, max_delay_ms=60000)
+        batches.start()
+        try:
+            batches.put([1, 2])
+            time.sleep(0.05)
+            assert handler.batches == []
+            batches.put([3])
+            assert wait_for(lambda: handler.batches == [[1, 2, 3]])
+        finally:
+            batches.close()
+
+    def test_partial_batch_after_delay(self):
+        handler = Handler()
+        batches = BatchQueue(handler, max_batch=100, max_delay_ms=20)
+        batches.start()
+        try:
+            batches.put(["a"])
+            assert wait_for(lambda: handler.batches == [["a"]])
+            assert batches.wait_idle() is True
+        finally:
+            batches.close()
+
+    def test_batch_limit(self):
+        handler = Handler()
+        batches = BatchQueue(handler, max_batch=2, max_delay_ms=60000, batch_limit=2)
+        batches.put(list(range(5)))  # no thread: everything is handed over in limited batches
+        assert handler.batches == [[0, 1], [2, 3], [4]]
+
+    def test_close_hands_over_the_rest(self):
+        handler = Handler()
+        batches = BatchQueue(handler, max_batch=100, max_delay_ms=60000)
+        batches.start()
+        batches.put([1, 2])
+        batches.close()
+        assert handler.batches == [[1, 2]]
+        assert batches.running is False
+
+
+class TestRequeue:
+    """Batches given back by the handler"""
+
+    def test_requeued_batch_is_retried_after_the_delay(self):
+        attempts = []
+
+        def handler(batch):
+            attempts.append((time.monotonic(), list(batch)))
+            if len(attempts) == 1:
+                batches.requeue(batch)
+                return 0
+            return len(batch)
+
+        batches = BatchQueue(handler, max_batch=2, max_delay_ms=10, retry_delay_ms=100)
+        batches.start()
+        try:
+            batches.put([1, 2])
+            assert wait_for(lambda: len(attempts) == 2)
+        finally:
+            batches.close()
+
+        assert [items for _at, items in attempts] == [[1, 2], [1, 2]]
+        assert attempts[1][0] - attempts[0][0] >= 0.09
+        assert batches.requeued == 2
+
+    def test_flush_stops_at_a_requeued_batch(self):
+        calls = []
+
+        def handler(batch):
+            calls.append(list(batch))
+            batches.requeue(batch[1:])
+            return 1
+
+        batches = BatchQueue(handler, max_batch=10, max_delay_ms=100, batch_limit=2, sync_threshold=10)
+        batches.put([1, 2, 3])
+
+        assert batches.flush() == 1
+        assert calls == [[1, 2]]
+        assert batches.pending == 2
+
+
+class TestWithoutThread:
+    """Synchronous hand-over, capacity and failures"""
+
+    def test_sync_threshold(self):
+        handler = Handler()
+        batches = BatchQueue(handler, max_batch=10, max_delay_ms=100, sync_threshold=3)
+        batches.put([1, 2])
+        assert handler.batches == [] and batches.pending == 2
+        batches.put([3])
+        assert handler.batches == [[1, 2, 3]] and batches.pending == 0
+        assert batches.flush() == 0
+
+    def test_capacity_drops_the_overflow(self):
+        batches = BatchQueue(Handler(), max_batch=10, max_delay_ms=100, capacity=3)
+        batches._running = True  # accept items without a consumer thread
+
+        assert batches.put([1, 2]) == 2
+        assert batches.put([3, 4]) == 1
+        assert (batches.submitted, batches.dropped, batches.pending) == (3, 1, 3)
+
+    def test_handler_failure_is_logged(self):
+        logged = []
+        batches = BatchQueue(Handler(fail=True), max_batch=10, max_delay_ms=100, label="Test", log_fn=logged.append)
+        batches.put([1])
+        assert logged == ["[Test] Failed to write 1 items: boom"]
+        assert batches.pending == 0
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            BatchQueue(Handler(), max_batch=0, max_delay_ms=100)
@@ -0,0 +1,150 @@
+"""
+Unit tests for the in-memory camera registry.
+
+Covers serial/id resolution, floorplan origin and RTSP URL, caching,
+invalidation through the floorplan routes, and the intrusion path resolving
+cameras without per-message queries.
+"""
+import pytest
+from flask import Flask
+from domain.models import db, Floorplan, Camera
+from infrastructure import intrusion_detection
+from infrastructure.camera_registry import CameraRegistry, camera_registry
+from routes.floorplan_routes import floorplan_bp
+
+
+@pytest.fixture
+def app():
+    """Create Flask app with in-memory database for testing"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(floorplan_bp)
+
+    with app.app_context():
+        db.create_all()
+        camera_registry.invalidate()
+        yield app
+        camera_registry.invalidate()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def camera_id(app):
+    fp = Floorplan(name='Office', width=20.0, depth=20.0,
+                   corner_geocoordinates={"bottom_left": [58.3959, 15.5779]})
+    db.session.add(fp)
+    db.session.flush()
+    camera = Camera(ip_address="192.168.0.97", serialno="b8a44f9eed3b", floorplan_id=fp.id)
+    db.session.add(camera)
+    db.session.add(Camera(ip_address="192.168.0.98", serialno=None))
+    db.session.commit()
+    return camera.id
+
+
+class TestResolution:
+    """Serial and id lookups"""
+
+    def test_by_serial_is_case_insensitive(self, camera_id):
+        info = camera_registry.by_serial("B8A44F9EED3B")
+
+        assert info.id == camera_id
+        assert info.serial == "B8A44F9EED3B"
+        assert info.bottom_left == (58.3959, 15.5779)
+        assert info.rtsp_url.endswith("@192.168.0.97/axis-media/media.amp")
+        assert camera_registry.by_serial("b8a44f9eed3b") is info
+
+    def test_by_id_and_rtsp_url(self, camera_id):
+        assert camera_registry.by_id(str(camera_id)).ip_address == "192.168.0.97"
+        assert camera_registry.rtsp_url(camera_id).startswith("rtsp://")
+        assert camera_registry.by_id("nope") is None
+        assert camera_registry.rtsp_url(999) is None
+
+    def test_camera_without_floorplan_or_serial(self, camera_id):
+        other = [c for c in Camera.query.all() if c.id != camera_id][0]
+        info = camera_registry.by_id(other.id)
+
+        assert info.floorplan_id is None
+        assert info.bottom_left is None
+        assert camera_registry.by_serial(None) is None
+
+
+class TestCaching:
+    """One load serves many lookups"""
+
+    def test_loaded_once(self, camera_id):
+        calls = []
+        registry = CameraRegistry(loader=lambda: calls.append(1) or Camera.query.all())
+        for _ in range(5):
+            registry.by_serial("B8A44F9EED3B")
+            registry.by_serial("UNKNOWN")
+
+        assert len(calls) == 1
+        assert registry.stats()["hits"] == 9
+
+    def test_ttl_expiry_reloads(self, camera_id):
+        now = [0.0]
+        registry = CameraRegistry(ttl_seconds=10, clock=lambda: now[0])
+        registry.by_id(camera_id)
+        now[0] = 11.0
+        registry.by_id(camera_id)
+
+        assert registry.stats()["loads"] == 2
+
+    def test_failed_reload_keeps_previous_cameras(self, camera_id):
+        rows = Camera.query.all()
+        state = {"fail": False}
+
+        def loader():
+            if state["fail"]:
+                raise RuntimeError("Working outside of application context.")
+            return rows
+
+        registry = CameraRegistry(loader=loader)
+        registry.load()
+        registry.invalidate()
+        state["fail"] = True
+
+        assert registry.by_id(camera_id).serial == "B8A44F9EED3B"
+        assert registry.stats()["load_errors"] == 1
+
+
+class TestRouteInvalidation:
+    """Camera placement through the floorplan routes refreshes the registry"""
+
+    def test_patch_removes_floorplan(self, app, camera_id):
+        floorplan_id = camera_registry.by_id(camera_id).floorplan_id
+        assert floorplan_id is not None
+
+        response = app.test_client().patch(f"/floorplan/{floorplan_id}", json={"camera_id": camera_id})
+
+        assert response.status_code == 200
+        assert camera_registry.by_id(camera_id).floorplan_id is None
+
+    def test_delete_floorplan(self, app, camera_id):
+        floorplan_id = camera_registry.by_id(camera_id).floorplan_id
+
+        assert app.test_client().delete(f"/floorplan/{floorplan_id}").status_code == 200
+        assert camera_registry.by_id(camera_id).floorplan_id is None
+
+
+class TestIntrusionUsesRegistry:
+    """The intrusion path resolves cameras from the registry"""
+
+    def test_zone_topic_resolves_camera_id(self, camera_id):
+        camera = intrusion_detection._camera_for_topic(f"zone_intrusion/{camera_id}/5")
+        assert camera.serial == "B8A44F9EED3B"
+        assert intrusion_detection._camera_for_topic("axis/B8A44F9EED3B/analytics/fusion").id == camera_id
+        assert intrusion_detection._camera_for_topic("axis/UNKNOWN/analytics/fusion") is None
+
+    def test_no_camera_query_per_message(self, monkeypatch, camera_id):
+        camera_registry.load()
+        monkeypatch.setattr(camera_registry, "_loader", lambda: pytest.fail("cameras queried again"))
+        monkeypatch.setattr(intrusion_detection.zone_index, "floorplan", lambda fp: [])
+
+        payload = {"camera_serial": "B8A44F9EED3B", "track_id": 1, "latitude": 58.39, "longitude": 15.57}
+        for _ in range(3):
+            assert intrusion_detection.process_fusion_for_intrusion(payload) is False
@@ -0,0 +1,80 @@
+#backend/tests/test_event_buffer.py
+#Unit tests for the MQTT event ring buffer
+import pytest
+from infrastructure.event_buffer import EventRingBuffer
+
+
+#---------------- Fixtures ----------------
+
+@pytest.fixture
+def buffer():
+    return EventRingBuffer(capacity=5)
+
+
+def _event(i):
+    return {"topic": f"axis/cam/{i}", "payload": {"n": i}}
+
+
+#---------------- Append / Read Tests ----------------
+
+#Sequence numbers increase by one per event
+def test_append_returns_sequence_numbers(buffer):
+    assert [buffer.append(_event(i)) for i in range(3)] == [0, 1, 2]
+    assert buffer.cursor() == 3
+
+#Each event is returned exactly once when the cursor is reused
+def test_read_since_returns_each_event_once(buffer):
+    cursor = buffer.cursor()
+    buffer.append(_event(1))
+    buffer.append(_event(2))
+
+    events, cursor = buffer.read_since(cursor)
+    assert [e["payload"]["n"] for e in events] == [1, 2]
+
+    events, cursor = buffer.read_since(cursor)
+    assert events == []
+
+    buffer.append(_event(3))
+    events, cursor = buffer.read_since(cursor)
+    assert [e["payload"]["n"] for e in events] == [3]
+    assert cursor == 3
+
+#A slow consumer resumes at the oldest event still held
+def test_read_since_skips_overwritten_events(buffer):
+    for i in range(8):
+        buffer.append(_event(i))
+
+    events, cursor = buffer.read_since(0)
+    assert [e["payload"]["n"] for e in events] == [3, 4, 5, 6, 7]
+    assert cursor == 8
+    assert buffer.oldest_seq() == 3
+
+#Limit caps the batch and the cursor points at the first unread event
+def test_read_since_with_limit(buffer):
+    for i in range(4):
+        buffer.append(_event(i))
+
+    events, cursor = buffer.read_since(0, limit=3)
+    assert [e["payload"]["n"] for e in events] == [0, 1, 2]
+    assert cursor == 3
+
+    events, cursor = buffer.read_since(cursor, limit=3)
+    assert [e["payload"]["n"] for e in events] == [3]
+
+#latest() returns newest events in arrival order
+def test_latest(buffer):
+    for i in range(7):
+        buffer.append(_event(i))
+
+    assert [e["payload"]["n"] for e in buffer.latest(3)] == [4, 5, 6]
+    assert [e["payload"]["n"] for e in buffer.latest(50)] == [2, 3, 4, 5, 6]
+    assert len(buffer) == 5
+
+def test_empty_buffer(buffer):
+    assert buffer.latest(10) == []
+    assert buffer.read_since(0) == ([], 0)
+    assert len(buffer) == 0
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        EventRingBuffer(capacity=0)
@@ -0,0 +1,160 @@
+"""
+Unit tests for the append-only event journal.
+
+Covers daily rotation, group fsync, range/camera lookups through the offset
+index, recovery of an index that lags its journal, the background writer and
+the NDJSON reader route.
+"""
+import datetime
+import os
+
+import pytest
+from flask import Flask
+from infrastructure import event_journal as event_journal_module
+from infrastructure.event_journal import EventJournal
+from routes.event_routes import event_bp
+
+T0 = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+def at(seconds):
+    return T0 + datetime.timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def fsyncs():
+    return []
+
+
+@pytest.fixture
+def journal(tmp_path, fsyncs):
+    journal = EventJournal(str(tmp_path), max_batch=100, max_delay_ms=20,
+                           fsync=fsyncs.append, log_fn=lambda msg: None)
+    yield journal
+    journal.close()
+
+
+def entry(seconds, camera_id=1, **data):
+    return at(seconds), camera_id, {"n": seconds, **data}
+
+
+class TestWrite:
+    """One JSON line per event, one file per day"""
+
+    def test_batch_is_one_fsync_per_file(self, journal, fsyncs):
+        assert journal.write([entry(0), entry(1), entry(2)]) == 3
+        assert len(fsyncs) == 1
+        with open(journal.journal_path("20250101")) as f:
+            assert len(f.read().splitlines()) == 3
+
+    def test_daily_rotation(self, journal, fsyncs):
+        journal.write([entry(0), entry(86400)])
+        assert journal.days() == ["20250101", "20250102"]
+        assert len(fsyncs) == 2
+
+    def test_non_json_values_are_stringified(self, journal):
+        journal.write([(T0, 1, {"when": T0})])
+        record = next(journal.read_range(at(-1), at(1)))
+        assert record["data"]["when"] == str(T0)
+
+
+class TestReadRange:
+    """Lookups by time range and camera through the offset index"""
+
+    def test_half_open_range_in_time_order(self, journal):
+        journal.write([entry(5), entry(1), entry(3), entry(7)])
+        assert [r["data"]["n"] for r in journal.read_range(at(1), at(7))] == [1, 3, 5]
+
+    def test_camera_filter(self, journal):
+        journal.write([entry(0, camera_id=1), entry(1, camera_id=2), entry(2, camera_id=1)])
+        assert [r["data"]["n"] for r in journal.read_range(at(0), at(10), camera_id=1)] == [0, 2]
+
+    def test_range_spanning_days(self, journal):
+        journal.write([entry(0), entry(86400), entry(2 * 86400)])
+        assert [r["data"]["n"] for r in journal.read_range(at(-1), at(86401))] == [0, 86400]
+
+    def test_loaded_index_sees_later_writes(self, journal):
+        journal.write([entry(0)])
+        assert len(list(journal.read_range(at(0), at(10)))) == 1
+        journal.write([entry(1)])
+        assert len(list(journal.read_range(at(0), at(10)))) == 2
+
+    def test_empty(self, journal):
+        assert list(journal.read_range(at(0), at(10))) == []
+
+
+class TestRecovery:
+    """The index is completed or rebuilt from the journal"""
+
+    def test_missing_index_tail_is_recovered(self, journal, tmp_path):
+        journal.write([entry(0), entry(1)])
+        index_path = journal.index_path("20250101")
+        with open(index_path, "rb+") as f:
+            f.truncate(os.path.getsize(index_path) // 2)  # crash after the journal write
+
+        fresh = EventJournal(str(tmp_path), log_fn=lambda msg: None)
+        assert [r["data"]["n"] for r in fresh.read_range(at(0), at(10))] == [0, 1]
+
+    def test_index_with_holes_is_rebuilt(self, journal, tmp_path):
+        journal.write([entry(0)])
+        os.remove(journal.index_path("20250101"))  # index lost, journal continued
+        EventJournal(str(tmp_path), fsync=lambda fd: None).write([entry(1)])
+
+        fresh = EventJournal(str(tmp_path))
+        assert [r["data"]["n"] for r in fresh.read_range(at(0), at(10))] == [0, 1]
+
+    def test_torn_last_line_is_skipped(self, journal, tmp_path):
+        journal.write([entry(0)])
+        with open(journal.journal_path("20250101"), "ab") as f:
+            f.write(b'{"ts": 1')
+        journal.write([entry(1)])
+
+        fresh = EventJournal(str(tmp_path))
+        assert [r["data"]["n"] for r in fresh.read_range(at(0), at(10))] == [0, 1]
+
+
+class TestBackgroundWriter:
+    """append() only enqueues; the writer thread batches and fsyncs"""
+
+    def test_appends_are_batched(self, journal, fsyncs):
+        journal.start()
+        for i in range(20):
+            assert journal.append(1, {"n": i}, at=at(i)) is True
+        assert journal.flush() is True
+        assert [r["data"]["n"] for r in journal.read_range(at(0), at(100))] == list(range(20))
+        assert len(fsyncs) < 20
+        assert journal.stats()["written"] == 20
+
+    def test_close_writes_queued_events(self, journal):
+        journal.start()
+        journal.append(1, {"n": 0}, at=at(0))
+        journal.close()
+        assert len(list(journal.read_range(at(0), at(1)))) == 1
+
+    def test_without_thread_append_writes_synchronously(self, journal):
+        journal.append(1, {"n": 0}, at=at(0))
+        assert journal.stats()["written"] == 1
+
+
+class TestJournalRoute:
+    """/internal/events/journal streams NDJSON"""
+
+    def test_stream(self, monkeypatch, journal):
+        monkeypatch.setattr("routes.event_routes.event_journal", journal)
+        journal.write([entry(0, camera_id=1), entry(1, camera_id=2)])
+        app = Flask(__name__)
+        app.register_blueprint(event_bp)
+
+        response = app.test_client().get(
+            "/internal/events/journal",
+            query_string={"start": at(0).isoformat(), "end": at(10).isoformat(), "camera_id": 2},
+        )
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        lines = response.get_data(as_text=True).splitlines()
+        assert len(lines) == 1 and '"camera_id": 2' in lines[0]
+
+        assert app.test_client().get("/internal/events/journal").status_code == 400
+
+    def test_module_singleton(self):
+        assert isinstance(event_journal_module.event_journal, EventJournal)
@@ -0,0 +1,176 @@
+"""
+Unit tests for the in-process intrusion event sink.
+
+Covers synchronous and batched background writes, failure isolation, the
+/internal/create route and trigger_intrusion submitting without HTTP.
+"""
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from domain.models import db, EventLog, Recording, Snapshot
+from infrastructure import intrusion_detection
+from infrastructure.event_journal import EventJournal
+from infrastructure.event_sink import EventSink, IntrusionEvent, build_event
+from routes.event_routes import event_bp
+
+
+@pytest.fixture
+def app():
+    """Create Flask app with in-memory database for testing"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    # one shared in-memory database for the test thread and the sink thread
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///file:event_sink?mode=memory&cache=shared&uri=true'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(event_bp)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def event(second, camera_id=1, snapshot=True):
+    timestamp = f"202501011200{second:02d}"
+    return IntrusionEvent(camera_id, timestamp, f"events/clip_{timestamp}.mp4",
+                          f"events/snap_{timestamp}.jpg" if snapshot else None)
+
+
+class TestBuildEvent:
+    """Validation of the /internal/create body"""
+
+    def test_valid(self):
+        built = build_event({"camera_id": 2, "timestamp": "20250101120000", "clip_path": "c.mp4"})
+        assert built.recording_id == 220250101120000
+        assert built.snapshot_path is None
+
+    @pytest.mark.parametrize("data", [{}, {"camera_id": 1, "timestamp": "20250101120000"},
+                                      {"camera_id": 1, "timestamp": "yesterday", "clip_path": "c.mp4"}])
+    def test_invalid(self, data):
+        with pytest.raises(ValueError):
+            build_event(data)
+
+
+class TestWrite:
+    """Synchronous writes"""
+
+    def test_write_creates_all_rows(self, app):
+        sink = EventSink(flask_app=app)
+        stored = sink.write([event(1), event(2, snapshot=False)])
+
+        assert [rec_id for rec_id, _ in stored] == [120250101120001, 120250101120002]
+        assert Recording.query.count() == 2
+        assert Snapshot.query.count() == 1
+        assert [r.recording_id for r in db.session.get(EventLog, stored[0][1]).recordings] == [120250101120001]
+
+    def test_bad_event_does_not_lose_the_batch(self, app):
+        sink = EventSink(flask_app=app, log_fn=lambda _msg: None)
+        sink.write([event(1)])
+
+        stored = sink.write([event(2), event(1), event(3)])  # event(1) is a duplicate recording id
+
+        assert [rec_id for rec_id, _ in stored] == [120250101120002, 120250101120003]
+        assert sink.stats()["failed"] == 1
+        assert Recording.query.count() == 3
+
+    def test_submit_without_thread_writes_synchronously(self, app):
+        sink = EventSink(flask_app=app)
+        assert sink.submit(event(1))
+        assert Recording.query.count() == 1
+
+
+class TestBackground:
+    """Queued, batched writes"""
+
+    def test_events_are_batched(self, app):
+        sink = EventSink(flask_app=app, max_batch=10, max_delay_ms=100)
+        sink.start()
+        try:
+            for second in range(5):
+                assert sink.submit(event(second))
+            deadline = time.monotonic() + 5
+            while sink.stats()["written"] < 5 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            sink.close()
+
+        stats = sink.stats()
+        assert stats["written"] == 5
+        assert stats["batches"] == 1
+        db.session.expire_all()
+        assert Recording.query.count() == 5
+
+    def test_close_writes_what_is_queued(self, app):
+        sink = EventSink(flask_app=app, max_batch=100, max_delay_ms=10_000)
+        sink.start()
+        for second in range(3):
+            sink.submit(event(second))
+        sink.close()
+
+        assert sink.stats()["written"] == 3
+        assert not sink.stats()["running"]
+
+    def test_unreachable_database_keeps_the_events(self, app, monkeypatch):
+        sink = EventSink(flask_app=app, max_batch=10, log_fn=lambda _msg: None)
+        sink._queue._running = True  # queue without a consumer thread, flushed by hand below
+        for second in range(3):
+            sink.submit(event(second))
+        calls = []
+
+        def unreachable(*args, **kwargs):
+            calls.append(args)
+            raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+        with monkeypatch.context() as patch:
+            patch.setattr(db.session, "commit", unreachable)
+            assert sink._queue.flush() == 0
+
+        assert len(calls) == 1  # not retried event by event
+        stats = sink.stats()
+        assert (stats["queued"], stats["failed"], stats["deferred_batches"]) == (3, 0, 1)
+
+        assert sink._queue.flush() == 3
+        assert Recording.query.count() == 3
+
+    def test_full_queue_drops_instead_of_blocking(self, app):
+        sink = EventSink(flask_app=app, queue_size=1, log_fn=lambda _msg: None)
+        sink._queue._running = True  # accept submissions without a consumer thread
+
+        assert sink.submit(event(1))
+        assert not sink.submit(event(2))
+        assert sink.stats()["dropped"] == 1
+
+
+class TestCallers:
+    """The route and trigger_intrusion both use the sink"""
+
+    def test_internal_create_route(self, app):
+        response = app.test_client().post("/internal/create", json={
+            "camera_id": 1, "timestamp": "20250101120000",
+            "clip_path": "events/clip.mp4", "snapshot_path": "events/snap.jpg",
+        })
+
+        assert response.status_code == 201
+        assert response.json["recording_id"] == 120250101120000
+        assert response.json["event_id"] is not None
+        assert app.test_client().post("/internal/create", json={"camera_id": 1}).status_code == 400
+
+    def test_trigger_intrusion_submits_without_http(self, monkeypatch, tmp_path):
+        submitted = []
+        monkeypatch.setattr(intrusion_detection, "EVENT_DIR", str(tmp_path))
+        monkeypatch.setattr(intrusion_detection, "event_journal", EventJournal(str(tmp_path)))
+        monkeypatch.setattr(intrusion_detection, "last_trigger_time", {})
+        monkeypatch.setattr(intrusion_detection, "capture_snapshot", lambda *a: None)
+        monkeypatch.setattr(intrusion_detection, "record_event_clip", lambda *a: None)
+        monkeypatch.setattr(intrusion_detection.alarm_control, "start_loop", lambda: None)
+        monkeypatch.setattr(intrusion_detection.event_sink, "submit", submitted.append)
+        monkeypatch.setattr(intrusion_detection, "_camera_for_topic",
+                            lambda topic: type("Info", (), {"id": 3, "serial": "B8A44F9EED3B"})())
+
+        assert intrusion_detection.trigger_intrusion("zone_intrusion/3/1", {"source": "zone"}) is True
+        assert [e.camera_id for e in submitted] == [3]
+        assert submitted[0].clip_path.endswith(f"clip_3_{submitted[0].timestamp}.mp4")
@@ -6,7 +6,7 @@ Authors: Test Suite
 """
 import pytest
 import math
-from infrastructure.floorplan_handler import FloorplanManager
+from infrastructure.floorplan_handler import DEFAULT_BOTTOM_LEFT, FloorplanManager
 
 
 class TestCoordinateConversions:
@@ -201,7 +201,6 @@ class TestPositionCalculation:
 
     def test_position_at_bottom_left_corner(self):
         """Test object at bottom-left corner returns (0, 0)"""
-        # NOTE: Function has hardcoded bottom_left coords for KY25
         bottom_lat = 58.39590610056573
         bottom_lon = 15.577997451724473
 
@@ -274,7 +273,6 @@ class TestPositionCalculation:
         bottom_lon = 15.577997451724473
 
         # Try position south and west (negative deltas)
-        # Note: Function ignores bottom_left parameter and uses hardcoded values
         object_lat = bottom_lat - 0.0001  # South
         object_lon = bottom_lon - 0.0001  # West
 
@@ -286,6 +284,32 @@ class TestPositionCalculation:
         assert result['x_m'] >= 0
         assert result['y_m'] >= 0
 
+    def test_position_uses_given_bottom_left(self):
+        """Test the origin is the bottom_left_coords passed in, not a fixed site"""
+        bottom_lat = 58.39775780178047
+        bottom_lon = 15.576700990688561
+
+        object_lat = bottom_lat + FloorplanManager.meters_to_lat(6.0)
+        object_lon = bottom_lon + FloorplanManager.meters_to_lon(3.0, bottom_lat)
+
+        result = FloorplanManager.calculate_position_on_floorplan(
+            object_lat, object_lon, [bottom_lat, bottom_lon]
+        )
+
+        assert abs(result['x_m'] - 3.0) < 0.01
+        assert abs(result['y_m'] - 6.0) < 0.01
+
+    def test_position_without_bottom_left_uses_default(self):
+        """Test an unplaced camera is located against DEFAULT_BOTTOM_LEFT"""
+        bottom_lat, bottom_lon = DEFAULT_BOTTOM_LEFT
+
+        result = FloorplanManager.calculate_position_on_floorplan(
+            bottom_lat + FloorplanManager.meters_to_lat(2.0), bottom_lon, None
+        )
+
+        assert abs(result['y_m'] - 2.0) < 0.01
+        assert result['x_m'] < 0.01
+
 
 class TestEdgeCases:
     """Test edge cases and potential error conditions"""
@@ -0,0 +1,134 @@
+#backend/tests/test_fusion_decoder.py
+#Unit tests for the typed fast-path fusion decoder
+import copy
+import json
+import pytest
+from infrastructure.fusion_decoder import FusionTrack, decode_axis_track, loads
+from infrastructure import fusion_persistence
+from infrastructure.fusion_persistence import _extract_tracks, _probe_track, decode_track
+
+
+#---------------- Fixtures ----------------
+
+@pytest.fixture
+def axis_track():
+    return {
+        "track_id": 42,
+        "class": {
+            "type": "Human",
+            "score": 0.87,
+            "upper_clothing_colors": ["Red"],
+            "lower_clothing_colors": "Black",
+        },
+        "bounding_box": {"top": 0.1, "bottom": 0.5, "left": 0.2, "right": 0.4},
+        "geoposition": {"latitude": 58.3959, "longitude": 15.5779},
+        "speed": 0.8,
+        "timestamp": "2025-11-20T10:15:30Z",
+        "start_time": "2025-11-20T10:15:00Z",
+        "observations": [{"timestamp": "2025-11-20T10:15:29Z"}],
+        "image": {"data": "aGVsbG8="},
+    }
+
+
+#---------------- Fast Path Tests ----------------
+
+#Canonical tracks decode to exactly what the probing path produces
+def test_fast_path_matches_probing(axis_track):
+    fast = decode_axis_track(axis_track)
+    assert isinstance(fast, FusionTrack)
+    assert fast == _probe_track(axis_track)
+    assert fast.track_id == "42"
+    assert fast.lower_clothing_colors == ["Black"]
+    assert fast.snapshot == "aGVsbG8="
+    assert fast.bbox_center() == pytest.approx((0.3, 0.3))
+
+#Tracks using alternative keys fall back to probing
+@pytest.mark.parametrize("mutate", [
+    lambda t: t.pop("track_id") and t.update({"id": 7}),
+    lambda t: t.pop("bounding_box") and t.update({"bbox": {"top": 1, "bottom": 2, "left": 3, "right": 4}}),
+    lambda t: t.pop("geoposition") and t.update({"position": {"lat": 1.0, "lon": 2.0}}),
+    lambda t: t.update({"speed": {"x": 3.0, "y": 4.0}}),
+    lambda t: t.pop("class") and t.update({"classes": [{"type": "Vehicle", "score": 0.5}]}),
+])
+def test_alternative_layouts_fall_back(axis_track, mutate):
+    track = copy.deepcopy(axis_track)
+    mutate(track)
+
+    assert decode_axis_track(track) is None
+    decoded = decode_track(track)
+    assert decoded == _probe_track(track)
+    assert decoded is not None
+
+#The fast path can be switched off per call
+def test_decode_track_without_fast_path(axis_track):
+    assert decode_track(axis_track, fast=False) == decode_axis_track(axis_track)
+
+#Vector speed is reduced to a magnitude by the probing path
+def test_vector_speed_via_fallback(axis_track):
+    axis_track["speed"] = {"x": 3.0, "y": 4.0}
+    assert decode_track(axis_track).speed == pytest.approx(5.0)
+
+
+#---------------- Layout Learning Tests ----------------
+
+@pytest.fixture
+def layout_cache():
+    fusion_persistence._layout_cache.clear()
+    yield fusion_persistence._layout_cache
+    fusion_persistence._layout_cache.clear()
+
+#Every supported layout yields the same tracks with or without a camera serial
+@pytest.mark.parametrize("payload", [
+    {"tracks": [{"track_id": 1}]},
+    {"objects": [{"id": 1}, "junk"]},
+    {"message": {"observations": [{"uuid": 1}]}},
+    {"data": {"tracks": [{"object_id": 1}]}},
+    {"frame": {"observations": [{"uid": 1}]}},
+    {"track_id": 1, "speed": 0.5},
+])
+def test_layouts_match_uncached(layout_cache, payload):
+    assert _extract_tracks(payload, "CAM1") == _extract_tracks(payload)
+    assert _extract_tracks(payload, "CAM1") == _extract_tracks(payload)
+    assert len(_extract_tracks(payload)) == 1
+
+#The matched path is remembered per camera and tried first
+def test_layout_is_learned_per_camera(layout_cache):
+    _extract_tracks({"data": {"tracks": [{"track_id": 1}]}}, "CAM1")
+    _extract_tracks({"tracks": [{"track_id": 1}]}, "CAM2")
+
+    assert layout_cache.get("CAM1") == ("data", "tracks")
+    assert layout_cache.get("CAM2") == ("tracks",)
+
+    #a learned path that misses is re-learned
+    assert _extract_tracks({"objects": [{"id": 5}]}, "CAM1") == [{"id": 5}]
+    assert layout_cache.get("CAM1") == ("objects",)
+
+#An envelope with an id and an empty track list must not teach the "payload is the track" path
+def test_empty_track_list_is_not_learned_as_single_track(layout_cache):
+    assert _extract_tracks({'id': 'm1', 'tracks': [{'track_id': 'a'}]}, "CAM1") == [{'track_id': 'a'}]
+    _extract_tracks({'id': 'm2', 'tracks': []}, "CAM1")
+    assert layout_cache.get("CAM1") == ("tracks",)
+
+    assert _extract_tracks({'id': 'm3', 'tracks': [{'track_id': 'b'}]}, "CAM1") == [{'track_id': 'b'}]
+
+#A single-track payload is matched on every call but never cached
+def test_single_track_path_is_not_cached(layout_cache):
+    assert _extract_tracks({"track_id": 1}, "CAM1") == [{"track_id": 1}]
+    assert layout_cache.get("CAM1") is None
+
+def test_no_tracks(layout_cache):
+    assert _extract_tracks({"tracks": []}, "CAM1") == []
+    assert _extract_tracks("not a dict", "CAM1") == []
+    assert layout_cache.get("CAM1") is None
+
+
+#---------------- JSON Loading Tests ----------------
+
+def test_loads_accepts_bytes_and_str():
+    doc = {"tracks": [{"track_id": 1}]}
+    assert loads(json.dumps(doc).encode()) == doc
+    assert loads(json.dumps(doc)) == doc
+
+def test_loads_rejects_invalid_json():
+    with pytest.raises(ValueError):
+        loads(b"not json")
@@ -0,0 +1,261 @@
+"""
+Unit tests for the per-floorplan fusion registry.
+
+Covers routing of MQTT events to the fusion of the camera's floorplan,
+floorplan origins, unplaced cameras, the published positions and the
+floorplan filter, concurrent fusion and the per-floorplan stats.
+"""
+import threading
+
+import pytest
+
+from infrastructure import fusion_registry as fusion_registry_module
+from infrastructure import mqtt_client
+from infrastructure.camera_registry import CameraInfo
+from infrastructure.floorplan_handler import DEFAULT_BOTTOM_LEFT, FloorplanManager
+from infrastructure.fusion_registry import FusionRegistry
+
+
+class FakeFloorplan:
+    """x/y meters are latitude/longitude relative to the floorplan origin."""
+
+    @staticmethod
+    def calculate_position_on_floorplan(lat, lon, bottom_left):
+        return {'x_m': lat - bottom_left[0], 'y_m': lon - bottom_left[1]}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def camera(serial, floorplan_id, bottom_left=(0.0, 0.0)):
+    return CameraInfo(id=hash(serial) % 1000, serial=serial, ip_address="10.0.0.1",
+                      floorplan_id=floorplan_id, bottom_left=bottom_left, rtsp_url="rtsp://x")
+
+
+def event(serial, *observations):
+    return {
+        'topic': f'axis/{serial}/analytics/fusion',
+        'payload': {'frame': {'observations': [
+            {'track_id': track_id, 'geoposition': {'latitude': x, 'longitude': y}}
+            for track_id, x, y in observations
+        ]}},
+    }
+
+
+def make_registry(cameras, clock=None):
+    by_serial = {c.serial: c for c in cameras}
+    return FusionRegistry(lookup=by_serial.get, floorplan_manager=FakeFloorplan,
+                          rate_window=10, clock=clock or FakeClock())
+
+
+class TestRouting:
+    """Each floorplan fuses only its own cameras"""
+
+    def test_cameras_on_one_floorplan_fuse(self):
+        registry = make_registry([camera('A', 1), camera('B', 1)])
+        first = registry.process_mqtt_event(event('A', ('t1', 1.0, 1.0)))
+        second = registry.process_mqtt_event(event('B', ('t9', 1.1, 1.0)))
+
+        assert first[0]['track_id'] == second[0]['track_id'] == 'global_1'
+        assert second[0]['floorplan_id'] == 1
+
+    def test_floorplans_are_separate(self):
+        registry = make_registry([camera('A', 1), camera('B', 2)])
+        first = registry.process_mqtt_event(event('A', ('t1', 1.0, 1.0)))
+        second = registry.process_mqtt_event(event('B', ('t1', 1.0, 1.0)))
+
+        assert (first[0]['floorplan_id'], second[0]['floorplan_id']) == (1, 2)
+        assert registry.for_floorplan(1, (0.0, 0.0)).fusion.get_track_count() == 1
+        assert registry.for_floorplan(2, (0.0, 0.0)).fusion.get_track_count() == 1
+
+    def test_floorplan_origin_from_camera(self):
+        registry = make_registry([camera('A', 1, bottom_left=(10.0, 20.0))])
+        position = registry.process_mqtt_event(event('A', ('t1', 12.0, 23.0)))[0]
+        assert (position['x_m'], position['y_m']) == (2.0, 3.0)
+
+    def test_moved_origin_is_picked_up(self):
+        cameras = {'A': camera('A', 1)}
+        registry = FusionRegistry(lookup=cameras.get, floorplan_manager=FakeFloorplan, clock=FakeClock())
+        registry.process_mqtt_event(event('A', ('t1', 5.0, 5.0)))
+        cameras['A'] = camera('A', 1, bottom_left=(4.0, 4.0))
+
+        position = registry.process_mqtt_event(event('A', ('t2', 9.0, 9.0)))[0]
+        assert (position['x_m'], position['y_m']) == (5.0, 5.0)
+
+    def test_unplaced_cameras_fuse_on_default_origin(self):
+        registry = make_registry([camera('A', None), camera('B', 1, bottom_left=None), camera('C', 1)])
+        lat, lon = DEFAULT_BOTTOM_LEFT
+        first = registry.process_mqtt_event(event('A', ('t1', lat + 1.0, lon + 2.0)))
+        second = registry.process_mqtt_event(event('B', ('t1', lat + 1.1, lon + 2.0)))
+        third = registry.process_mqtt_event(event('UNKNOWN', ('t1', lat + 5.0, lon)))
+
+        assert first[0]['floorplan_id'] is None
+        assert (first[0]['x_m'], first[0]['y_m']) == pytest.approx((1.0, 2.0))
+        assert second[0]['track_id'] == first[0]['track_id']
+        assert third[0]['floorplan_id'] is None
+        assert registry.process_mqtt_event({'topic': 'other/x', 'payload': {}}) == []
+        registry.process_mqtt_event(event('C', ('t1', 1.0, 1.0)))
+
+        stats = registry.stats()
+        assert stats['unplaced_events'] == 3
+        assert list(stats['floorplans']) == ['unplaced', '1']
+        assert stats['floorplans']['unplaced']['active_tracks'] == 2
+
+
+
+class TestPublishedPositions:
+    """Each event is fused once; streams read the published positions with a cursor"""
+
+    def test_readers_share_one_fusion(self):
+        registry = make_registry([camera('A', 1)])
+        first, second = registry.cursor(), registry.cursor()
+        registry.process_mqtt_event(event('A', ('t1', 1.0, 1.0), ('t2', 5.0, 5.0)))
+
+        seen_first, first = registry.read_since(first)
+        seen_second, second = registry.read_since(second)
+        assert [p['track_id'] for p in seen_first] == [p['track_id'] for p in seen_second] == ['global_1', 'global_2']
+        assert registry.read_since(first) == ([], first)
+        assert registry.stats()['floorplans']['1']['fuse_calls'] == 1
+        assert registry.stats()['published_positions'] == 2
+
+    def test_floorplan_filter(self):
+        registry = make_registry([camera('A', 1), camera('B', 2)])
+        cursor = registry.cursor()
+        registry.process_mqtt_event(event('A', ('t1', 1.0, 1.0)))
+        registry.process_mqtt_event(event('UNKNOWN', ('t1', 1.0, 1.0)))
+        registry.process_mqtt_event(event('B', ('t1', 1.0, 1.0)))
+
+        positions, end = registry.read_since(cursor, floorplan_id=2)
+        assert [p['floorplan_id'] for p in positions] == [2]
+        assert end == registry.cursor()
+
+    def test_slow_reader_resumes_at_oldest(self):
+        registry = FusionRegistry(lookup={'A': camera('A', 1)}.get, floorplan_manager=FakeFloorplan,
+                                  clock=FakeClock(), buffer_size=2)
+        cursor = registry.cursor()
+        for n in range(3):
+            registry.process_mqtt_event(event('A', ('t1', float(n), 0.0)))
+
+        positions, _ = registry.read_since(cursor)
+        assert [p['x_m'] for p in positions] == [1.0, 2.0]
+
+    def test_mqtt_worker_fuses_and_writes_heatmap_once(self, monkeypatch):
+        registry = make_registry([camera('A', 1)])
+        heatmap = []
+        monkeypatch.setattr(mqtt_client, 'fusion_registry', registry)
+        monkeypatch.setattr(mqtt_client, '_heatmap_writer', type('Writer', (), {'add': lambda self, rows: heatmap.extend(rows)})())
+        streams = [registry.cursor() for _ in range(3)]
+
+        message = event('A', ('t1', 1.0, 2.0))
+        mqtt_client._fuse_positions(message['topic'], message['payload'])
+
+        for cursor in streams:
+            assert len(registry.read_since(cursor)[0]) == 1
+        assert registry.stats()['floorplans']['1']['fuse_calls'] == 1
+        assert [(row['track_id'], row['x_m'], row['y_m'], row['floorplan_id']) for row in heatmap] == [
+            ('global_1', 1.0, 2.0, 1)]
+
+
+    def test_scene_frames_are_fused(self, monkeypatch):
+        registry = make_registry([camera('A', 1)])
+        monkeypatch.setattr(mqtt_client, 'fusion_registry', registry)
+        monkeypatch.setattr(mqtt_client, '_heatmap_writer', None)
+        cursor = registry.cursor()
+
+        for topic in ('axis/A/analytics/scene/description', 'axis/A/scene/metadata'):
+            payload = event('A', ('t1', 1.0, 2.0))['payload']
+            mqtt_client.router.dispatch(topic, payload)
+
+        positions, _ = registry.read_since(cursor)
+        assert [(p['track_id'], p['floorplan_id']) for p in positions] == [('global_1', 1), ('global_1', 1)]
+
+class TestFloorplanOrigin:
+    """Positions are computed by the real FloorplanManager against each camera's own corner"""
+
+    def test_each_floorplan_uses_its_corner(self):
+        corners = {1: (58.39590610056573, 15.577997451724473), 2: (58.39775780178047, 15.576700990688561)}
+        cameras = {'A': camera('A', 1, bottom_left=corners[1]), 'B': camera('B', 2, bottom_left=corners[2])}
+        registry = FusionRegistry(lookup=cameras.get, clock=FakeClock())
+        north = FloorplanManager.meters_to_lat(10.0)
+
+        for serial, fid in (('A', 1), ('B', 2)):
+            lat, lon = corners[fid]
+            east = FloorplanManager.meters_to_lon(4.0, lat)
+            position = registry.process_mqtt_event(event(serial, ('t1', lat + north, lon + east)))[0]
+            assert position['floorplan_id'] == fid
+            assert abs(position['y_m'] - 10.0) < 0.01
+            assert abs(position['x_m'] - 4.0) < 0.01
+
+    def test_unplaced_camera_uses_default_corner(self):
+        registry = FusionRegistry(lookup={}.get, clock=FakeClock())
+        lat, lon = DEFAULT_BOTTOM_LEFT
+        position = registry.process_mqtt_event(event('A', ('t1', lat + FloorplanManager.meters_to_lat(3.0), lon)))[0]
+        assert position['floorplan_id'] is None
+        assert abs(position['y_m'] - 3.0) < 0.01
+        assert position['x_m'] < 0.01
+
+
+class TestConcurrency:
+    """Concurrent streams on the same floorplan do not corrupt its tracks"""
+
+    def test_parallel_streams(self):
+        registry = make_registry([camera(f'C{i}', i % 2) for i in range(8)])
+        errors = []
+
+        def stream(serial):
+            try:
+                for n in range(200):
+                    registry.process_mqtt_event(event(serial, (n % 5 + 1, float(n % 5) * 3, 0.0)))
+            except Exception as e:  # pragma: no cover - only on a race
+                errors.append(e)
+
+        threads = [threading.Thread(target=stream, args=(f'C{i}',)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        stats = registry.stats()['floorplans']
+        assert stats['0']['fuse_calls'] == stats['1']['fuse_calls'] == 800
+        # five positions 3 m apart per floorplan, shared by the cameras of that floorplan
+        assert stats['0']['active_tracks'] == stats['1']['active_tracks'] == 5
+
+
+class TestStats:
+    """Active tracks and fuse calls per second per floorplan"""
+
+    def test_rate_over_window(self):
+        clock = FakeClock()
+        registry = make_registry([camera('A', 1)], clock=clock)
+        for _ in range(50):
+            registry.process_mqtt_event(event('A', ('t1', 1.0, 1.0)))
+        assert registry.stats()['floorplans']['1']['fuse_calls_per_s'] == 0.0  # first window still open
+
+        clock.now = 10.0
+        registry.process_mqtt_event(event('A', ('t1', 1.0, 1.0)))
+        stats = registry.stats()['floorplans']['1']
+        assert stats['fuse_calls'] == 51
+        assert stats['fuse_calls_per_s'] == 5.0
+        assert stats['active_tracks'] == 1
+
+    def test_idle_rate_decays(self):
+        clock = FakeClock()
+        registry = make_registry([camera('A', 1)], clock=clock)
+        registry.process_mqtt_event(event('A', ('t1', 1.0, 1.0)))
+        clock.now = 100.0
+        assert registry.stats()['floorplans']['1']['fuse_calls_per_s'] == 0.01
+
+    def test_frames_without_positions_are_not_fuse_calls(self):
+        registry = make_registry([camera('A', 1)])
+        registry.process_mqtt_event(event('A'))
+        assert registry.stats()['floorplans']['1']['fuse_calls'] == 0
+
+    def test_module_singleton(self):
+        assert isinstance(fusion_registry_module.fusion_registry, FusionRegistry)
+        assert set(fusion_registry_module.get_fusion_registry_stats()) >= {'floorplans', 'unplaced_events'}
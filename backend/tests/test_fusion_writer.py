@@ -0,0 +1,192 @@
+"""
+Unit tests for fusion persistence and the FusionData write-behind buffer.
+
+Uses an in-memory SQLite database.
+"""
+import time
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from domain.models import db, FusionData, PositionHistory
+from infrastructure import fusion_persistence
+from infrastructure.fusion_persistence import store_fusion_message
+from infrastructure.fusion_writer import FusionWriteBehind
+
+TOPIC = "axis/B8A44F9EED3B/analytics/fusion"
+
+
+@pytest.fixture
+def app():
+    """Create Flask app with in-memory database for testing"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+    fusion_persistence._track_motion_cache.clear()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def _payload(first_id, count, speed=1.0):
+    return {
+        "timestamp": "2025-11-20T10:15:30Z",
+        "tracks": [
+            {
+                "track_id": first_id + i,
+                "class": {"type": "Human", "score": 0.9},
+                "bounding_box": {"top": 0.1, "bottom": 0.5, "left": 0.2, "right": 0.4},
+                "geoposition": {"latitude": 58.39 + i * 1e-4, "longitude": 15.57},
+                "speed": speed,
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def _row_count(app):
+    with app.app_context():
+        return FusionData.query.count()
+
+
+class TestStoreFusionMessage:
+    """store_fusion_message without a writer commits immediately"""
+
+    def test_tracks_are_stored(self, app):
+        store_fusion_message(TOPIC, _payload(1, 3), flask_app=app)
+
+        with app.app_context():
+            rows = FusionData.query.order_by(FusionData.track_id).all()
+            assert [r.track_id for r in rows] == ["1", "2", "3"]
+            assert rows[0].camera_serial == "B8A44F9EED3B"
+            assert rows[0].class_type == "Human"
+            assert rows[0].event_timestamp is not None
+
+    def test_stationary_tracks_are_skipped(self, app):
+        store_fusion_message(TOPIC, _payload(1, 1, speed=0.0), flask_app=app)
+        store_fusion_message(TOPIC, _payload(1, 1, speed=0.0), flask_app=app)
+
+        assert _row_count(app) == 1
+
+    def test_rows_go_to_writer(self, app):
+        writer = FusionWriteBehind(flask_app=app, max_rows=100, max_delay_ms=1000)
+        store_fusion_message(TOPIC, _payload(1, 3), flask_app=app, writer=writer)
+
+        assert _row_count(app) == 0
+        assert writer.stats()["pending_rows"] == 3
+        assert writer.flush() == 3
+        assert _row_count(app) == 3
+
+
+class TestFusionWriteBehind:
+    """Batching thresholds, shutdown flush and metrics"""
+
+    def test_flush_when_row_threshold_reached(self, app):
+        writer = FusionWriteBehind(flask_app=app, max_rows=5, max_delay_ms=60000)
+        writer.start()
+        try:
+            store_fusion_message(TOPIC, _payload(1, 3), writer=writer)
+            time.sleep(0.1)
+            assert _row_count(app) == 0
+
+            store_fusion_message(TOPIC, _payload(10, 3), writer=writer)
+            deadline = time.time() + 2
+            while _row_count(app) < 6 and time.time() < deadline:
+                time.sleep(0.02)
+            assert _row_count(app) == 6
+        finally:
+            writer.close()
+
+        stats = writer.stats()
+        assert stats["flushes"] == 1
+        assert stats["last_flush_size"] == 6
+
+    def test_flush_when_delay_expires(self, app):
+        writer = FusionWriteBehind(flask_app=app, max_rows=1000, max_delay_ms=50)
+        writer.start()
+        try:
+            store_fusion_message(TOPIC, _payload(1, 2), writer=writer)
+            deadline = time.time() + 2
+            while _row_count(app) < 2 and time.time() < deadline:
+                time.sleep(0.02)
+            assert _row_count(app) == 2
+        finally:
+            writer.close()
+
+    def test_close_flushes_pending_rows(self, app):
+        writer = FusionWriteBehind(flask_app=app, max_rows=1000, max_delay_ms=60000)
+        writer.start()
+        store_fusion_message(TOPIC, _payload(1, 4), writer=writer)
+        writer.close()
+
+        assert _row_count(app) == 4
+        stats = writer.stats()
+        assert stats["rows_written"] == 4
+        assert stats["pending_rows"] == 0
+        assert stats["running"] is False
+
+    def test_failed_flush_is_counted(self, app):
+        writer = FusionWriteBehind(flask_app=app, max_rows=1000, max_delay_ms=60000)
+        writer.add([{"camera_serial": None, "track_id": None}])  #violates NOT NULL
+
+        assert writer.flush() == 0
+        assert writer.stats()["rows_dropped"] == 1
+        assert _row_count(app) == 0
+
+    def test_bad_row_only_drops_itself(self, app):
+        writer = FusionWriteBehind(flask_app=app, max_rows=1000, max_delay_ms=60000)
+        store_fusion_message(TOPIC, _payload(1, 5), writer=writer)
+        writer.add([{"camera_serial": None, "track_id": None}])  #violates NOT NULL
+        store_fusion_message(TOPIC, _payload(10, 4), writer=writer)
+
+        assert writer.flush() == 9
+        assert _row_count(app) == 9
+        stats = writer.stats()
+        assert stats["rows_written"] == 9
+        assert stats["rows_dropped"] == 1
+        assert stats["split_retries"] > 0
+
+    def test_unreachable_database_keeps_the_rows(self, app, monkeypatch):
+        writer = FusionWriteBehind(flask_app=app, max_rows=1000, max_delay_ms=60000, log_fn=lambda _msg: None)
+        store_fusion_message(TOPIC, _payload(1, 5), writer=writer)
+        calls = []
+
+        def unreachable(*args, **kwargs):
+            calls.append(args)
+            raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+        with monkeypatch.context() as patch:
+            patch.setattr(db.session, "execute", unreachable)
+            assert writer.flush() == 0
+
+        assert len(calls) == 1  # not split row by row
+        stats = writer.stats()
+        assert stats["pending_rows"] == 5
+        assert stats["rows_dropped"] == 0
+        assert stats["deferred_flushes"] == 1
+
+        assert writer.flush() == 5
+        assert _row_count(app) == 5
+
+    def test_rows_beyond_the_backlog_are_rejected(self, app):
+        writer = FusionWriteBehind(flask_app=app, max_rows=1000, max_delay_ms=60000, max_pending_rows=3)
+        writer.add([{"camera_serial": "B8A44F9EED3B", "track_id": str(i)} for i in range(5)])
+
+        assert writer.stats()["rows_rejected"] == 2
+
+    def test_other_model(self, app):
+        writer = FusionWriteBehind(flask_app=app, max_rows=1000, max_delay_ms=60000,
+                                   model=PositionHistory, label="Heatmap")
+        writer.add([{"track_id": "global_1", "x_m": 1.0, "y_m": 2.0, "timestamp": datetime.utcnow()}])
+
+        assert writer.flush() == 1
+        with app.app_context():
+            assert PositionHistory.query.count() == 1
+        assert _row_count(app) == 0
@@ -0,0 +1,105 @@
+"""
+Unit tests for the vectorized point-in-polygon membership matrix.
+
+The scalar ray-casting functions (intrusion_detection.point_in_polygon and
+Zone.contains_point) are the reference implementations.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from domain.models import Zone
+from infrastructure.geometry import PolygonSet, points_in_polygons
+from infrastructure.intrusion_detection import point_in_polygon
+
+SQUARE = [(0, 0), (4, 0), (4, 4), (0, 4)]
+# concave "U" shape: the notch (1.5..2.5, 2..4) is outside
+U_SHAPE = [(0, 0), (4, 0), (4, 4), (2.5, 4), (2.5, 2), (1.5, 2), (1.5, 4), (0, 4)]
+
+
+def _random_polygon(rng):
+    cx, cy = rng.uniform(0, 50), rng.uniform(0, 50)
+    n = rng.randint(3, 9)
+    angles = sorted(rng.uniform(0, 2 * np.pi) for _ in range(n))
+    return [(cx + rng.uniform(1, 8) * np.cos(a), cy + rng.uniform(1, 8) * np.sin(a)) for a in angles]
+
+
+class TestPointsInPolygons:
+    """Membership matrix shape and basic cases"""
+
+    def test_matrix_shape_and_values(self):
+        points = [(1, 1), (2, 3), (5, 5), (0.5, 3.5)]
+        result = points_in_polygons(points, [SQUARE, U_SHAPE])
+
+        assert result.shape == (4, 2)
+        assert result.dtype == bool
+        assert result.tolist() == [[True, True], [True, False], [False, False], [True, True]]
+
+    def test_degenerate_polygons_never_match(self):
+        result = points_in_polygons([(1, 1)], [[], [(0, 0), (2, 2)], SQUARE])
+        assert result.tolist() == [[False, False, True]]
+
+    def test_no_points_or_no_polygons(self):
+        assert PolygonSet([SQUARE]).contains(np.empty((0, 2))).shape == (0, 1)
+        assert PolygonSet([]).contains([(1, 1)]).shape == (1, 0)
+
+    def test_chunking_gives_same_result(self, monkeypatch):
+        rng = random.Random(1)
+        polygons = [_random_polygon(rng) for _ in range(20)]
+        points = [(rng.uniform(0, 60), rng.uniform(0, 60)) for _ in range(300)]
+        full = points_in_polygons(points, polygons)
+
+        monkeypatch.setattr("infrastructure.geometry._MAX_CHUNK_ELEMENTS", 50)
+        assert np.array_equal(points_in_polygons(points, polygons), full)
+
+
+class TestContainsPairs:
+    """Selected (point, polygon) pairs agree with the full matrix"""
+
+    def test_pairs_match_matrix(self, monkeypatch):
+        rng = random.Random(5)
+        polygons = [_random_polygon(rng) for _ in range(15)] + [[(0, 0), (1, 1)]]
+        points = [(rng.uniform(0, 60), rng.uniform(0, 60)) for _ in range(200)]
+        polygon_set = PolygonSet(polygons)
+        full = polygon_set.contains(points)
+
+        rows = np.repeat(np.arange(len(points)), len(polygons))
+        columns = np.tile(np.arange(len(polygons)), len(points))
+        order = np.random.default_rng(0).permutation(len(rows))
+        assert np.array_equal(polygon_set.contains_pairs(points, rows[order], columns[order]), full[rows[order], columns[order]])
+
+        monkeypatch.setattr("infrastructure.geometry._MAX_CHUNK_ELEMENTS", 50)
+        assert np.array_equal(polygon_set.contains_pairs(points, rows, columns), full[rows, columns])
+
+    def test_no_pairs(self):
+        assert PolygonSet([SQUARE]).contains_pairs([(1, 1)], [], []).shape == (0,)
+        assert PolygonSet([[], SQUARE]).contains_pairs([(1, 1)], [0], [0]).tolist() == [False]
+
+
+class TestMatchesReference:
+    """Agrees with the scalar ray-casting implementations"""
+
+    @pytest.fixture
+    def scene(self):
+        rng = random.Random(7)
+        polygons = [_random_polygon(rng) for _ in range(40)] + [U_SHAPE]
+        points = [(rng.uniform(-5, 60), rng.uniform(-5, 60)) for _ in range(2000)]
+        return polygons, points
+
+    def test_point_in_polygon(self, scene):
+        polygons, points = scene
+        result = points_in_polygons(points, polygons)
+
+        for p, (x, y) in enumerate(points):
+            for z, polygon in enumerate(polygons):
+                expected = point_in_polygon({"x": x, "y": y}, [{"x": a, "y": b} for a, b in polygon])
+                assert result[p, z] == expected
+
+    def test_zone_contains_point(self, scene):
+        polygons, points = scene
+        zones = [Zone(coordinates=[{"x": a, "y": b} for a, b in polygon]) for polygon in polygons]
+        result = points_in_polygons(points, polygons)
+
+        for p, (x, y) in enumerate(points):
+            assert result[p].tolist() == [zone.contains_point(x, y) for zone in zones]
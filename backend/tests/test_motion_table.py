@@ -0,0 +1,154 @@
+#backend/tests/test_motion_table.py
+#Unit tests for the array-backed stationary-track table
+import math
+import random
+import numpy as np
+import pytest
+from infrastructure.motion_table import MotionTable, haversine_meters
+
+MIN_SPEED = 0.3
+MIN_DISTANCE = 0.4
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _scalar_haversine(p1, p2):
+    lat1, lon1 = map(math.radians, p1)
+    lat2, lon2 = map(math.radians, p2)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371000 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _reference(previous, track):
+    """Per-track stationary check as it was done before vectorizing"""
+    key, lat, lon, bbox, speed = track
+    prev = previous.get(key)
+    previous[key] = (lat, lon, bbox)
+    if speed is not None and speed >= MIN_SPEED:
+        return False
+    if prev is None:
+        return False
+    moved = 0.0
+    if None not in (lat, lon, prev[0], prev[1]):
+        moved = _scalar_haversine((lat, lon), (prev[0], prev[1]))
+    elif bbox and prev[2]:
+        moved = math.hypot(bbox[0] - prev[2][0], bbox[1] - prev[2][1])
+    return moved < MIN_DISTANCE
+
+
+def _check(table, tracks):
+    keys, lats, lons, bboxes, speeds = zip(*tracks)
+    return table.check(keys, lats, lons, bboxes, speeds, MIN_SPEED, MIN_DISTANCE).tolist()
+
+
+#---------------- Distance Tests ----------------
+
+def test_haversine_matches_scalar():
+    lat1, lon1 = np.array([58.3959, 0.0]), np.array([15.5779, 0.0])
+    lat2, lon2 = np.array([58.3960, 1.0]), np.array([15.5781, 1.0])
+    expected = [_scalar_haversine((lat1[i], lon1[i]), (lat2[i], lon2[i])) for i in range(2)]
+    assert haversine_meters(lat1, lon1, lat2, lon2) == pytest.approx(expected)
+
+
+#---------------- Stationary Check Tests ----------------
+
+#Random messages give exactly the same decisions as the per-track check, on both paths
+@pytest.mark.parametrize("vectorize_from", [0, 32, 10**6])
+def test_matches_scalar_reference(vectorize_from):
+    rng = random.Random(7)
+    table, previous = MotionTable(max_size=1000, vectorize_from=vectorize_from), {}
+    for _ in range(50):
+        tracks = []
+        for _ in range(rng.randint(1, 30)):
+            has_geo = rng.random() < 0.7
+            tracks.append((
+                rng.randint(0, 40),
+                58.3959 + rng.random() * 1e-5 if has_geo else None,
+                15.5779 + rng.random() * 1e-5 if has_geo else None,
+                (rng.random(), rng.random()) if rng.random() < 0.8 else None,
+                rng.choice([None, 0.0, 0.1, 1.0]),
+            ))
+        expected = [_reference(previous, t) for t in tracks]
+        assert _check(table, tracks) == expected
+
+#First sighting and moving tracks are never stationary
+def test_first_sighting_and_speed():
+    table = MotionTable()
+    assert _check(table, [("a", 58.0, 15.0, None, 0.0)]) == [False]
+    assert _check(table, [("a", 58.0, 15.0, None, 0.0)]) == [True]
+    assert _check(table, [("a", 58.0, 15.0, None, 2.0)]) == [False]
+
+#Falls back to bounding box centers when coordinates are missing
+def test_bbox_fallback():
+    table = MotionTable()
+    _check(table, [("a", None, None, (0.1, 0.1), None)])
+    assert _check(table, [("a", None, None, (0.2, 0.2), None)]) == [True]
+    assert _check(table, [("a", None, None, (0.9, 0.9), None)]) == [False]
+
+#A track id repeated in one message is compared against its earlier occurrence
+def test_duplicate_ids_in_message():
+    table = MotionTable()
+    tracks = [("a", 58.0, 15.0, None, None), ("a", 58.0, 15.0, None, None), ("a", 58.1, 15.0, None, None)]
+    assert _check(table, tracks) == [False, True, False]
+
+
+#---------------- Bounds Tests ----------------
+
+def test_least_recently_seen_is_evicted():
+    clock = FakeClock()
+    table = MotionTable(max_size=2, clock=clock)
+    _check(table, [("a", 58.0, 15.0, None, None)])
+    clock.now += 1
+    _check(table, [("b", 58.0, 15.0, None, None)])
+    clock.now += 1
+    _check(table, [("c", 58.0, 15.0, None, None)])
+
+    assert len(table) == 2
+    assert "a" not in table
+    assert table.stats()["evictions"] == 1
+    assert _check(table, [("a", 58.0, 15.0, None, None)]) == [False]
+
+def test_entries_expire():
+    clock = FakeClock()
+    table = MotionTable(max_size=10, ttl_seconds=5, clock=clock)
+    _check(table, [("a", 58.0, 15.0, None, None), ("b", 58.0, 15.0, None, None)])
+    clock.now += 6
+
+    assert _check(table, [("a", 58.0, 15.0, None, None)]) == [False]
+    stats = table.stats()
+    assert stats["size"] == 1
+    assert stats["expirations"] == 2
+
+#Small and large messages share the same table and counters
+def test_paths_share_state():
+    table = MotionTable(vectorize_from=3)
+    _check(table, [("a", 58.0, 15.0, None, None)])
+    assert _check(table, [(k, 58.0, 15.0, None, None) for k in "abc"]) == [True, False, False]
+    assert _check(table, [("c", 58.0, 15.0, None, None)]) == [True]
+
+    stats = table.stats()
+    assert (stats["size"], stats["hits"], stats["misses"]) == (3, 2, 3)
+
+def test_batch_larger_than_table():
+    table = MotionTable(max_size=3)
+    tracks = [(i, 58.0, 15.0, None, None) for i in range(5)]
+    assert _check(table, tracks) == [False] * 5
+    assert len(table) == 3
+    assert _check(table, tracks[-3:]) == [True] * 3
+
+def test_clear_and_stats():
+    table = MotionTable()
+    _check(table, [("a", 58.0, 15.0, None, None)])
+    _check(table, [("a", 58.0, 15.0, None, None)])
+
+    stats = table.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    table.clear()
+    assert len(table) == 0
+    assert _check(table, [("a", 58.0, 15.0, None, None)]) == [False]
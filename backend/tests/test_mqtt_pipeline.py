@@ -0,0 +1,144 @@
+#backend/tests/test_mqtt_pipeline.py
+#Unit tests for the bounded MQTT worker pipeline
+import threading
+import time
+import pytest
+from infrastructure.mqtt_pipeline import MessagePipeline
+
+
+#---------------- Helpers ----------------
+
+#Handler that blocks until released, so the queue can be filled deterministically
+class BlockingHandler:
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.items = []
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        self.started.set()
+        self.release.wait(timeout=5)
+        with self.lock:
+            self.items.append(item)
+
+
+#---------------- Tests ----------------
+
+#All submitted items are processed by the workers
+def test_processes_all_items():
+    seen = []
+    lock = threading.Lock()
+
+    def handler(item):
+        with lock:
+            seen.append(item)
+
+    pipeline = MessagePipeline(handler, workers=3, max_size=100)
+    pipeline.start()
+    for i in range(50):
+        assert pipeline.submit(i)
+    pipeline.stop(timeout=5)
+
+    assert sorted(seen) == list(range(50))
+    stats = pipeline.stats()
+    assert stats["processed"] == 50
+    assert stats["dropped"] == 0
+    assert stats["queue_depth"] == 0
+
+#drop_oldest never blocks the producer and discards the oldest queued item
+def test_drop_oldest_policy():
+    handler = BlockingHandler()
+    pipeline = MessagePipeline(handler, workers=1, max_size=2, overflow="drop_oldest")
+    pipeline.start()
+
+    pipeline.submit("busy")  #taken by the single worker
+    assert handler.started.wait(timeout=2)
+    for item in ("a", "b", "c"):
+        assert pipeline.submit(item)
+
+    stats = pipeline.stats()
+    assert stats["dropped"] == 1
+    assert stats["queue_depth"] == 2
+
+    handler.release.set()
+    pipeline.stop(timeout=5)
+    assert handler.items == ["busy", "b", "c"]
+
+#block policy waits for room and drops the new item when the wait times out
+def test_block_policy_times_out():
+    handler = BlockingHandler()
+    pipeline = MessagePipeline(handler, workers=1, max_size=1, overflow="block", block_timeout=0.05)
+    pipeline.start()
+
+    pipeline.submit("busy")
+    assert handler.started.wait(timeout=2)
+    assert pipeline.submit("queued")
+
+    start = time.time()
+    assert pipeline.submit("rejected") is False
+    assert time.time() - start >= 0.04
+    assert pipeline.stats()["dropped"] == 1
+
+    handler.release.set()
+    pipeline.stop(timeout=5)
+    assert handler.items == ["busy", "queued"]
+
+#Handler exceptions are counted and do not kill the worker
+def test_handler_errors_are_counted():
+    def handler(item):
+        if item == "bad":
+            raise RuntimeError("boom")
+
+    pipeline = MessagePipeline(handler, workers=1, max_size=10)
+    pipeline.start()
+    pipeline.submit("bad")
+    pipeline.submit("good")
+    pipeline.stop(timeout=5)
+
+    stats = pipeline.stats()
+    assert stats["errors"] == 1
+    assert stats["processed"] == 1
+
+def test_invalid_overflow_policy():
+    with pytest.raises(ValueError):
+        MessagePipeline(lambda item: None, overflow="drop_newest")
+
+#Items with the same key are processed by one worker in submission order
+def test_keyed_items_keep_their_order():
+    seen = {}
+    lock = threading.Lock()
+
+    def handler(item):
+        camera, n = item
+        time.sleep(0.001 if n % 3 == 0 else 0)
+        with lock:
+            seen.setdefault(camera, []).append((n, threading.current_thread().name))
+
+    pipeline = MessagePipeline(handler, workers=4, max_size=1000, key=lambda item: item[0])
+    pipeline.start()
+    for n in range(50):
+        for camera in ("A", "B", "C", "D", "E"):
+            pipeline.submit((camera, n))
+    pipeline.stop(timeout=10)
+
+    for camera, items in seen.items():
+        assert [n for n, _ in items] == list(range(50))
+        assert len({worker for _, worker in items}) == 1
+
+#drop_oldest drops from the queue of the new item's key first
+def test_drop_oldest_prefers_own_queue():
+    handler = BlockingHandler()
+    pipeline = MessagePipeline(handler, workers=2, max_size=2, overflow="drop_oldest", key=lambda item: item[0])
+    keys = {hash(k) % 2: k for k in ("a", "b", "c", "d", "e", "f")}
+    first, second = keys[0], keys[1]
+
+    pipeline.submit((first, 1))
+    pipeline.submit((second, 1))
+    pipeline.submit((second, 2))  #full: drops (second, 1), not the other camera's frame
+
+    assert pipeline.stats()["queue_depths"] == [1, 1]
+    pipeline.start()
+    handler.release.set()
+    pipeline.stop(timeout=5)
+    assert sorted(handler.items) == sorted([(first, 1), (second, 2)])
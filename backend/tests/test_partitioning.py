@@ -0,0 +1,245 @@
+"""
+Unit tests for time partitioning helpers and retention.
+
+The retention paths run against an in-memory SQLite database (batched deletes);
+the PostgreSQL DDL is checked as generated SQL.
+"""
+import datetime
+import pytest
+from flask import Flask
+from domain.models import db, FusionData, PositionHistory
+from infrastructure.partitioning import (
+    PARTITIONED_TABLES,
+    PartitionManager,
+    PartitionedTable,
+    RetentionWorker,
+    parse_partition_name,
+    partition_name,
+    period_end,
+    period_start,
+)
+from routes.camera_config_routes import camera_config_bp
+
+NOW = datetime.datetime(2025, 11, 20, 12, 0, 0)
+
+
+@pytest.fixture
+def app():
+    """Create Flask app with in-memory database for testing"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(camera_config_bp)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _add_positions(ages_in_days, now=NOW):
+    for i, age in enumerate(ages_in_days):
+        db.session.add(PositionHistory(
+            track_id=f"global_{i}", x_m=1.0, y_m=2.0,
+            timestamp=now - datetime.timedelta(days=age),
+        ))
+    db.session.commit()
+
+
+class TestPartitionNames:
+    """Period boundaries and partition naming"""
+
+    def test_daily_and_weekly_periods(self):
+        thursday = datetime.date(2025, 11, 20)
+        assert period_start(thursday, "day") == thursday
+        assert period_end(thursday, "day") == datetime.date(2025, 11, 21)
+        assert period_start(thursday, "week") == datetime.date(2025, 11, 17)
+        assert period_end(datetime.date(2025, 11, 17), "week") == datetime.date(2025, 11, 24)
+
+    def test_unknown_interval_is_rejected(self):
+        with pytest.raises(ValueError):
+            period_start(datetime.date(2025, 11, 20), "month")
+
+    def test_names_round_trip(self):
+        start, end = datetime.date(2025, 11, 17), datetime.date(2025, 11, 24)
+        name = partition_name("fusion_data", start, end)
+
+        assert name == "fusion_data_20251117_20251124"
+        assert parse_partition_name("fusion_data", name) == (start, end)
+        assert parse_partition_name("fusion_data", "fusion_data_legacy_20251121") == (None, datetime.date(2025, 11, 21))
+        assert parse_partition_name("fusion_data", "fusion_data_default") is None
+        assert parse_partition_name("position_history", name) is None
+
+
+class TestSQLiteRetention:
+    """SQLite falls back to bounded batched deletes"""
+
+    def test_purge_before_deletes_in_batches(self, app):
+        _add_positions([0, 1, 10, 11, 12, 40, 41])
+        manager = PartitionManager(db.engine, batch_size=2, clock=lambda: NOW)
+
+        deleted = manager.purge_before("position_history", NOW - datetime.timedelta(days=5))
+
+        assert deleted == 5
+        assert PositionHistory.query.count() == 2
+
+    def test_purge_all(self, app):
+        _add_positions([0, 1, 2])
+        manager = PartitionManager(db.engine, batch_size=2)
+
+        assert manager.purge_before("position_history") == 3
+        assert PositionHistory.query.count() == 0
+
+    def test_apply_retention_per_table(self, app):
+        _add_positions([1, 20, 40])
+        for age in (1, 3):
+            db.session.add(FusionData(
+                camera_serial="B8A44F9EED3B", track_id="1",
+                event_timestamp=NOW - datetime.timedelta(days=age),
+            ))
+        db.session.commit()
+        tables = {
+            "fusion_data": PartitionedTable("fusion_data", "event_timestamp", 2),
+            "position_history": PartitionedTable("position_history", "timestamp", 30),
+        }
+        manager = PartitionManager(db.engine, tables=tables, clock=lambda: NOW)
+
+        assert manager.apply_retention() == {"fusion_data": 1, "position_history": 1}
+        assert manager.ensure() == {}  # no partitioning on SQLite
+        assert FusionData.query.count() == 1
+        assert PositionHistory.query.count() == 2
+
+    def test_retention_disabled_with_zero_days(self, app):
+        _add_positions([400])
+        tables = {"position_history": PartitionedTable("position_history", "timestamp", 0)}
+        worker = RetentionWorker(PartitionManager(db.engine, tables=tables, clock=lambda: NOW))
+
+        assert worker.run_once() == {"created": {}, "removed": {}}
+        assert PositionHistory.query.count() == 1
+
+    def test_clear_heatmap_route(self, app):
+        _add_positions([0, 3], now=datetime.datetime.utcnow())
+        client = app.test_client()
+
+        response = client.delete('/heatmap/clear?older_than=86400')
+        assert response.get_json()['deleted_count'] == 1
+
+        response = client.delete('/heatmap/clear')
+        assert response.get_json()['deleted_count'] == 1
+        assert PositionHistory.query.count() == 0
+
+
+class TestConversionStatements:
+    """DDL used to convert an existing table on PostgreSQL"""
+
+    def test_statements_keep_indexes_and_sequence(self, app):
+        manager = PartitionManager(db.engine)
+        cutoff = datetime.date(2025, 11, 21)
+
+        statements = manager.conversion_statements(
+            PARTITIONED_TABLES["position_history"], cutoff, "public.position_history_id_seq"
+        )
+
+        assert statements[1] == "ALTER TABLE position_history RENAME TO position_history_legacy_20251121"
+        assert 'PARTITION BY RANGE ("timestamp")' in statements[4]
+        assert 'ALTER TABLE position_history ADD PRIMARY KEY (id, "timestamp")' in statements
+        assert any(s.startswith("CREATE INDEX IF NOT EXISTS ix_position_history_track_id_part") for s in statements)
+        assert any("REFERENCES floorplans (id)" in s for s in statements)
+        assert "ALTER SEQUENCE public.position_history_id_seq OWNED BY position_history.id" in statements
+        assert statements[-2].endswith("FOR VALUES FROM (MINVALUE) TO ('2025-11-21 00:00:00+00')")
+
+    def test_null_timestamps_stay_in_legacy_partition(self, app):
+        statements = PartitionManager(db.engine).conversion_statements(
+            PARTITIONED_TABLES["position_history"], datetime.date(2025, 11, 21), None
+        )
+
+        assert statements[2] == (
+            "UPDATE position_history_legacy_20251121 SET \"timestamp\" = 'epoch' WHERE \"timestamp\" IS NULL"
+        )
+        assert not any("now()" in s for s in statements)
+
+
+class FakeResult:
+    def __init__(self, value=None, rowcount=0):
+        self.value, self.rowcount = value, rowcount
+
+    def scalar(self):
+        return self.value
+
+
+class FakeConnection:
+    """Records the SQL run on PostgreSQL; `answers` maps a SQL prefix to a FakeResult"""
+
+    def __init__(self, answers=None):
+        self.statements = []
+        self.answers = answers or {}
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        for prefix, result in self.answers.items():
+            if sql.startswith(prefix):
+                return result
+        return FakeResult()
+
+
+class TestDefaultPartition:
+    """Rows in <table>_default are moved into new partitions and expire by timestamp"""
+
+    @pytest.fixture
+    def manager(self, app, monkeypatch):
+        manager = PartitionManager(db.engine, interval="day", premake=0, clock=lambda: NOW)
+        monkeypatch.setattr(manager, "_relkind", lambda conn, table: "r" if table.endswith("_default") else "p")
+        monkeypatch.setattr(manager, "_partitions", lambda conn, table: {})
+        return manager
+
+    def test_move_statements(self, app):
+        statements = PartitionManager(db.engine).partition_statements(
+            PARTITIONED_TABLES["position_history"], datetime.date(2025, 11, 20), datetime.date(2025, 11, 21),
+            move_default=True,
+        )
+
+        in_range = "\"timestamp\" >= '2025-11-20 00:00:00+00' AND \"timestamp\" < '2025-11-21 00:00:00+00'"
+        assert statements == [
+            "ALTER TABLE position_history DETACH PARTITION position_history_default",
+            "CREATE TABLE IF NOT EXISTS position_history_20251120_20251121 PARTITION OF position_history "
+            "FOR VALUES FROM ('2025-11-20 00:00:00+00') TO ('2025-11-21 00:00:00+00')",
+            f"INSERT INTO position_history_20251120_20251121 SELECT * FROM position_history_default WHERE {in_range}",
+            f"DELETE FROM position_history_default WHERE {in_range}",
+            "ALTER TABLE position_history ATTACH PARTITION position_history_default DEFAULT",
+        ]
+
+    def test_premake_moves_rows_out_of_default(self, manager):
+        conn = FakeConnection({"SELECT EXISTS": FakeResult(True)})
+
+        created = manager._premake(conn, PARTITIONED_TABLES["position_history"], NOW.date())
+
+        assert created == ["position_history_20251120_20251121"]
+        assert conn.statements[1].startswith("ALTER TABLE position_history DETACH PARTITION")
+        assert conn.statements[-1].endswith("ATTACH PARTITION position_history_default DEFAULT")
+
+    def test_premake_without_default_rows_only_creates(self, manager):
+        conn = FakeConnection({"SELECT EXISTS": FakeResult(False)})
+
+        manager._premake(conn, PARTITIONED_TABLES["position_history"], NOW.date())
+
+        assert [s.split(" ")[0] for s in conn.statements] == ["SELECT", "CREATE"]
+
+    def test_retention_deletes_expired_default_rows(self, manager, monkeypatch):
+        conn = FakeConnection({"DELETE FROM position_history_default": FakeResult(rowcount=4)})
+
+        class Begin:
+            def __enter__(self):
+                return conn
+
+            def __exit__(self, *exc):
+                return False
+
+        monkeypatch.setattr(manager, "engine", type("Engine", (), {"begin": lambda self: Begin()})())
+        cutoff = NOW - datetime.timedelta(days=30)
+
+        assert manager._drop_partitions_before(PARTITIONED_TABLES["position_history"], cutoff) == 4
+        assert conn.statements == ['DELETE FROM position_history_default WHERE "timestamp" < :cutoff']
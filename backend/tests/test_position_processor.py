@@ -0,0 +1,54 @@
+"""
+Unit tests for PositionProcessor.
+
+A fusion frame is located on the floorplan and associated through
+TrackFusion.fuse_frame in one call.
+"""
+from infrastructure.position_processor import PositionProcessor
+from infrastructure.track_fusion import TrackFusion
+
+
+class FakeFloorplan:
+    """Uses latitude/longitude directly as x/y meters."""
+
+    @staticmethod
+    def calculate_position_on_floorplan(lat, lon, bottom_left):
+        return {'x_m': lat, 'y_m': lon}
+
+
+def event(serial, *observations):
+    return {
+        'topic': f'axis/{serial}/analytics/fusion',
+        'payload': {'frame': {'observations': [
+            {'track_id': track_id, 'geoposition': {'latitude': x, 'longitude': y}}
+            for track_id, x, y in observations
+        ]}},
+    }
+
+
+class TestProcessMqttEvent:
+    """One fuse_frame call per message, positions in observation order"""
+
+    def test_frame_is_fused_once(self, monkeypatch):
+        fusion = TrackFusion()
+        calls = []
+        original = fusion.fuse_frame
+        monkeypatch.setattr(fusion, 'fuse_frame', lambda camera_id, obs: calls.append(obs) or original(camera_id, obs))
+        processor = PositionProcessor(fusion, FakeFloorplan, [0, 0])
+
+        positions = processor.process_mqtt_event(event('CAM1', ('a', 1.0, 1.0), ('b', 1.2, 1.0), ('c', 8.0, 8.0)))
+
+        assert len(calls) == 1
+        assert [p['track_id'] for p in positions] == ['global_1', 'global_2', 'global_3']
+        assert positions[2] == {'track_id': 'global_3', 'x_m': 8.0, 'y_m': 8.0}
+
+    def test_observations_without_position_are_skipped(self):
+        processor = PositionProcessor(TrackFusion(), FakeFloorplan, [0, 0])
+        message = event('CAM1', ('a', 1.0, 1.0))
+        message['payload']['frame']['observations'].append({'track_id': 'b'})
+
+        assert len(processor.process_mqtt_event(message)) == 1
+
+    def test_non_axis_topic(self):
+        processor = PositionProcessor(TrackFusion(), FakeFloorplan, [0, 0])
+        assert processor.process_mqtt_event({'topic': 'other/x', 'payload': {'frame': {}}}) == []
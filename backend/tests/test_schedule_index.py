@@ -0,0 +1,213 @@
+"""
+Unit tests for the compiled zone schedules used to arm intrusion detection.
+
+Covers the ScheduleWindow time rules, cached evaluation until the next
+transition, invalidation through the schedule helpers, the single-query
+get_current_active_schedules and the intrusion path skipping disarmed zones.
+"""
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+from flask import Flask
+from domain.models import db, Floorplan, Camera
+from domain.models.zone import (
+    ScheduleWindow, ZoneSchedule, create_zone, create_schedule, update_schedule, delete_schedule,
+    get_current_active_schedules,
+)
+from infrastructure import intrusion_detection
+from infrastructure.camera_registry import camera_registry
+from infrastructure.zone_occupancy import zone_tracker
+from infrastructure.floorplan_handler import FloorplanManager
+from infrastructure.schedule_index import FloorplanSchedules, ScheduleIndex, schedule_index
+from infrastructure.zone_index import zone_index
+
+SQUARE = [{"x": 0, "y": 0}, {"x": 4, "y": 0}, {"x": 4, "y": 4}, {"x": 0, "y": 4}]
+MONDAY = datetime(2024, 1, 1)  # a Monday
+
+
+def recurring(days, start, end, spans=False, enabled=True, zone_id=1):
+    return ScheduleWindow(id=None, zone_id=zone_id, type="recurring", enabled=enabled,
+                          weekdays=frozenset(days), start_time=start, end_time=end, spans_next_day=spans)
+
+
+@pytest.fixture
+def app():
+    """Create Flask app with in-memory database for testing"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        schedule_index.invalidate()
+        zone_index.invalidate()
+        camera_registry.invalidate()
+        zone_tracker.clear()
+        yield app
+        schedule_index.invalidate()
+        zone_index.invalidate()
+        camera_registry.invalidate()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def zone(app):
+    fp = Floorplan(name='Office', width=20.0, depth=20.0,
+                   corner_geocoordinates={"bottom_left": [58.3959, 15.5779]})
+    db.session.add(fp)
+    db.session.commit()
+    return create_zone(SQUARE, floorplan_id=fp.id, name="Lobby")
+
+
+class TestScheduleWindow:
+    """Time rules, matching the old SQL filter"""
+
+    def test_same_day_window_is_inclusive(self):
+        window = recurring({0}, time(8), time(17))
+
+        assert window.is_active(MONDAY.replace(hour=8))
+        assert window.is_active(MONDAY.replace(hour=17))
+        assert not window.is_active(MONDAY.replace(hour=17, second=1))
+        assert not window.is_active(MONDAY.replace(hour=7, minute=59))
+        assert not window.is_active(MONDAY.replace(hour=12) + timedelta(days=1))  # Tuesday
+
+    def test_spans_next_day(self):
+        window = recurring({0}, time(22), time(6), spans=True)
+
+        assert window.is_active(MONDAY.replace(hour=23))
+        assert window.is_active(MONDAY.replace(hour=5))
+        assert not window.is_active(MONDAY.replace(hour=12))
+
+    def test_start_after_end_without_span_is_never_active(self):
+        assert recurring({0}, time(22), time(6)).intervals_on(MONDAY.date()) == []
+
+    def test_one_time_with_aware_datetimes(self):
+        start = datetime(2024, 1, 1, 10, tzinfo=timezone.utc)
+        row = ZoneSchedule(type="one-time", start_dt=start, end_dt=start + timedelta(hours=1), enabled=True)
+        window = row.window()
+        local_start = start.astimezone().replace(tzinfo=None)
+
+        assert window.is_active(local_start + timedelta(minutes=30))
+        assert not window.is_active(local_start + timedelta(hours=2))
+
+    def test_incomplete_rows_are_never_active(self):
+        row = ZoneSchedule(type="recurring", days=None, start_time=time(8), end_time=time(9), spans_next_day=False)
+        assert not row.window().is_active(MONDAY.replace(hour=8, minute=30))
+
+    def test_next_transition(self):
+        window = recurring({0, 2}, time(8), time(17))
+
+        assert window.next_transition(MONDAY.replace(hour=7)) == MONDAY.replace(hour=8)
+        assert window.next_transition(MONDAY.replace(hour=9)) == MONDAY.replace(hour=17, microsecond=1)
+        assert window.next_transition(MONDAY.replace(hour=18)) == MONDAY.replace(hour=8) + timedelta(days=2)
+        assert recurring(set(), time(8), time(17)).next_transition(MONDAY) is None
+
+
+class TestFloorplanSchedules:
+    """Cached armed state"""
+
+    def test_evaluated_once_until_next_transition(self):
+        schedules = FloorplanSchedules([recurring({0}, time(8), time(17))])
+
+        for minute in range(0, 60, 5):
+            assert schedules.is_armed(1, MONDAY.replace(hour=9, minute=minute))
+        assert schedules.evaluations == 1
+
+        assert not schedules.is_armed(1, MONDAY.replace(hour=18))
+        assert schedules.evaluations == 2
+
+    def test_arming_rules(self):
+        schedules = FloorplanSchedules([
+            recurring({0}, time(8), time(17), zone_id=1),
+            recurring({0}, time(8), time(17), zone_id=2, enabled=False),
+        ])
+        noon = MONDAY.replace(hour=12)
+
+        assert schedules.is_armed(1, noon)
+        assert schedules.is_armed(2, noon + timedelta(days=1))  # only a disabled schedule: unrestricted
+        assert schedules.is_armed(3, noon)  # no schedules: always armed
+        assert not schedules.is_armed(1, noon + timedelta(days=1))
+
+    def test_disabled_schedule_lifts_its_restriction(self):
+        evening = MONDAY.replace(hour=20)
+        restricted = FloorplanSchedules([recurring({0}, time(8), time(17))])
+        disabled = FloorplanSchedules([recurring({0}, time(8), time(17), enabled=False)])
+        mixed = FloorplanSchedules([
+            recurring({0}, time(8), time(17)),
+            recurring({0}, time(18), time(22), enabled=False),
+        ])
+
+        assert not restricted.is_armed(1, evening)
+        assert disabled.is_armed(1, evening)
+        assert disabled.scheduled_zone_ids == frozenset()
+        assert not mixed.is_armed(1, evening)  # the enabled schedule still restricts the zone
+
+
+class TestScheduleIndex:
+    """Loading and invalidation through the schedule helpers"""
+
+    def test_helpers_invalidate(self, zone):
+        floorplan_id = zone["floorplan_id"]
+        monday_noon = MONDAY.replace(hour=12)
+        assert schedule_index.is_armed(floorplan_id, zone["id"], monday_noon)
+
+        schedule = create_schedule(zone["id"], {"type": "recurring", "days": ["Mon"], "start": time(8),
+                                                "end": time(10), "spansNextDay": False})
+        assert not schedule_index.is_armed(floorplan_id, zone["id"], monday_noon)
+
+        update_schedule(schedule["id"], {"end": time(13)})
+        assert schedule_index.is_armed(floorplan_id, zone["id"], monday_noon)
+
+        update_schedule(schedule["id"], {"end": time(10)})
+        assert not schedule_index.is_armed(floorplan_id, zone["id"], monday_noon)
+
+        #disabling the only schedule lifts the restriction
+        update_schedule(schedule["id"], {"enabled": False})
+        assert schedule_index.is_armed(floorplan_id, zone["id"], monday_noon)
+
+        delete_schedule(schedule["id"])
+        assert schedule_index.is_armed(floorplan_id, zone["id"], monday_noon)
+
+    def test_loaded_once(self, zone):
+        calls = []
+        index = ScheduleIndex(loader=lambda fp: calls.append(fp) or [])
+        for _ in range(3):
+            index.is_armed(zone["floorplan_id"], zone["id"])
+
+        assert calls == [zone["floorplan_id"]]
+        assert index.stats()["hits"] == 2
+
+    def test_current_active_schedules(self, zone):
+        on = create_schedule(zone["id"], {"type": "recurring", "days": ["Mon"], "start": time(8),
+                                          "end": time(17), "spansNextDay": False})
+        off = create_schedule(zone["id"], {"type": "recurring", "days": ["Tue"], "start": time(8),
+                                           "end": time(17), "spansNextDay": False})
+
+        active, inactive = get_current_active_schedules(zone["floorplan_id"], now=MONDAY.replace(hour=12))
+
+        assert [s.id for s in active] == [on["id"]]
+        assert [s.id for s in inactive] == [off["id"]]
+
+
+class TestIntrusionUsesSchedules:
+    """Disarmed zones do not trigger"""
+
+    def test_disarmed_zone_is_skipped(self, monkeypatch, zone):
+        db.session.add(Camera(ip_address="192.168.0.97", serialno="B8A44F9EED3B", floorplan_id=zone["floorplan_id"]))
+        db.session.commit()
+        # a one-time schedule that ended yesterday
+        yesterday = datetime.now() - timedelta(days=1)
+        create_schedule(zone["id"], {"type": "one-time", "startDateTime": yesterday - timedelta(hours=1),
+                                     "endDateTime": yesterday})
+
+        triggered = []
+        monkeypatch.setattr(intrusion_detection, "trigger_zone_intrusion", lambda **kw: triggered.append(kw))
+        monkeypatch.setattr(FloorplanManager, "calculate_position_on_floorplan",
+                            staticmethod(lambda **kw: {"x_m": 1.0, "y_m": 2.0}))
+
+        payload = {"camera_serial": "B8A44F9EED3B", "track_id": 7, "latitude": 58.39, "longitude": 15.57}
+        assert intrusion_detection.process_fusion_for_intrusion(payload) is False
+        assert triggered == []
@@ -0,0 +1,327 @@
+"""
+Unit tests for the per-camera pre-roll segment buffer.
+
+ffmpeg is replaced by fake popen/run callables and segments are empty files
+named like the real segmenter's output, so no camera or ffmpeg is needed.
+"""
+import os
+import time
+
+import pytest
+from infrastructure import intrusion_detection
+from infrastructure import segment_buffer as segment_buffer_module
+from infrastructure.event_journal import EventJournal
+from infrastructure.segment_buffer import SegmentBuffer, SegmentRecorder
+
+
+class FakeProcess:
+    def __init__(self):
+        self.terminated = False
+
+    def poll(self):
+        return 0 if self.terminated else None
+
+    def terminate(self):
+        self.terminated = True
+
+    def wait(self, timeout=None):
+        return 0
+
+    def kill(self):
+        self.terminated = True
+
+
+class FakeRun:
+    """Records ffmpeg invocations; the concat list is read before the buffer deletes it."""
+
+    def __init__(self, returncode=0):
+        self.returncode = returncode
+        self.commands = []
+        self.concat_lists = []
+
+    def __call__(self, cmd, **kwargs):
+        self.commands.append(cmd)
+        if "concat" in cmd:
+            with open(cmd[cmd.index("-i") + 1]) as f:
+                self.concat_lists.append(f.read().splitlines())
+        return type("Result", (), {"returncode": self.returncode})()
+
+
+def started(buffer, camera_id, url):
+    """ensure() plus waiting for the supervisor thread to spawn ffmpeg."""
+    recorder = buffer.ensure(camera_id, url)
+    deadline = time.monotonic() + 2
+    while not recorder.running() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return recorder
+
+
+def camera(camera_id, url):
+    return type("CameraInfo", (), {"id": camera_id, "rtsp_url": url})()
+
+
+def write_segments(directory, starts):
+    os.makedirs(directory, exist_ok=True)
+    for start in starts:
+        open(os.path.join(directory, f"seg_{start}.ts"), "w").close()
+
+
+@pytest.fixture
+def scheduled():
+    return []
+
+
+@pytest.fixture
+def run():
+    return FakeRun()
+
+
+@pytest.fixture
+def buffer(tmp_path, scheduled, run):
+    processes = []
+    buffer = SegmentBuffer(
+        root=str(tmp_path), segment_seconds=2, retention_seconds=20, pre_roll=5, post_roll=10,
+        popen=lambda cmd, **kw: processes.append(cmd) or FakeProcess(),
+        run=run,
+        schedule=lambda delay, fn: scheduled.append((delay, fn)),
+        clock=lambda: 1000.0,
+        log_fn=lambda msg: None,
+    )
+    buffer.processes = processes
+    yield buffer
+    buffer.stop()
+
+
+class TestSegmentRecorder:
+    """Segment listing and pruning"""
+
+    def test_segments_are_sorted_and_foreign_files_ignored(self, tmp_path):
+        write_segments(str(tmp_path), [1004, 1000, 1002])
+        open(tmp_path / "notes.txt", "w").close()
+        recorder = SegmentRecorder(1, "rtsp://cam", str(tmp_path), popen=None)
+        assert [start for start, _ in recorder.segments()] == [1000, 1002, 1004]
+
+    def test_last_segment_is_not_complete(self, tmp_path):
+        write_segments(str(tmp_path), [1000, 1002, 1004])
+        recorder = SegmentRecorder(1, "rtsp://cam", str(tmp_path), popen=None)
+        assert [(s, e) for s, e, _ in recorder.complete_segments()] == [(1000, 1002), (1002, 1004)]
+
+    def test_prune_keeps_retention_window(self, tmp_path):
+        write_segments(str(tmp_path), [900, 902, 904, 990, 992])
+        recorder = SegmentRecorder(1, "rtsp://cam", str(tmp_path), retention_seconds=20, popen=None)
+        assert recorder.prune(now=1000.0) == 2
+        assert [start for start, _ in recorder.segments()] == [904, 990, 992]
+
+    def test_command_stream_copies_into_segments(self, tmp_path):
+        recorder = SegmentRecorder(1, "rtsp://cam", str(tmp_path), popen=None)
+        cmd = recorder.command()
+        assert cmd[cmd.index("-i") + 1] == "rtsp://cam"
+        assert cmd[cmd.index("-c") + 1] == "copy"
+        assert cmd[cmd.index("-f") + 1] == "segment"
+
+
+class TestSegmentBuffer:
+    """One recorder per camera; clips and snapshots cut from its segments"""
+
+    def test_ensure_reuses_recorder(self, buffer):
+        first = buffer.ensure(1, "rtsp://cam1")
+        assert buffer.ensure(1, "rtsp://cam1") is first
+        assert buffer.ensure(1, "rtsp://cam1-new") is not first
+
+    def test_unknown_camera_falls_back(self, buffer, tmp_path):
+        assert buffer.save_clip(9, str(tmp_path / "clip.mp4")) is False
+        assert buffer.save_snapshot(9, str(tmp_path / "snap.jpg")) is False
+
+    def test_clip_waits_for_post_roll(self, buffer, scheduled, tmp_path):
+        recorder = started(buffer, 1, "rtsp://cam1")
+        write_segments(recorder.directory, [996, 998, 1000])
+        assert buffer.save_clip(1, str(tmp_path / "clip.mp4"), event_time=1000.0) is True
+        delay, _ = scheduled[0]
+        assert delay == 10 + 2
+
+    def test_clip_concatenates_pre_and_post_roll(self, buffer, scheduled, run, tmp_path):
+        recorder = started(buffer, 1, "rtsp://cam1")
+        write_segments(recorder.directory, range(980, 1020, 2))
+        output = str(tmp_path / "out" / "clip.mp4")
+        buffer.save_clip(1, output, event_time=1000.0)
+        scheduled[0][1]()
+
+        listed = [line.split("seg_")[1].split(".")[0] for line in run.concat_lists[0]]
+        # segments overlapping [995, 1010)
+        assert listed == [str(t) for t in range(994, 1010, 2)]
+        assert run.commands[0][-1] == output
+        assert "-c" in run.commands[0] and "copy" in run.commands[0]
+        assert not os.path.exists(output + ".segments.txt")
+        assert buffer.stats()["clips"] == 1
+
+    def test_clip_refused_without_fresh_segments(self, buffer, scheduled, tmp_path):
+        recorder = started(buffer, 1, "rtsp://cam1")
+        assert buffer.save_clip(1, str(tmp_path / "clip.mp4"), event_time=1000.0) is False
+
+        write_segments(recorder.directory, [900, 902, 904])  #stream stalled long ago
+        assert buffer.save_clip(1, str(tmp_path / "clip.mp4"), event_time=1000.0) is False
+        assert scheduled == []
+
+    def test_clip_refused_when_ffmpeg_is_down(self, buffer, scheduled, tmp_path):
+        recorder = started(buffer, 1, "rtsp://cam1")
+        write_segments(recorder.directory, [996, 998, 1000])
+        recorder._stop.set()  #keep the supervisor from restarting it
+        recorder._process.terminate()
+
+        assert buffer.save_clip(1, str(tmp_path / "clip.mp4"), event_time=1000.0) is False
+
+    def test_failed_assembly_calls_fallback(self, buffer, scheduled, run, tmp_path):
+        recorder = started(buffer, 1, "rtsp://cam1")
+        write_segments(recorder.directory, [996, 998, 1000])
+        failures = []
+        assert buffer.save_clip(1, str(tmp_path / "clip.mp4"), event_time=1000.0,
+                                on_failure=lambda: failures.append(1)) is True
+
+        for name in os.listdir(recorder.directory):  #segments gone before the post-roll was cut
+            os.remove(os.path.join(recorder.directory, name))
+        scheduled[0][1]()
+        assert run.commands == []
+        assert failures == [1]
+        assert buffer.stats()["clip_failures"] == 1
+
+    def test_sync_follows_cameras(self, buffer):
+        assert buffer.sync([camera(1, "rtsp://cam1"), camera(2, "rtsp://cam2"), camera(3, None)]) == (2, 0)
+        first = buffer.recorder(1)
+
+        assert buffer.sync([camera(2, "rtsp://cam2-new"), camera(4, "rtsp://cam4")]) == (2, 1)
+        assert first._stop.is_set()
+        assert buffer.recorder(1) is None
+        assert buffer.recorder(2).rtsp_url == "rtsp://cam2-new"
+        assert buffer.recorder(4) is not None
+
+    def test_camera_changes_resync(self, monkeypatch, buffer):
+        monkeypatch.setattr(segment_buffer_module, "segment_buffer", buffer)
+        monkeypatch.setattr(segment_buffer_module.camera_registry, "cameras", lambda: [camera(5, "rtsp://cam5")])
+
+        segment_buffer_module._resync_segment_buffers()
+        deadline = time.monotonic() + 2
+        while buffer.recorder(5) is None and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert buffer.recorder(5) is not None
+
+    def test_snapshot_uses_newest_complete_segment(self, buffer, run, tmp_path):
+        recorder = started(buffer, 1, "rtsp://cam1")
+        write_segments(recorder.directory, [996, 998, 1000])
+        assert buffer.save_snapshot(1, str(tmp_path / "snap.jpg")) is True
+        cmd = run.commands[0]
+        assert cmd[cmd.index("-i") + 1].endswith("seg_998.ts")
+
+    def test_snapshot_refused_when_ffmpeg_is_down(self, buffer, run, tmp_path):
+        recorder = started(buffer, 1, "rtsp://cam1")
+        write_segments(recorder.directory, [996, 998, 1000])
+        recorder._stop.set()
+        recorder._process.terminate()
+
+        assert buffer.save_snapshot(1, str(tmp_path / "snap.jpg")) is False
+        assert run.commands == []
+
+    def test_snapshot_refused_without_fresh_segments(self, buffer, run, tmp_path):
+        recorder = started(buffer, 1, "rtsp://cam1")
+        write_segments(recorder.directory, [900, 902, 904])
+        assert buffer.save_snapshot(1, str(tmp_path / "snap.jpg")) is False
+
+    def test_stats(self, buffer):
+        buffer.ensure(1, "rtsp://cam1")
+        stats = buffer.stats()
+        assert set(stats["cameras"]) == {"1"}
+        assert stats["pre_roll_seconds"] == 5
+
+
+class TestIntrusionClips:
+    """intrusion_detection uses the buffer before opening an RTSP session"""
+
+    def test_clip_and_snapshot_from_buffer(self, monkeypatch, buffer, tmp_path):
+        monkeypatch.setattr(intrusion_detection, "EVENT_DIR", str(tmp_path))
+        monkeypatch.setattr(intrusion_detection, "segment_buffer", buffer)
+        monkeypatch.setattr(intrusion_detection.subprocess, "Popen",
+                            lambda *a, **kw: pytest.fail("direct RTSP capture"))
+        monkeypatch.setattr(intrusion_detection.camera_registry, "by_id", lambda camera_id: object())
+        # no live frame, and no VAPIX/ffmpeg grab either
+        monkeypatch.setattr(intrusion_detection.snapshot_service, "capture_camera",
+                            lambda camera_id, use_live=True, fallback=True: None if not fallback else pytest.fail("grab"))
+        recorder = started(buffer, 4, "rtsp://cam4")
+        write_segments(recorder.directory, [996, 998, 1000])
+
+        assert intrusion_detection.record_event_clip(4, "20250101120000", 1000.0).endswith("clip_4_20250101120000.mp4")
+        assert intrusion_detection.capture_snapshot(4, "20250101120000").endswith("snap_4_20250101120000.jpg")
+
+    def test_dead_recorder_snapshot_asks_the_camera(self, monkeypatch, buffer, tmp_path):
+        requests = []
+
+        class Snapshot:
+            source, age_seconds = "vapix", 0.0
+
+            def save(self, path):
+                open(path, "wb").close()
+
+        def capture_camera(camera_id, use_live=True, fallback=True):
+            requests.append((use_live, fallback))
+            return Snapshot() if not use_live else None
+
+        monkeypatch.setattr(intrusion_detection, "EVENT_DIR", str(tmp_path))
+        monkeypatch.setattr(intrusion_detection, "segment_buffer", buffer)
+        monkeypatch.setattr(intrusion_detection.camera_registry, "by_id", lambda camera_id: object())
+        monkeypatch.setattr(intrusion_detection.snapshot_service, "capture_camera", capture_camera)
+        recorder = started(buffer, 4, "rtsp://cam4")
+        write_segments(recorder.directory, [996, 998, 1000])
+        recorder._stop.set()
+        recorder._process.terminate()
+
+        assert intrusion_detection.capture_snapshot(4, "20250101120000").endswith("snap_4_20250101120000.jpg")
+        assert requests == [(True, False), (False, True)]
+
+    def test_failed_assembly_records_directly(self, monkeypatch, buffer, scheduled, tmp_path):
+        spawned = []
+        monkeypatch.setattr(intrusion_detection, "EVENT_DIR", str(tmp_path))
+        monkeypatch.setattr(intrusion_detection, "segment_buffer", buffer)
+        monkeypatch.setattr(intrusion_detection.subprocess, "Popen", lambda cmd, **kw: spawned.append(cmd))
+        monkeypatch.setattr(intrusion_detection.camera_registry, "rtsp_url", lambda camera_id: "rtsp://cam4")
+        recorder = started(buffer, 4, "rtsp://cam4")
+        write_segments(recorder.directory, [996, 998, 1000])
+
+        clip = intrusion_detection.record_event_clip(4, "20250101120000", 1000.0)
+        assert spawned == []
+        for name in os.listdir(recorder.directory):
+            os.remove(os.path.join(recorder.directory, name))
+        scheduled[0][1]()
+
+        assert len(spawned) == 1
+        assert spawned[0][spawned[0].index("-i") + 1] == "rtsp://cam4"
+        assert spawned[0][-2] == clip
+
+    def test_dead_recorder_records_directly(self, monkeypatch, buffer, tmp_path):
+        spawned = []
+        monkeypatch.setattr(intrusion_detection, "EVENT_DIR", str(tmp_path))
+        monkeypatch.setattr(intrusion_detection, "segment_buffer", buffer)
+        monkeypatch.setattr(intrusion_detection.subprocess, "Popen", lambda cmd, **kw: spawned.append(cmd))
+        monkeypatch.setattr(intrusion_detection.camera_registry, "rtsp_url", lambda camera_id: "rtsp://cam4")
+        started(buffer, 4, "rtsp://cam4")  #running, but no segments written yet
+
+        assert intrusion_detection.record_event_clip(4, "20250101120000", 1000.0)
+        assert len(spawned) == 1
+
+    def test_trigger_spawns_one_clip_and_one_snapshot(self, monkeypatch, tmp_path):
+        calls = []
+        journal = EventJournal(str(tmp_path / "journal"))
+        monkeypatch.setattr(intrusion_detection, "EVENT_DIR", str(tmp_path))
+        monkeypatch.setattr(intrusion_detection, "event_journal", journal)
+        monkeypatch.setattr(intrusion_detection, "last_trigger_time", {})
+        monkeypatch.setattr(intrusion_detection, "capture_snapshot", lambda *a: calls.append("snap"))
+        monkeypatch.setattr(intrusion_detection, "record_event_clip", lambda *a: calls.append("clip"))
+        monkeypatch.setattr(intrusion_detection.alarm_control, "start_loop", lambda: None)
+        monkeypatch.setattr(intrusion_detection.event_sink, "submit", lambda event: True)
+        monkeypatch.setattr(intrusion_detection, "_camera_for_topic",
+                            lambda topic: type("Cam", (), {"id": 3, "serial": "ACCC"})())
+
+        assert intrusion_detection.trigger_intrusion("zone_intrusion/3/1", {}) is True
+        for _ in range(100):
+            if len(calls) >= 2:
+                break
+            time.sleep(0.01)
+        assert sorted(calls) == ["clip", "snap"]
+        assert journal.stats()["written"] == 1  # one journaled event
@@ -0,0 +1,133 @@
+"""
+Unit tests for the snapshot service.
+
+The live camera, VAPIX and ffmpeg are fakes, so the tests check which source
+is used and the reported frame age without any camera.
+"""
+import pytest
+from infrastructure import intrusion_detection
+from infrastructure.snapshot_service import FFMPEG, LIVE, VAPIX, SnapshotService
+
+
+class FakeCamera:
+    def __init__(self, data, encoded_at):
+        self.data = data
+        self.encoded_at = encoded_at
+
+    def latest_jpeg(self):
+        return self.data, self.encoded_at
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.content = content
+
+
+class FakeResult:
+    def __init__(self, returncode, stdout=b""):
+        self.returncode = returncode
+        self.stdout = stdout
+
+
+def make_service(camera=None, vapix=FakeResponse(200, b"vapix-jpeg"), ffmpeg=FakeResult(0, b"ffmpeg-jpeg"),
+                 calls=None):
+    calls = [] if calls is None else calls
+
+    def http_get(url, **kwargs):
+        calls.append(("vapix", url))
+        if isinstance(vapix, Exception):
+            raise vapix
+        return vapix
+
+    def run(cmd, **kwargs):
+        calls.append(("ffmpeg", cmd))
+        return ffmpeg
+
+    return SnapshotService(
+        frame_source=lambda ip: camera,
+        http_get=http_get,
+        run=run,
+        max_age_seconds=2.0,
+        clock=lambda: 100.0,
+        log_fn=lambda msg: None,
+    )
+
+
+class TestSources:
+    """Live frame first, VAPIX and ffmpeg only when there is no fresh frame"""
+
+    def test_fresh_live_frame_is_used(self):
+        calls = []
+        service = make_service(camera=FakeCamera(b"live-jpeg", 99.5), calls=calls)
+        snapshot = service.capture("10.0.0.1")
+        assert snapshot.source == LIVE
+        assert snapshot.data == b"live-jpeg"
+        assert snapshot.age_seconds == pytest.approx(0.5)
+        assert calls == []
+
+    def test_stale_frame_falls_back_to_vapix(self):
+        calls = []
+        service = make_service(camera=FakeCamera(b"old", 90.0), calls=calls)
+        snapshot = service.capture("10.0.0.1")
+        assert snapshot.source == VAPIX
+        assert snapshot.data == b"vapix-jpeg"
+        assert calls == [("vapix", "http://10.0.0.1/axis-cgi/jpg/image.cgi")]
+        assert service.stats()["stale_live_frames"] == 1
+
+    def test_no_capture_thread_falls_back_to_vapix(self):
+        service = make_service(camera=None)
+        assert service.capture("10.0.0.1").source == VAPIX
+
+    def test_vapix_error_falls_back_to_ffmpeg(self):
+        service = make_service(vapix=FakeResponse(401))
+        snapshot = service.capture("10.0.0.1", "rtsp://cam")
+        assert snapshot.source == FFMPEG
+        assert snapshot.data == b"ffmpeg-jpeg"
+
+    def test_vapix_exception_falls_back_to_ffmpeg(self):
+        calls = []
+        service = make_service(vapix=ConnectionError("down"), calls=calls)
+        assert service.capture("10.0.0.1", "rtsp://cam").source == FFMPEG
+        assert "rtsp://cam" in calls[-1][1]
+
+    def test_all_sources_fail(self):
+        service = make_service(vapix=FakeResponse(500), ffmpeg=FakeResult(1))
+        assert service.capture("10.0.0.1") is None
+        assert service.stats()["failures"] == 1
+
+    def test_live_only_does_not_contact_camera(self):
+        calls = []
+        service = make_service(camera=None, calls=calls)
+        assert service.capture("10.0.0.1", fallback=False) is None
+        assert calls == []
+        assert service.stats()["failures"] == 0
+
+    def test_stats_report_source_and_age(self):
+        service = make_service(camera=FakeCamera(b"live-jpeg", 99.0))
+        service.capture("10.0.0.1")
+        stats = service.stats()
+        assert stats["live"] == 1
+        assert stats["last"] == {"ip": "10.0.0.1", "source": LIVE, "age_seconds": 1.0, "file_size": 9}
+
+    def test_save(self, tmp_path):
+        service = make_service(camera=FakeCamera(b"live-jpeg", 100.0))
+        path = service.capture("10.0.0.1").save(str(tmp_path / "a" / "snap.jpg"))
+        assert open(path, "rb").read() == b"live-jpeg"
+
+
+class TestIntrusionSnapshot:
+    """capture_snapshot writes the live frame without spawning ffmpeg"""
+
+    def test_live_frame_is_written(self, monkeypatch, tmp_path):
+        service = make_service(camera=FakeCamera(b"live-jpeg", 100.0))
+        monkeypatch.setattr(intrusion_detection, "EVENT_DIR", str(tmp_path))
+        monkeypatch.setattr(intrusion_detection, "snapshot_service", service)
+        monkeypatch.setattr(service, "capture_camera",
+                            lambda camera_id, use_live=True, fallback=True: service.capture(
+                                "10.0.0.1", use_live=use_live, fallback=fallback))
+        monkeypatch.setattr(intrusion_detection.camera_registry, "by_id", lambda camera_id: object())
+        monkeypatch.setattr(intrusion_detection.subprocess, "Popen", lambda *a, **kw: pytest.fail("ffmpeg spawned"))
+
+        path = intrusion_detection.capture_snapshot(2, "20250101120000")
+        assert open(path, "rb").read() == b"live-jpeg"
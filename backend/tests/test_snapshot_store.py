@@ -0,0 +1,141 @@
+"""
+Unit tests for the content-addressed snapshot store, the fusion ingest path
+that writes to it and the base64 backfill job.
+
+Uses an in-memory SQLite database and a temporary store directory.
+"""
+import base64
+import hashlib
+import pytest
+from flask import Flask
+from domain.models import db, FusionData
+from infrastructure import fusion_persistence
+from infrastructure.fusion_persistence import store_fusion_message
+from infrastructure.snapshot_backfill import backfill_fusion_snapshots
+from infrastructure.snapshot_store import SnapshotStore, decode_base64_image
+
+TOPIC = "axis/B8A44F9EED3B/analytics/fusion"
+IMAGE = b"\xff\xd8\xff\xe0fake-jpeg-bytes"
+IMAGE_B64 = base64.b64encode(IMAGE).decode()
+DIGEST = hashlib.sha256(IMAGE).hexdigest()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    monkeypatch.setattr(fusion_persistence, "snapshot_store", store)
+    return store
+
+
+@pytest.fixture
+def app():
+    """Create Flask app with in-memory database for testing"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+    fusion_persistence._track_motion_cache.clear()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def _payload(track_id, snapshot):
+    return {
+        "tracks": [
+            {
+                "track_id": track_id,
+                "class": {"type": "Human", "score": 0.9},
+                "bounding_box": {"top": 0.1, "bottom": 0.5, "left": 0.2, "right": 0.4},
+                "speed": 1.0,
+                "image": {"data": snapshot, "format": "jpeg"},
+            }
+        ]
+    }
+
+
+class TestSnapshotStore:
+    """Content addressing, deduplication and digest validation"""
+
+    def test_put_and_read(self, store):
+        digest, size = store.put_bytes(IMAGE)
+
+        assert digest == DIGEST
+        assert size == len(IMAGE)
+        assert store.exists(digest)
+        assert store.read(digest) == IMAGE
+        assert store.path_for(digest).endswith(f"{DIGEST[:2]}/{DIGEST}")
+
+    def test_identical_images_are_stored_once(self, store, tmp_path):
+        store.put_base64(IMAGE_B64)
+        store.put_base64("data:image/jpeg;base64," + IMAGE_B64)
+
+        files = [p for p in (tmp_path / "snapshots").rglob("*") if p.is_file()]
+        assert len(files) == 1
+
+    @pytest.mark.parametrize("digest", ["", "abc", "../" + "0" * 61, DIGEST.upper()])
+    def test_invalid_digest_is_rejected(self, store, digest):
+        assert not store.exists(digest)
+        assert store.read(digest) is None
+        with pytest.raises(ValueError):
+            store.path_for(digest)
+
+    def test_invalid_base64_raises(self):
+        with pytest.raises(ValueError):
+            decode_base64_image("abc")
+
+
+class TestFusionIngest:
+    """store_fusion_message keeps only the hash and size in the row"""
+
+    def test_snapshot_moves_to_store(self, app, store):
+        store_fusion_message(TOPIC, _payload(1, IMAGE_B64), flask_app=app)
+
+        with app.app_context():
+            row = FusionData.query.one()
+            assert row.snapshot_hash == DIGEST
+            assert row.snapshot_size == len(IMAGE)
+            assert row.snapshot_base64 is None
+            assert row.raw_payload["image"] == {"format": "jpeg", "hash": DIGEST, "size": len(IMAGE)}
+            assert row.serialize()["snapshot_url"] == f"/api/fusion/snapshots/{DIGEST}"
+        assert store.read(DIGEST) == IMAGE
+
+    def test_undecodable_snapshot_stays_inline(self, app, store):
+        store_fusion_message(TOPIC, _payload(1, "abc"), flask_app=app)
+
+        with app.app_context():
+            row = FusionData.query.one()
+            assert row.snapshot_hash is None
+            assert row.snapshot_base64 == "abc"
+
+
+class TestBackfill:
+    """Batched migration of legacy base64 rows"""
+
+    def test_backfill_migrates_in_batches(self, app, store):
+        with app.app_context():
+            for i in range(5):
+                db.session.add(FusionData(
+                    camera_serial="B8A44F9EED3B",
+                    track_id=str(i),
+                    snapshot_base64=IMAGE_B64,
+                    raw_payload={"track_id": i, "image": {"data": IMAGE_B64}},
+                ))
+            db.session.add(FusionData(camera_serial="B8A44F9EED3B", track_id="bad", snapshot_base64="abc"))
+            db.session.commit()
+
+            summary = backfill_fusion_snapshots(batch_size=2, store=store)
+
+            assert summary == {"batches": 3, "migrated": 5, "failed": 1, "bytes": 5 * len(IMAGE)}
+            assert FusionData.query.filter(FusionData.snapshot_hash == DIGEST).count() == 5
+            assert FusionData.query.filter(FusionData.snapshot_base64.isnot(None)).count() == 1
+            row = FusionData.query.filter_by(track_id="0").one()
+            assert row.raw_payload["image"] == {"hash": DIGEST, "size": len(IMAGE)}
+
+            #running again is a no-op for migrated rows
+            assert backfill_fusion_snapshots(batch_size=2, store=store)["migrated"] == 0
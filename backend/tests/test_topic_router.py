@@ -0,0 +1,97 @@
+#backend/tests/test_topic_router.py
+#Unit tests for MQTT topic filter matching and handler dispatch
+import pytest
+from infrastructure.topic_router import TopicRouter, compile_topic_filter
+
+
+#---------------- Topic Filter Tests ----------------
+
+@pytest.mark.parametrize("topic_filter, topic, expected", [
+    ("axis/+/analytics/fusion/#", "axis/B8A44F9EED3B/analytics/fusion", True),
+    ("axis/+/analytics/fusion/#", "axis/B8A44F9EED3B/analytics/fusion/tracks/1", True),
+    ("axis/+/analytics/fusion/#", "axis/B8A44F9EED3B/analytics/scene", False),
+    ("axis/+/scene/metadata", "axis/B8A44F9EED3B/scene/metadata", True),
+    ("axis/+/scene/metadata", "axis/a/b/scene/metadata", False),
+    ("com.axis.analytics_scene_description.v0.beta", "com.axis.analytics_scene_description.v0.beta", True),
+    ("com.axis.analytics_scene_description.v0.beta", "comXaxis.analytics_scene_description.v0.beta", False),
+    ("#", "anything/at/all", True),
+])
+def test_compile_topic_filter(topic_filter, topic, expected):
+    assert bool(compile_topic_filter(topic_filter).match(topic)) is expected
+
+@pytest.mark.parametrize("topic_filter", ["axis/#/fusion", "axis/cam+/fusion", "axis/#x"])
+def test_invalid_topic_filters(topic_filter):
+    with pytest.raises(ValueError):
+        compile_topic_filter(topic_filter)
+
+
+#---------------- Dispatch Tests ----------------
+
+@pytest.fixture
+def calls():
+    return []
+
+@pytest.fixture
+def router(calls):
+    def fusion(topic, payload):
+        calls.append(("fusion", topic))
+
+    def intrusion(topic, payload):
+        calls.append(("intrusion", topic))
+
+    def scene(topic, payload):
+        calls.append(("scene", topic))
+
+    r = TopicRouter()
+    r.register("axis/+/analytics/fusion/#", fusion, intrusion)
+    r.register("axis/+/scene/metadata", scene)
+    r.compile()
+    return r
+
+#Only handlers registered for the matching filter run
+def test_dispatch_runs_only_matching_handlers(router, calls):
+    assert router.dispatch("axis/CAM1/analytics/fusion", {}) == 2
+    assert calls == [("fusion", "axis/CAM1/analytics/fusion"), ("intrusion", "axis/CAM1/analytics/fusion")]
+
+    calls.clear()
+    assert router.dispatch("axis/CAM1/scene/metadata", {}) == 1
+    assert calls == [("scene", "axis/CAM1/scene/metadata")]
+
+#Topics without handlers are ignored
+def test_dispatch_unknown_topic(router, calls):
+    assert router.dispatch("axis/CAM1/event/other", {}) == 0
+    assert calls == []
+
+#The resolved handler tuple is memoized per topic
+def test_handlers_for_is_cached(router):
+    first = router.handlers_for("axis/CAM1/analytics/fusion")
+    assert router.handlers_for("axis/CAM1/analytics/fusion") is first
+
+#A failing handler does not stop the others
+def test_failing_handler_does_not_block_others(calls):
+    def broken(topic, payload):
+        raise RuntimeError("boom")
+
+    def ok(topic, payload):
+        calls.append("ok")
+
+    logged = []
+    r = TopicRouter(log_fn=logged.append)
+    r.register("a/#", broken, ok)
+    r.dispatch("a/b", {})
+
+    assert calls == ["ok"]
+    assert len(logged) == 1
+
+#Overlapping filters run a shared handler only once
+def test_overlapping_filters(calls):
+    def handler(topic, payload):
+        calls.append(topic)
+
+    r = TopicRouter()
+    r.register("axis/#", handler)
+    r.register("axis/+/scene/metadata", handler)
+    r.dispatch("axis/CAM1/scene/metadata", {})
+
+    assert calls == ["axis/CAM1/scene/metadata"]
+    assert r.filters() == ["axis/#", "axis/+/scene/metadata"]
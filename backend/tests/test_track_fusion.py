@@ -214,6 +214,65 @@ def test_cleanup_removes_camera_mappings(fusion_short_timeout):
     assert new_id1 != id1  #Different from original cleaned-up track
 
 
+#Test that cleanup runs at most once per cleanup interval, not per observation
+def test_cleanup_throttled_to_interval():
+    now = [0.0]
+    fusion = TrackFusion(track_timeout=1.0, cleanup_interval=0.5, clock=lambda: now[0])
+    old_id = fusion.fuse_track("camera1", 1, 0.0, 0.0)
+
+    now[0] = 1.2  #Stale, and the first cleanup tick is due (next one at 1.7)
+    fusion.fuse_track("camera1", 2, 5.0, 5.0)
+    assert fusion.get_track_position(old_id) is None
+
+    now[0] = 1.3
+    later_id = fusion.fuse_track("camera1", 3, 9.0, 9.0)
+
+    now[0] = 2.25  #Tick due (next one at 2.75): track 2 is stale, track 3 not yet
+    fusion.fuse_track("camera1", 4, 20.0, 20.0)
+    assert fusion.get_track_count() == 2
+
+    now[0] = 2.35  #Track 3 is stale now, but it stays until the next tick
+    fusion.fuse_track("camera1", 4, 20.0, 20.0)
+    assert fusion.get_track_position(later_id) is not None
+
+    now[0] = 2.75
+    fusion.fuse_track("camera1", 4, 20.0, 20.0)
+    assert fusion.get_track_position(later_id) is None
+
+#Test that a track seen again is rescheduled instead of removed
+def test_updated_track_survives_its_old_heap_entry():
+    now = [0.0]
+    fusion = TrackFusion(track_timeout=1.0, cleanup_interval=0.0, clock=lambda: now[0])
+    global_id = fusion.fuse_track("camera1", 1, 0.0, 0.0)
+    now[0] = 0.9
+    fusion.fuse_track("camera1", 1, 0.1, 0.0)
+    now[0] = 1.5  #First entry (t=0) expired, track last seen at 0.9
+    fusion.fuse_track("camera2", 9, 9.0, 9.0)
+    assert fusion.get_track_position(global_id) is not None
+    now[0] = 2.0
+    fusion.fuse_track("camera2", 9, 9.0, 9.0)
+    assert fusion.get_track_position(global_id) is None
+
+#Test that expiry removes the camera track keys through the reverse index
+def test_reverse_index_cleanup():
+    now = [0.0]
+    fusion = TrackFusion(track_timeout=1.0, cleanup_interval=0.0, clock=lambda: now[0])
+    gid = fusion.fuse_track("camera1", 1, 0.0, 0.0)
+    fusion.fuse_track("camera2", 2, 0.1, 0.0)
+    keep = fusion.fuse_track("camera3", 3, 9.0, 9.0)
+    assert fusion._global_to_cameras[fusion._slot(gid)] == {("camera1", 1), ("camera2", 2)}
+
+    now[0] = 0.8
+    fusion.fuse_track("camera3", 3, 9.0, 9.0)
+    now[0] = 1.5
+    fusion.fuse_track("camera3", 3, 9.0, 9.0)
+
+    assert fusion._slot(gid) is None
+    assert len(fusion._global_to_cameras) == 1
+    assert set(fusion._camera_to_global) == {("camera3", 3)}
+    assert fusion._camera_to_global[("camera3", 3)] == fusion._slot(keep)
+
+
 #---------------- Distance Calculation Tests ----------------
 
 #Test distance calculation for axis-aligned points
@@ -236,12 +295,51 @@ def test_distance_calculation_diagonal(fusion):
     assert id1 != id2
     assert fusion.get_track_count() == 2
 
-    #Test just under threshold
+    #Test just under threshold of id1 (0.456m) but much closer to id2 (0.045m)
     id3 = fusion.fuse_track("camera3", 3, 0.28, 0.36)
-    #Should fuse with id1
-    assert id3 == id1
+    #Should fuse with the nearest track, id2
+    assert id3 == id2
     assert fusion.get_track_count() == 2
 
+    #Just under threshold of id1 only
+    id4 = fusion.fuse_track("camera4", 4, -0.28, -0.36)
+    assert id4 == id1
+
+
+#---------------- Spatial Hash Tests ----------------
+
+#Test that the nearest track wins, not the first one created
+def test_nearest_track_is_matched(fusion):
+    far = fusion.fuse_track("camera1", 1, 0.0, 0.0)
+    near = fusion.fuse_track("camera1", 2, 0.8, 0.0)
+
+    #0.45m from the first track, 0.35m from the second
+    assert fusion.fuse_track("camera2", 3, 0.45, 0.0) == near
+    assert far != near
+
+#Test matching across a grid cell border and with negative coordinates
+def test_match_across_cell_border(fusion):
+    id1 = fusion.fuse_track("camera1", 1, -0.01, -0.01)
+    id2 = fusion.fuse_track("camera2", 2, 0.01, 0.01)
+    assert id1 == id2
+
+#Test that a track is found at its new cell after it moved
+def test_grid_follows_moving_track(fusion):
+    global_id = fusion.fuse_track("camera1", 1, 0.0, 0.0)
+    fusion.fuse_track("camera1", 1, 10.0, 10.0)
+
+    assert fusion.fuse_track("camera2", 2, 10.1, 10.1) == global_id
+    assert fusion.fuse_track("camera3", 3, 0.1, 0.1) != global_id
+
+#Test that expired tracks leave the grid
+def test_grid_cleared_on_expiry(fusion_short_timeout):
+    fusion = fusion_short_timeout
+    fusion.fuse_track("camera1", 1, 0.0, 0.0)
+    time.sleep(0.15)
+    fusion.fuse_track("camera2", 2, 5.0, 5.0)
+
+    assert sum(len(ids) for ids in fusion._grid.values()) == 1
+
 
 #---------------- Position Averaging Tests ----------------
 
@@ -427,4 +525,101 @@ def test_many_cameras_same_person(fusion):
 
     #All should be fused to same global track
     assert len(set(global_ids)) == 1
-    assert fusion.get_track_count() == 1
\ No newline at end of file
+    assert fusion.get_track_count() == 1
+
+#---------------- Frame Association Tests ----------------
+
+#Test that a frame returns one global ID per observation, in order
+def test_fuse_frame_creates_tracks_in_order(fusion):
+    ids = fusion.fuse_frame("camera1", [(1, 0.0, 0.0), (2, 5.0, 5.0), (3, 9.0, 9.0)])
+
+    assert ids == ["global_1", "global_2", "global_3"]
+    assert fusion.get_track_count() == 3
+
+#Test that two people close together in one frame stay two tracks
+def test_fuse_frame_is_one_to_one_within_a_frame(fusion):
+    ids = fusion.fuse_frame("camera1", [(5, 5.0, 3.0), (7, 5.3, 3.2)])
+
+    assert ids[0] != ids[1]
+    assert fusion.get_track_count() == 2
+
+#Test that matching does not depend on arrival order: closest pairs win
+def test_fuse_frame_matches_closest_pairs(fusion):
+    a, b = fusion.fuse_frame("camera1", [(1, 0.0, 0.0), (2, 0.6, 0.0)])
+
+    #Camera 2 sees both people; its first observation is within 0.5m of both tracks
+    #but much closer to b, its second observation is only near a
+    ids = fusion.fuse_frame("camera2", [(10, 0.45, 0.0), (11, 0.1, 0.0)])
+    assert ids == [b, a]
+    assert fusion.get_track_count() == 2
+
+#Test that known camera tracks keep their global track and are not matched again
+def test_fuse_frame_updates_known_camera_tracks(fusion):
+    a, b = fusion.fuse_frame("camera1", [(1, 0.0, 0.0), (2, 9.0, 9.0)])
+    ids = fusion.fuse_frame("camera1", [(2, 9.2, 9.0), (1, 0.1, 0.0), (3, 0.2, 0.0)])
+
+    assert ids[:2] == [b, a]
+    assert ids[2] not in (a, b)  #a is already taken by camera1's track 1 in this frame
+    assert fusion.get_track_position(a) == {'x_m': 0.1, 'y_m': 0.0}
+
+#Test that matched observations are merged like fuse_track does
+def test_fuse_frame_merges_other_cameras(fusion):
+    [gid] = fusion.fuse_frame("camera1", [(5, 4.0, 2.0)])
+    [same] = fusion.fuse_frame("camera2", [(3, 4.2, 2.2)])
+
+    assert same == gid
+    position = fusion.get_track_position(gid)
+    assert abs(position['x_m'] - 4.1) < 0.01
+    assert abs(position['y_m'] - 2.1) < 0.01
+
+#Test an empty frame
+def test_fuse_frame_empty(fusion):
+    assert fusion.fuse_frame("camera1", []) == []
+
+
+#---------------- Track Store Tests ----------------
+
+#Test that the snapshot returns all active tracks as arrays
+def test_snapshot(fusion):
+    id1 = fusion.fuse_track("camera1", 1, 1.0, 2.0)
+    id2 = fusion.fuse_track("camera1", 2, 5.0, 6.0)
+
+    snap = fusion.snapshot()
+    assert snap.ids == [id1, id2]
+    assert snap.x_m.tolist() == [1.0, 5.0]
+    assert snap.y_m.tolist() == [2.0, 6.0]
+    assert len(snap.last_seen) == 2
+
+#Test that the snapshot does not change when the tracks move afterwards
+def test_snapshot_is_detached(fusion):
+    fusion.fuse_track("camera1", 1, 1.0, 2.0)
+    snap = fusion.snapshot()
+    fusion.fuse_track("camera1", 1, 3.0, 3.0)
+    assert snap.x_m.tolist() == [1.0]
+
+#Test that the store grows past its initial capacity
+def test_store_grows():
+    fusion = TrackFusion(initial_capacity=2)
+    ids = [fusion.fuse_track("camera1", i, i * 2.0, 0.0) for i in range(10)]
+    assert ids == [f"global_{i + 1}" for i in range(10)]
+    assert fusion.get_track_position("global_10") == {'x_m': 18.0, 'y_m': 0.0}
+
+#Test that expired slots are reused under new global IDs
+def test_expired_slots_are_reused():
+    now = [0.0]
+    fusion = TrackFusion(track_timeout=1.0, cleanup_interval=0.0, clock=lambda: now[0], initial_capacity=2)
+    old_id = fusion.fuse_track("camera1", 1, 0.0, 0.0)
+    now[0] = 2.0
+    new_id = fusion.fuse_track("camera1", 2, 5.0, 5.0)
+
+    assert new_id == "global_2"
+    assert fusion.get_track_position(old_id) is None
+    assert fusion._slot(new_id) == 0
+    assert len(fusion._x) == 2
+
+#Test that unknown or malformed IDs are not found
+def test_malformed_global_ids(fusion):
+    fusion.fuse_track("camera1", 1, 0.0, 0.0)
+    assert fusion.get_track_position("global_x") is None
+    assert fusion.get_track_position(1) is None
+    assert fusion.get_track_position("track_1") is None
@@ -0,0 +1,91 @@
+#backend/tests/test_ttl_cache.py
+#Unit tests for the bounded, expiring LRU cache used for track motion
+import pytest
+from infrastructure.ttl_cache import BoundedTTLCache
+
+
+#---------------- Fixtures ----------------
+
+#Manually advanced clock so expiry is deterministic
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def cache(clock):
+    return BoundedTTLCache(max_size=3, ttl_seconds=10.0, clock=clock)
+
+
+#---------------- Tests ----------------
+
+def test_get_and_set(cache):
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+    assert cache.get("missing", "default") == "default"
+
+#Least recently used entry is evicted when the cache is full
+def test_lru_eviction(cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    cache.get("a")  #a is now most recently used
+    cache.set("d", 4)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert len(cache) == 3
+    assert cache.stats()["evictions"] == 1
+
+#Entries idle longer than the TTL expire
+def test_ttl_expiry(cache, clock):
+    cache.set("a", 1)
+    clock.now = 5.0
+    cache.set("b", 2)
+    clock.now = 11.0
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats()["expirations"] == 1
+
+#Reading an entry refreshes its TTL
+def test_access_refreshes_ttl(cache, clock):
+    cache.set("a", 1)
+    clock.now = 8.0
+    assert cache.get("a") == 1
+    clock.now = 16.0
+    assert cache.get("a") == 1
+
+#Size stays bounded no matter how many distinct keys are inserted
+def test_size_stays_bounded(clock):
+    cache = BoundedTTLCache(max_size=100, ttl_seconds=60.0, clock=clock)
+    for track_id in range(10000):
+        clock.now += 0.01
+        cache.set(str(track_id), {"geo": None})
+    assert len(cache) == 100
+
+#Stats report size and hit rate
+def test_stats(cache):
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    stats = cache.stats()
+    assert stats["size"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(0.6667, abs=1e-3)
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        BoundedTTLCache(max_size=0)
+    with pytest.raises(ValueError):
+        BoundedTTLCache(ttl_seconds=0)
@@ -0,0 +1,235 @@
+"""
+Unit tests for the in-memory zone index used by intrusion detection.
+
+Covers polygon parsing, caching, invalidation through the zone helpers and
+routes, and the intrusion path reading zones from the index.
+"""
+import numpy as np
+import pytest
+from flask import Flask
+from domain.models import db, Floorplan, Camera, Zone
+from domain.models.zone import create_zone, update_zone, delete_zone
+from infrastructure import intrusion_detection
+from infrastructure.camera_registry import camera_registry
+from infrastructure.zone_occupancy import zone_tracker
+from infrastructure.floorplan_handler import FloorplanManager
+from infrastructure.geometry import points_in_polygons
+from infrastructure.zone_index import FloorplanZones, ZoneIndex, build_indexed_zone, zone_index
+from routes.zone_routes import zone_bp
+
+SQUARE = [{"x": 0, "y": 0}, {"x": 4, "y": 0}, {"x": 4, "y": 4}, {"x": 0, "y": 4}]
+FAR_SQUARE = [{"x": 10, "y": 10}, {"x": 12, "y": 10}, {"x": 12, "y": 12}, {"x": 10, "y": 12}]
+
+
+@pytest.fixture
+def app():
+    """Create Flask app with in-memory database for testing"""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(zone_bp)
+
+    with app.app_context():
+        db.create_all()
+        zone_index.invalidate()
+        camera_registry.invalidate()
+        zone_tracker.clear()
+        yield app
+        zone_index.invalidate()
+        camera_registry.invalidate()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def floorplan_id(app):
+    fp = Floorplan(name='Office', width=20.0, depth=20.0,
+                   corner_geocoordinates={"bottom_left": [58.3959, 15.5779]})
+    db.session.add(fp)
+    db.session.commit()
+    return fp.id
+
+
+class TestIndexedZone:
+    """Parsing zone rows into indexed polygons"""
+
+    def test_contains_with_bbox_precheck(self):
+        zone = build_indexed_zone(Zone(id=1, floorplan_id=1, name="A", coordinates=SQUARE))
+
+        assert zone.bbox == (0.0, 0.0, 4.0, 4.0)
+        assert zone.contains(2, 2)
+        assert not zone.contains(5, 2)
+
+    def test_json_string_coordinates_are_parsed(self):
+        zone = build_indexed_zone(Zone(id=1, floorplan_id=1, name="A", coordinates='[{"x": 0, "y": 0}, {"x": 2, "y": 0}, {"x": 0, "y": 2}]'))
+        assert zone.contains(0.5, 0.5)
+
+    @pytest.mark.parametrize("coordinates", [[], SQUARE[:2], "not json", [{"x": "a", "y": 1}] * 3])
+    def test_unusable_polygons_are_skipped(self, coordinates):
+        assert build_indexed_zone(Zone(id=1, floorplan_id=1, name="A", coordinates=coordinates)) is None
+
+
+class TestSpatialLookup:
+    """Grid lookup returns every containing zone"""
+
+    def _zones(self, polygons):
+        return FloorplanZones(
+            build_indexed_zone(Zone(id=i, floorplan_id=1, name=f"Z{i}", coordinates=pts))
+            for i, pts in enumerate(polygons)
+        )
+
+    def test_overlapping_zones_all_returned(self):
+        inner = [{"x": 1, "y": 1}, {"x": 2, "y": 1}, {"x": 2, "y": 2}, {"x": 1, "y": 2}]
+        zones = self._zones([SQUARE, FAR_SQUARE, inner])
+
+        assert [z.name for z in zones.containing(1.5, 1.5)] == ["Z0", "Z2"]
+        assert [z.name for z in zones.containing(3, 3)] == ["Z0"]
+        assert zones.containing(20, 20) == []
+
+    def test_matches_linear_scan(self):
+        import random
+        rng = random.Random(3)
+        polygons = []
+        for _ in range(60):
+            x, y, w, h = rng.uniform(0, 50), rng.uniform(0, 50), rng.uniform(1, 10), rng.uniform(1, 10)
+            polygons.append([{"x": x, "y": y}, {"x": x + w, "y": y}, {"x": x + w / 2, "y": y + h}])
+        zones = self._zones(polygons)
+
+        for _ in range(500):
+            px, py = rng.uniform(0, 60), rng.uniform(0, 60)
+            expected = [z for z in zones if intrusion_detection.point_in_polygon({"x": px, "y": py}, [{"x": a, "y": b} for a, b in z.points])]
+            assert zones.containing(px, py) == expected
+
+    def test_huge_zone_next_to_tiny_ones(self):
+        huge = [{"x": -1000, "y": -1000}, {"x": 1000, "y": -1000}, {"x": 1000, "y": 1000}, {"x": -1000, "y": 1000}]
+        tiny = [{"x": 0, "y": 0}, {"x": 0.1, "y": 0}, {"x": 0.1, "y": 0.1}]
+        zones = self._zones([huge, tiny, tiny])
+
+        assert [z.name for z in zones.containing(0.08, 0.01)] == ["Z0", "Z1", "Z2"]
+        assert [z.name for z in zones.containing(-999, 999)] == ["Z0"]
+
+    def test_empty_floorplan(self):
+        assert FloorplanZones([]).containing(1, 1) == []
+        assert FloorplanZones([]).membership([(1, 1)]).shape == (1, 0)
+
+    def test_membership_matches_full_ray_cast(self):
+        import random
+        rng = random.Random(4)
+        polygons = []
+        for _ in range(80):
+            x, y, w, h = rng.uniform(-50, 50), rng.uniform(-50, 50), rng.uniform(1, 15), rng.uniform(1, 15)
+            polygons.append([{"x": x, "y": y}, {"x": x + w, "y": y}, {"x": x + w / 2, "y": y + h}])
+        zones = self._zones(polygons)
+        points = [(rng.uniform(-60, 70), rng.uniform(-60, 70)) for _ in range(700)]
+
+        expected = points_in_polygons(points, [z.points for z in zones])
+        assert np.array_equal(zones.membership(points), expected)
+        assert not zones.membership([]).size
+
+    def test_membership_only_tests_candidates(self, monkeypatch):
+        zones = self._zones([SQUARE, FAR_SQUARE])
+        zones.membership([(1, 1)])  #builds the polygon set
+        seen = []
+        original = zones._polygons.contains_pairs
+        monkeypatch.setattr(zones._polygons, "contains_pairs",
+                            lambda pts, rows, columns: seen.append(list(columns)) or original(pts, rows, columns))
+
+        assert zones.membership([(1, 1), (500, 500)]).tolist() == [[True, False], [False, False]]
+        assert seen == [[0]]  #the far zone is never ray-cast, the far point has no candidates
+
+
+class TestZoneIndex:
+    """Caching and invalidation"""
+
+    def test_zones_loaded_once(self, floorplan_id):
+        calls = []
+        index = ZoneIndex(loader=lambda fp: calls.append(fp) or Zone.query.filter_by(floorplan_id=fp).all())
+        create_zone(SQUARE, floorplan_id=floorplan_id, name="Lobby")
+
+        assert [z.name for z in index.zones_containing(floorplan_id, 1, 1)] == ["Lobby"]
+        assert index.zones_containing(floorplan_id, 8, 8) == []
+        assert calls == [floorplan_id]
+        assert index.stats()["hits"] == 1
+
+    def test_ttl_expiry_reloads(self, floorplan_id):
+        now = [0.0]
+        index = ZoneIndex(ttl_seconds=10, clock=lambda: now[0])
+        index.zones_for(floorplan_id)
+        now[0] = 11.0
+        index.zones_for(floorplan_id)
+
+        assert index.stats()["loads"] == 2
+
+    def test_helpers_invalidate(self, floorplan_id):
+        zone = create_zone(SQUARE, floorplan_id=floorplan_id, name="Lobby")
+        assert len(zone_index.zones_containing(floorplan_id, 1, 1)) == 1
+
+        update_zone(zone["id"], points=FAR_SQUARE)
+        assert zone_index.zones_containing(floorplan_id, 1, 1) == []
+        assert len(zone_index.zones_containing(floorplan_id, 11, 11)) == 1
+
+        delete_zone(zone["id"])
+        assert zone_index.zones_for(floorplan_id) == ()
+
+    def test_put_route_invalidates(self, app, floorplan_id):
+        assert zone_index.zones_for(floorplan_id) == ()
+        db.session.commit()  #the route opens its own transaction with session.begin()
+
+        response = app.test_client().put(f"/floorplan/{floorplan_id}/zones", json={
+            "zones": [{"name": "Storage", "points": SQUARE}],
+        })
+
+        assert response.status_code == 200
+        assert [z.name for z in zone_index.zones_for(floorplan_id)] == ["Storage"]
+
+
+class TestIntrusionUsesIndex:
+    """process_fusion_for_intrusion matches zones from the index"""
+
+    def test_point_inside_zone_triggers(self, monkeypatch, floorplan_id):
+        db.session.add(Camera(ip_address="192.168.0.97", serialno="B8A44F9EED3B", floorplan_id=floorplan_id))
+        db.session.commit()
+        create_zone(SQUARE, floorplan_id=floorplan_id, name="Lobby")
+        create_zone(SQUARE, floorplan_id=floorplan_id, name="Lobby copy")
+
+        triggered = []
+        monkeypatch.setattr(intrusion_detection, "trigger_zone_intrusion", lambda **kw: triggered.append(kw))
+        monkeypatch.setattr(FloorplanManager, "calculate_position_on_floorplan",
+                            staticmethod(lambda **kw: {"x_m": 1.0, "y_m": 2.0}))
+
+        payload = {"camera_serial": "B8A44F9EED3B", "track_id": 7, "latitude": 58.39, "longitude": 15.57}
+        assert intrusion_detection.process_fusion_for_intrusion(payload) is True
+        assert [t["zone_name"] for t in triggered] == ["Lobby", "Lobby copy"]
+        assert triggered[0]["object_xy"] == {"x": 1.0, "y": 2.0}
+
+    def test_every_track_in_a_fusion_frame_is_checked(self, monkeypatch, floorplan_id):
+        db.session.add(Camera(ip_address="192.168.0.97", serialno="B8A44F9EED3B", floorplan_id=floorplan_id))
+        db.session.commit()
+        create_zone(SQUARE, floorplan_id=floorplan_id, name="Lobby")
+        create_zone(FAR_SQUARE, floorplan_id=floorplan_id, name="Storage")
+
+        triggered = []
+        monkeypatch.setattr(intrusion_detection, "trigger_zone_intrusion", lambda **kw: triggered.append(kw))
+        # latitude doubles as floorplan x, longitude as y
+        monkeypatch.setattr(FloorplanManager, "calculate_position_on_floorplan",
+                            staticmethod(lambda object_lat, object_lon, **kw: {"x_m": object_lat, "y_m": object_lon}))
+
+        def track(track_id, x, y):
+            return {"track_id": track_id, "class": {"type": "Human"}, "speed": 1.0,
+                    "bounding_box": {"top": 0, "bottom": 1, "left": 0, "right": 1},
+                    "geoposition": {"latitude": x, "longitude": y}}
+
+        payload = {"tracks": [track("a", 1, 1), track("b", 11, 11), track("c", 7, 7), track("d", 2, 3)]}
+        assert intrusion_detection.process_fusion_for_intrusion(payload, camera_serial="B8A44F9EED3B") is True
+        assert [(t["track_id"], t["zone_name"]) for t in triggered] == [("a", "Lobby"), ("b", "Storage"), ("d", "Lobby")]
+
+        # same people still inside: no new intrusions
+        triggered.clear()
+        assert intrusion_detection.process_fusion_for_intrusion(payload, camera_serial="B8A44F9EED3B") is True
+        assert triggered == []
+
+        payload = {"tracks": [track("c", 7, 7)]}
+        assert intrusion_detection.process_fusion_for_intrusion(payload, camera_serial="B8A44F9EED3B") is False
+        assert triggered == []
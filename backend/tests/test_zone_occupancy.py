@@ -0,0 +1,216 @@
+"""
+Unit tests for the per-track zone occupancy tracker.
+
+Covers enter/dwell/exit transitions, exit hysteresis, track timeouts, removed
+zones, and process_fusion_for_intrusion triggering once per visit and
+recording every enter of a frame.
+"""
+import datetime
+import time
+
+import pytest
+
+from domain.models import Zone
+from infrastructure import intrusion_detection
+from infrastructure.event_journal import EventJournal
+from infrastructure.zone_index import FloorplanZones, build_indexed_zone
+from infrastructure.zone_occupancy import DWELL, ENTER, EXIT, ZoneOccupancyTracker
+
+SQUARE = [{"x": 0, "y": 0}, {"x": 4, "y": 0}, {"x": 4, "y": 4}, {"x": 0, "y": 4}]
+FAR_SQUARE = [{"x": 10, "y": 10}, {"x": 12, "y": 10}, {"x": 12, "y": 12}, {"x": 10, "y": 12}]
+
+
+def make_zones(*polygons):
+    return FloorplanZones(
+        build_indexed_zone(Zone(id=i + 1, floorplan_id=1, name=f"Z{i + 1}", coordinates=pts))
+        for i, pts in enumerate(polygons)
+    )
+
+
+class FixedNow(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.datetime(2025, 1, 1, 12)
+
+
+@pytest.fixture
+def tracker():
+    return ZoneOccupancyTracker(dwell_seconds=10, exit_margin=0.5, track_timeout=5, clock=lambda: 0.0)
+
+
+def feed(tracker, zones, tracks, now, camera_id=1):
+    """tracks: {track_id: (x, y)} -> [(kind, track_id, zone_id)]"""
+    track_ids = list(tracks)
+    points = [tracks[t] for t in track_ids]
+    inside = zones.membership(points)
+    return [(t.kind, t.track_id, t.zone_id) for t in tracker.update(camera_id, track_ids, points, zones, inside, now=now)]
+
+
+class TestTransitions:
+    """enter, dwell and exit are emitted once per visit"""
+
+    def test_enter_once_then_dwell_then_exit(self, tracker):
+        zones = make_zones(SQUARE)
+
+        assert feed(tracker, zones, {"a": (1, 1)}, now=0) == [(ENTER, "a", 1)]
+        assert feed(tracker, zones, {"a": (2, 2)}, now=5) == []
+        assert feed(tracker, zones, {"a": (2, 3)}, now=10) == [(DWELL, "a", 1)]
+        assert feed(tracker, zones, {"a": (2, 3)}, now=11) == []
+        assert feed(tracker, zones, {"a": (8, 8)}, now=12) == [(EXIT, "a", 1)]
+        assert tracker.occupied(1) == []
+
+    def test_each_track_and_zone_is_independent(self, tracker):
+        zones = make_zones(SQUARE, SQUARE, FAR_SQUARE)
+
+        events = feed(tracker, zones, {"a": (1, 1), "b": (11, 11), "c": (7, 7)}, now=0)
+
+        assert sorted(events) == [(ENTER, "a", 1), (ENTER, "a", 2), (ENTER, "b", 3)]
+        assert feed(tracker, zones, {"a": (1, 1), "b": (11, 11)}, now=1) == []
+
+    def test_cameras_do_not_share_track_ids(self, tracker):
+        zones = make_zones(SQUARE)
+        feed(tracker, zones, {"a": (1, 1)}, now=0, camera_id=1)
+
+        assert feed(tracker, zones, {"a": (1, 1)}, now=0, camera_id=2) == [(ENTER, "a", 1)]
+
+
+class TestHysteresis:
+    """Boundary jitter does not re-trigger"""
+
+    def test_jitter_inside_margin_keeps_state(self, tracker):
+        zones = make_zones(SQUARE)
+        assert feed(tracker, zones, {"a": (3.9, 2)}, now=0) == [(ENTER, "a", 1)]
+
+        for i, x in enumerate([4.2, 3.95, 4.4, 3.8, 4.1]):
+            assert feed(tracker, zones, {"a": (x, 2)}, now=i + 1) == []
+
+        assert feed(tracker, zones, {"a": (4.6, 2)}, now=7) == [(EXIT, "a", 1)]
+        assert feed(tracker, zones, {"a": (3.9, 2)}, now=8) == [(ENTER, "a", 1)]
+
+    def test_dwell_counts_time_within_margin(self, tracker):
+        zones = make_zones(SQUARE)
+        feed(tracker, zones, {"a": (3.9, 2)}, now=0)
+
+        assert feed(tracker, zones, {"a": (4.3, 2)}, now=10) == [(DWELL, "a", 1)]
+
+
+class TestExpiry:
+    """Lost tracks and removed zones"""
+
+    def test_track_timeout_exits(self, tracker):
+        zones = make_zones(SQUARE)
+        feed(tracker, zones, {"a": (1, 1)}, now=0)
+
+        assert [(t.kind, t.track_id) for t in tracker.expire(now=4)] == []
+        transitions = tracker.expire(now=6)
+        assert [(t.kind, t.track_id, t.x, t.y) for t in transitions] == [(EXIT, "a", 1.0, 1.0)]
+
+    def test_timeout_swept_during_other_updates(self, tracker):
+        zones = make_zones(SQUARE)
+        feed(tracker, zones, {"a": (1, 1)}, now=0)
+
+        assert feed(tracker, zones, {"b": (9, 9)}, now=6, camera_id=2) == [(EXIT, "a", 1)]
+
+    def test_unforced_expire_is_throttled(self, tracker):
+        zones = make_zones(SQUARE)
+        feed(tracker, zones, {"a": (1, 1)}, now=0)
+        feed(tracker, zones, {"b": (9, 9)}, now=4.9, camera_id=2)  #sweeps, next sweep at 5.9
+
+        assert tracker.expire(now=5.5, force=False) == []
+        assert [t.kind for t in tracker.expire(now=5.5)] == [EXIT]
+
+    def test_removed_zone_exits(self, tracker):
+        feed(tracker, make_zones(SQUARE), {"a": (1, 1)}, now=0)
+
+        assert feed(tracker, make_zones(), {"a": (1, 1)}, now=1) == [(EXIT, "a", 1)]
+
+    def test_stats(self, tracker):
+        zones = make_zones(SQUARE)
+        feed(tracker, zones, {"a": (1, 1)}, now=0)
+        feed(tracker, zones, {"a": (9, 9)}, now=1)
+
+        stats = tracker.stats()
+        assert (stats["enters"], stats["dwells"], stats["exits"], stats["occupied"]) == (1, 0, 1, 0)
+
+
+class TestIntrusionActions:
+    """Downstream actions run once per transition"""
+
+    def test_enter_triggers_intrusion_dwell_and_exit_are_recorded(self, monkeypatch, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        monkeypatch.setattr(intrusion_detection, "event_journal", journal)
+        calls = []
+        monkeypatch.setattr(intrusion_detection, "trigger_zone_intrusion", lambda **kw: calls.append(kw))
+        zones = make_zones(SQUARE)
+        tracker = ZoneOccupancyTracker(dwell_seconds=10, clock=lambda: 0.0)
+
+        for now, point in [(0, (1, 1)), (1, (1, 1)), (10, (1, 2)), (11, (9, 9))]:
+            inside = zones.membership([point])
+            for transition in tracker.update(7, ["a"], [point], zones, inside, now=now):
+                intrusion_detection.handle_zone_transition(transition)
+
+        assert [(c["zone_id"], c["track_id"]) for c in calls] == [(1, "a")]
+        day = datetime.datetime.now()
+        records = journal.read_range(day - datetime.timedelta(days=1), day + datetime.timedelta(days=1))
+        assert [r["data"]["event"] for r in records] == ["dwell", "exit"]
+
+
+    def test_every_enter_of_a_frame_is_recorded(self, monkeypatch, tmp_path):
+        journal = EventJournal(str(tmp_path))
+        submitted, captures = [], []
+        monkeypatch.setattr(intrusion_detection, "event_journal", journal)
+        monkeypatch.setattr(intrusion_detection, "last_trigger_time", {})
+        monkeypatch.setattr(intrusion_detection, "_last_capture", {})
+        monkeypatch.setattr(intrusion_detection, "capture_snapshot", lambda *a: captures.append("snap"))
+        monkeypatch.setattr(intrusion_detection, "record_event_clip", lambda *a: captures.append("clip"))
+        monkeypatch.setattr(intrusion_detection.alarm_control, "start_loop", lambda: None)
+        monkeypatch.setattr(intrusion_detection.event_sink, "submit", submitted.append)
+        monkeypatch.setattr(intrusion_detection, "_camera_for_topic",
+                            lambda topic: type("Cam", (), {"id": 7, "serial": "ACCC"})())
+        monkeypatch.setattr(intrusion_detection.datetime, "datetime", FixedNow)  # all in one second
+        zones = make_zones(SQUARE, [{"x": 0, "y": 0}, {"x": 2, "y": 0}, {"x": 2, "y": 2}, {"x": 0, "y": 2}])
+        tracker = ZoneOccupancyTracker(clock=lambda: 0.0)
+
+        points = [(1, 1), (3, 3)]  # a is in both zones, b only in the first
+        results = [
+            intrusion_detection.handle_zone_transition(transition)
+            for transition in tracker.update(7, ["a", "b"], points, zones, zones.membership(points), now=0)
+        ]
+
+        assert results == [True, True, True]
+        assert sorted((e.camera_id, e.timestamp) for e in submitted) == [(7, "20250101120000")] * 3
+        for _ in range(100):
+            if len(captures) >= 2:
+                break
+            time.sleep(0.01)
+        assert sorted(captures) == ["clip", "snap"]  # the three events share one capture
+        assert journal.stats()["written"] == 3
+
+class TestExpiryWithoutUpdates:
+    """Exits still happen when frames are empty or stop coming"""
+
+    @pytest.fixture
+    def occupied(self, monkeypatch):
+        clock = [0.0]
+        tracker = ZoneOccupancyTracker(track_timeout=5, clock=lambda: clock[0])
+        zones = make_zones(SQUARE)
+        tracker.update(7, ["a"], [(1, 1)], zones, zones.membership([(1, 1)]))
+        monkeypatch.setattr(intrusion_detection, "zone_tracker", tracker)
+        handled = []
+        monkeypatch.setattr(intrusion_detection, "handle_zone_transition", handled.append)
+        clock[0] = 10.0
+        return handled
+
+    def test_empty_frame_expires(self, occupied):
+        assert intrusion_detection.process_fusion_for_intrusion({"tracks": []}, camera_serial="CAM") is False
+        assert [(t.kind, t.track_id) for t in occupied] == [(EXIT, "a")]
+
+    def test_timer_expires(self, occupied):
+        intrusion_detection.start_zone_expiry(interval=0.01)
+        try:
+            deadline = time.monotonic() + 2
+            while not occupied and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            intrusion_detection.stop_zone_expiry()
+        assert [(t.kind, t.track_id) for t in occupied] == [(EXIT, "a")]